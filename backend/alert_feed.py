@@ -0,0 +1,76 @@
+from datetime import datetime
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+from models import Alert, Market
+
+FEED_PAGE_SIZE = 50
+FEED_MAX_PAGE_SIZE = 500
+
+def encode_cursor(timestamp: datetime, alert_id: int) -> str:
+    """Position after an alert in the newest-first feed: "<timestamp>,<id>"."""
+    return f"{timestamp.isoformat()},{alert_id}"
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of encode_cursor. Raises ValueError for malformed cursors."""
+    try:
+        timestamp, alert_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(timestamp), int(alert_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+def load_alert_feed(
+    db: Session,
+    asset_class: list[str] = None,
+    markets: list[str] = None,
+    alert_types: list[str] = None,
+    since: datetime = None,
+    cursor: str = None,
+    limit: int = FEED_PAGE_SIZE,
+    market_ids: list[int] = None,
+) -> dict:
+    """
+    One page of alerts, newest first by (timestamp, id), filtered by asset
+    class, market name (case-insensitive) or id, and alert type.
+    cursor: next_cursor from the previous page; the page continues after it
+    with a keyset comparison, so every page costs the same however deep it is.
+    since: only alerts timestamped after it, for polling with the newest
+    timestamp already shown.
+    Returns {"alerts": [...], "next_cursor": str, or None on the last page}.
+    """
+    query = (
+        select(Alert.id, Alert.timestamp, Alert.alert_type, Alert.report_date, Alert.message, Alert.value,
+               Market.name, Market.asset_class)
+        .join(Market, Market.id == Alert.market_id)
+        .order_by(Alert.timestamp.desc(), Alert.id.desc())
+        .limit(limit + 1)
+    )
+    if asset_class:
+        query = query.where(Market.asset_class.in_(asset_class))
+    if markets:
+        query = query.where(func.lower(Market.name).in_([m.lower() for m in markets]))
+    if market_ids:
+        query = query.where(Alert.market_id.in_(market_ids))
+    if alert_types:
+        query = query.where(Alert.alert_type.in_(alert_types))
+    if since:
+        query = query.where(Alert.timestamp > since)
+    if cursor:
+        query = query.where(tuple_(Alert.timestamp, Alert.id) < tuple_(*decode_cursor(cursor)))
+
+    rows = db.execute(query).all()
+    page = rows[:limit]
+    alerts = []
+    for alert_id, timestamp, alert_type, report_date, message, value, market, market_asset_class in page:
+        alerts.append({
+            "id": alert_id,
+            "timestamp": timestamp.isoformat(),
+            "market": market,
+            "asset_class": market_asset_class,
+            "alert_type": alert_type,
+            "report_date": report_date.isoformat() if report_date else None,
+            "message": message,
+            "value": value,
+        })
+
+    next_cursor = encode_cursor(page[-1][1], page[-1][0]) if len(rows) > limit else None
+    return {"alerts": alerts, "next_cursor": next_cursor}
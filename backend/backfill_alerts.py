@@ -0,0 +1,21 @@
+import argparse
+import time
+from sqlalchemy.orm import Session
+from db import SessionLocal, engine
+from migrations import run_migrations
+from generate_alerts import backfill_alerts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay alert rules over the full COT history")
+    parser.add_argument("--market-id", type=int, action="append", dest="market_ids", help="limit to these markets (repeatable)")
+    args = parser.parse_args()
+
+    run_migrations(engine)
+
+    db: Session = SessionLocal()
+    try:
+        start = time.perf_counter()
+        counts = backfill_alerts(db, args.market_ids)
+        print(f"Backfilled {counts['created']} alerts ({counts['skipped']} already present) in {time.perf_counter() - start:.1f}s.")
+    finally:
+        db.close()
@@ -0,0 +1,252 @@
+import argparse
+import multiprocessing
+import operator
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+from db import SessionLocal, engine, offload
+from models import Market, PositioningMetric, Price, PriceOverlay
+from migrations import run_migrations
+
+# Fields a setup condition can test: stored overlays per bar and positioning
+# metrics as of the latest released COT report
+OVERLAY_COLUMNS = {c.name: c for c in PriceOverlay.__table__.columns if c.name not in ("id", "market_id", "timestamp")}
+METRIC_COLUMNS = {c.name: c for c in PositioningMetric.__table__.columns if c.name not in ("id", "market_id", "report_date")}
+
+# COT reports are as of Tuesday but published on Friday; a setup can only use a
+# report from its release onwards
+COT_RELEASE_LAG = timedelta(days=3)
+
+# Forward horizons in trading days, used when none are given
+DEFAULT_HORIZONS = (5, 20, 60)
+
+# Worker processes for multi-market scans (1 = in process)
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(min(os.cpu_count() or 1, 8))))
+
+OPERATORS = {">=": operator.ge, "<=": operator.le, ">": operator.gt, "<": operator.lt}
+CONDITION_PATTERN = re.compile(r"^\s*(\w+)\s*(>=|<=|>|<)\s*(-?\d+(?:\.\d+)?)\s*$")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def parse_condition(condition: str) -> tuple[str, str, float]:
+    """
+    Parses "largeSpec_percentile>=90" into (field, operator, value).
+    Raises ValueError for unknown fields or malformed conditions.
+    """
+    match = CONDITION_PATTERN.match(condition)
+    if not match:
+        raise ValueError(f"Invalid condition '{condition}': expected <field><op><number> with op one of >=, <=, >, <")
+    field, op, value = match.groups()
+    if field not in OVERLAY_COLUMNS and field not in METRIC_COLUMNS and field != "close":
+        raise ValueError(f"Unknown field '{field}' in condition '{condition}'")
+    return field, op, float(value)
+
+def load_backtest_inputs(db: Session, market_ids: list[int], fields: set[str]) -> dict[int, dict[str, np.ndarray]]:
+    """
+    Daily closes for the markets with the requested overlay fields per bar and
+    metric fields forward-filled from each report's release, read with one query
+    per table. Returns {market_id: {"date", "close", <field>...}}.
+    """
+    overlay_fields = [f for f in fields if f in OVERLAY_COLUMNS]
+    metric_fields = [f for f in fields if f in METRIC_COLUMNS]
+
+    bar_query = select(Price.market_id, Price.timestamp, Price.price, *[OVERLAY_COLUMNS[f] for f in overlay_fields])
+    if overlay_fields:
+        bar_query = bar_query.outerjoin(
+            PriceOverlay,
+            and_(PriceOverlay.market_id == Price.market_id, PriceOverlay.timestamp == Price.timestamp),
+        )
+    bars = db.execute(bar_query.where(Price.market_id.in_(market_ids)).order_by(Price.market_id, Price.timestamp)).all()
+
+    reports = []
+    if metric_fields:
+        reports = db.execute(
+            select(PositioningMetric.market_id, PositioningMetric.report_date, *[METRIC_COLUMNS[f] for f in metric_fields])
+            .where(PositioningMetric.market_id.in_(market_ids))
+            .order_by(PositioningMetric.market_id, PositioningMetric.report_date)
+        ).all()
+    return offload(_inputs_from_rows, market_ids, overlay_fields, metric_fields, bars, reports)
+
+def _inputs_from_rows(market_ids: list[int], overlay_fields: list[str], metric_fields: list[str], bars: list, reports: list) -> dict:
+    """load_backtest_inputs output from its fetched bar and metric rows."""
+    bar_columns = list(zip(*bars)) or [()] * (3 + len(overlay_fields))
+    bar_markets = np.array(bar_columns[0], dtype=np.int64)
+    report_columns = list(zip(*reports)) or [()] * (2 + len(metric_fields))
+    report_markets = np.array(report_columns[0], dtype=np.int64)
+    released = np.array(report_columns[1], dtype="datetime64[D]") + np.timedelta64(COT_RELEASE_LAG.days, "D")
+
+    inputs = {}
+    for market_id in market_ids:
+        b = slice(*np.searchsorted(bar_markets, [market_id, market_id + 1]))
+        r = slice(*np.searchsorted(report_markets, [market_id, market_id + 1]))
+
+        dates = np.array(bar_columns[1][b], dtype="datetime64[s]")
+        series = {"date": dates, "close": np.array(bar_columns[2][b], dtype=np.float64)}
+        for field, values in zip(overlay_fields, bar_columns[3:]):
+            series[field] = np.array(values[b], dtype=np.float64)
+
+        # Latest released report as of each bar, NaN before the first one
+        in_effect = np.searchsorted(released[r], dates.astype("datetime64[D]"), side="right") - 1
+        for field, values in zip(metric_fields, report_columns[2:]):
+            values = np.array(values[r], dtype=np.float64)
+            series[field] = np.where(in_effect >= 0, values[np.maximum(in_effect, 0)] if len(values) else np.nan, np.nan)
+        inputs[market_id] = series
+    return inputs
+
+def scan_market(series: dict[str, np.ndarray], conditions: list[tuple[str, str, float]], horizons: list[int]) -> dict:
+    """
+    Finds the bars where a setup starts (all conditions true, and not true on
+    the previous bar) and the forward close-to-close return and worst drawdown
+    from the entry close over each horizon. NaN where the horizon runs past the data.
+    """
+    close = series["close"]
+    n = len(close)
+    active = np.ones(n, dtype=bool)
+    for field, op, value in conditions:
+        with np.errstate(invalid="ignore"):
+            active &= OPERATORS[op](series[field], value)
+    entries = np.flatnonzero(active & ~np.concatenate(([False], active[:-1])))
+
+    returns, drawdowns = {}, {}
+    for horizon in horizons:
+        forward = np.full(n, np.nan)
+        worst = np.full(n, np.nan)
+        if n > horizon:
+            forward[:-horizon] = close[horizon:] / close[:-horizon] - 1
+            # Lowest close over the next `horizon` bars, via a sliding window minimum
+            window_low = np.lib.stride_tricks.sliding_window_view(close[1:], horizon).min(axis=1)
+            worst[:n - horizon] = np.minimum(window_low[:n - horizon] / close[:n - horizon] - 1, 0)
+        returns[horizon] = forward[entries]
+        drawdowns[horizon] = worst[entries]
+
+    return {"dates": series["date"][entries], "closes": close[entries], "returns": returns, "drawdowns": drawdowns}
+
+def _scan_market_job(job):
+    market_id, series, conditions, horizons = job
+    return market_id, scan_market(series, conditions, horizons)
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    pool = _pool
+    if pool is None:
+        # Concurrent first requests must not each start (and leak) a pool
+        with _pool_lock:
+            if _pool is None:
+                # Workers are started from a clean server process rather than forked
+                # from the API process, whose thread pool and connection pool threads
+                # may hold locks at fork time
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                _pool = ProcessPoolExecutor(max_workers=BACKTEST_WORKERS, mp_context=multiprocessing.get_context(method))
+            pool = _pool
+    return pool
+
+def shutdown_executor() -> None:
+    """Stops the scan worker processes, if any were started."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+_pool_lock = threading.Lock()
+
+def summarize(returns: np.ndarray, drawdowns: np.ndarray) -> dict:
+    """Distribution of forward returns (fractions) for occurrences whose horizon has elapsed."""
+    done = ~np.isnan(returns)
+    returns, drawdowns = returns[done], drawdowns[done]
+    if not len(returns):
+        return {"count": 0}
+    p10, median, p90 = np.percentile(returns, [10, 50, 90])
+    return {
+        "count": int(len(returns)),
+        "mean": float(returns.mean()),
+        "median": float(median),
+        "p10": float(p10),
+        "p90": float(p90),
+        "win_rate": float((returns > 0).mean()),
+        "mean_drawdown": float(drawdowns.mean()),
+        "max_drawdown": float(drawdowns.min()),
+    }
+
+def run_backtest(db: Session, conditions: list[str], horizons=DEFAULT_HORIZONS, market_ids=None, workers: int = None) -> dict:
+    """
+    Event study of a setup across markets: every historical occurrence with its
+    forward returns, and return distributions per market and across all markets.
+    conditions: strings like "largeSpec_percentile>=90", "ma_50_atr_distance>=3"
+    (see parse_condition); all must hold. Markets are scanned on a process pool
+    when there is more than one and workers (default BACKTEST_WORKERS) is above 1.
+    """
+    parsed = [parse_condition(c) for c in conditions]
+    horizons = sorted(set(horizons))
+    workers = BACKTEST_WORKERS if workers is None else workers
+
+    query = db.query(Market.id, Market.name)
+    if market_ids is not None:
+        query = query.filter(Market.id.in_(list(market_ids)))
+    names = dict(query.order_by(Market.name).all())
+
+    inputs = load_backtest_inputs(db, list(names), {field for field, _, _ in parsed})
+    return offload(_scan_markets, conditions, parsed, horizons, names, inputs, workers)
+
+def _scan_markets(conditions: list[str], parsed: list, horizons: list[int], names: dict[int, str], inputs: dict, workers: int) -> dict:
+    """run_backtest output: scans the loaded markets, on the process pool when worthwhile, and summarizes."""
+    jobs = [(market_id, series, parsed, horizons) for market_id, series in inputs.items()]
+    if workers > 1 and len(jobs) > 1:
+        scans = dict(_executor().map(_scan_market_job, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+    else:
+        scans = dict(map(_scan_market_job, jobs))
+
+    markets = []
+    for market_id, scan in scans.items():
+        if not len(scan["dates"]):
+            continue
+        occurrences = []
+        for i, (day, close) in enumerate(zip(np.datetime_as_string(scan["dates"], unit="D").tolist(), scan["closes"].tolist())):
+            occurrences.append({
+                "date": day,
+                "close": close,
+                "returns": {str(h): _nullable(scan["returns"][h][i]) for h in horizons},
+                "drawdowns": {str(h): _nullable(scan["drawdowns"][h][i]) for h in horizons},
+            })
+        markets.append({
+            "market": names[market_id],
+            "occurrences": occurrences,
+            "stats": {str(h): summarize(scan["returns"][h], scan["drawdowns"][h]) for h in horizons},
+        })
+
+    overall = {}
+    for h in horizons:
+        returns = [scan["returns"][h] for scan in scans.values()]
+        drawdowns = [scan["drawdowns"][h] for scan in scans.values()]
+        overall[str(h)] = summarize(np.concatenate(returns or [np.array([])]), np.concatenate(drawdowns or [np.array([])]))
+
+    return {"conditions": conditions, "horizons": horizons, "overall": overall, "markets": markets}
+
+def _nullable(value: float):
+    return None if np.isnan(value) else float(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest a positioning/price setup across all markets")
+    parser.add_argument("--when", action="append", required=True, help='condition, e.g. "largeSpec_percentile>=90" (repeatable)')
+    parser.add_argument("--horizon", type=int, action="append", dest="horizons", help="forward horizon in trading days (repeatable)")
+    parser.add_argument("--workers", type=int, help=f"worker processes (default {BACKTEST_WORKERS})")
+    args = parser.parse_args()
+
+    run_migrations(engine)
+
+    db: Session = SessionLocal()
+    try:
+        result = run_backtest(db, args.when, args.horizons or DEFAULT_HORIZONS, workers=args.workers)
+    finally:
+        db.close()
+
+    for horizon, stats in result["overall"].items():
+        print(f"{horizon:>4} days: {stats}")
+    for market in result["markets"]:
+        print(f"{market['market']}: {len(market['occurrences'])} occurrences")
@@ -0,0 +1,116 @@
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from db import offload
+from models import COTReport, Price
+from metrics import GROUPS, METRICS_WINDOW
+from utils.market_mapping import CANONICAL_TO_POINT_VALUE
+
+WEIGHTINGS = ("contracts", "notional")
+
+def load_basket(db: Session, market_ids: list[int], weighting: str = "contracts", point_values: dict[int, float] = None) -> dict:
+    """
+    Sums COT positions across a basket of markets on the union of their report
+    dates, carrying each member's latest report forward over weeks it missed.
+    Dates before every member has reported are dropped.
+    weighting: "contracts" adds raw contract counts; "notional" converts each
+    member to USD using its close on or before the report date times its point
+    value (point_values: market_id -> USD per contract per 1.0 of price).
+    Returns {"date": datetime64[D] axis, <group>: {"long", "short", "net"}}.
+    """
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"weighting must be one of {WEIGHTINGS}")
+
+    position_columns = [column for pair in GROUPS.values() for column in pair]
+    reports = db.execute(
+        select(COTReport.market_id, COTReport.report_date, *position_columns)
+        .where(COTReport.market_id.in_(market_ids))
+        .order_by(COTReport.market_id, COTReport.report_date)
+    ).all()
+    prices = None
+    if weighting == "notional":
+        prices = db.execute(
+            select(Price.market_id, Price.timestamp, Price.price)
+            .where(Price.market_id.in_(market_ids))
+            .order_by(Price.market_id, Price.timestamp)
+        ).all()
+    return offload(_sum_basket, market_ids, weighting, point_values, reports, prices)
+
+def _sum_basket(market_ids: list[int], weighting: str, point_values: dict[int, float], reports: list, prices: list) -> dict:
+    """load_basket output from its fetched report rows (and price rows for notional weighting)."""
+    width = 2 * len(GROUPS)
+    columns = list(zip(*reports)) or [()] * (2 + width)
+    report_markets = np.array(columns[0], dtype=np.int64)
+    report_dates = np.array(columns[1], dtype="datetime64[D]")
+    positions = np.array(columns[2:], dtype=np.float64).reshape(width, -1)
+
+    if weighting == "notional":
+        price_columns = list(zip(*prices)) or [()] * 3
+        price_markets = np.array(price_columns[0], dtype=np.int64)
+        price_dates = np.array(price_columns[1], dtype="datetime64[D]")
+        price_values = np.array(price_columns[2], dtype=np.float64)
+
+    axis = np.unique(report_dates)
+    totals = np.zeros((width, len(axis)))
+    complete = np.ones(len(axis), dtype=bool)
+    for market_id in market_ids:
+        r = slice(*np.searchsorted(report_markets, [market_id, market_id + 1]))
+        in_effect = np.searchsorted(report_dates[r], axis, side="right") - 1
+        complete &= in_effect >= 0
+        member = positions[:, r][:, np.maximum(in_effect, 0)] if r.stop > r.start else np.zeros_like(totals)
+
+        if weighting == "notional":
+            p = slice(*np.searchsorted(price_markets, [market_id, market_id + 1]))
+            bar = np.searchsorted(price_dates[p], axis, side="right") - 1
+            complete &= bar >= 0
+            close = price_values[p][np.maximum(bar, 0)] if p.stop > p.start else np.zeros(len(axis))
+            member = member * close * point_values[market_id]
+
+        totals += member
+
+    totals = totals[:, complete]
+    basket = {"date": axis[complete]}
+    for i, group in enumerate(GROUPS):
+        long, short = totals[2 * i], totals[2 * i + 1]
+        basket[group] = {"long": long, "short": short, "net": long - short}
+    return basket
+
+def basket_stats(net: np.ndarray, dates: np.ndarray, window: int = METRICS_WINDOW) -> dict:
+    """
+    Where the latest basket net position stands: all-time extremes (with dates),
+    its all-time percentile rank, and the COT index and z-score over the last
+    `window` reports.
+    """
+    if not len(net):
+        return {}
+    current = net[-1]
+    recent = net[-window:]
+    spread = recent.max() - recent.min()
+    std = recent.std(ddof=1) if len(recent) > 1 else 0.0
+    return {
+        "current": float(current),
+        "date": str(dates[-1]),
+        "max": float(net.max()),
+        "max_date": str(dates[int(net.argmax())]),
+        "min": float(net.min()),
+        "min_date": str(dates[int(net.argmin())]),
+        "is_all_time_high": bool(current >= net.max()),
+        "is_all_time_low": bool(current <= net.min()),
+        "percentile": float(100 * (net <= current).mean()),
+        "cot_index": float(100 * (current - recent.min()) / spread) if spread else None,
+        "zscore": float((current - recent.mean()) / std) if std else None,
+    }
+
+def basket_to_columns(basket: dict, names: list[str], weighting: str) -> dict:
+    """JSON view of load_basket output, with basket_stats per trader group."""
+    dates = np.datetime_as_string(basket["date"], unit="D").tolist()
+    result = {"markets": names, "weighting": weighting, "date": dates, "stats": {}}
+    for group in GROUPS:
+        result[group] = {side: values.tolist() for side, values in basket[group].items()}
+        result["stats"][group] = basket_stats(basket[group]["net"], basket["date"])
+    return result
+
+def point_values_for(symbols: dict[int, str]) -> tuple[dict[int, float], list[int]]:
+    """Point values for market_id -> canonical symbol, and the ids that have none."""
+    known = {market_id: CANONICAL_TO_POINT_VALUE[s] for market_id, s in symbols.items() if s in CANONICAL_TO_POINT_VALUE}
+    return known, [market_id for market_id in symbols if market_id not in known]
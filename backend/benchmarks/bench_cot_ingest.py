@@ -0,0 +1,73 @@
+"""
+Compares the original row-by-row COT ingest against store_cot_frame.
+
+Run from backend/:  python -m benchmarks.bench_cot_ingest [weeks]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.fixtures import fresh_session, synthetic_cot_frame
+import models
+from ingest_cot import store_cot_frame
+from utils.markets import resolve_market
+from utils.market_mapping import COT_TO_CANONICAL
+
+
+def legacy_ingest(db, df):
+    """The pre-bulk ingest loop: iterrows, resolve and existence query per row."""
+    for _, row in df.iterrows():
+        market_name = row["Market_and_Exchange_Names"].strip()
+        canonical_name = COT_TO_CANONICAL.get(market_name, market_name)
+        symbol = row["CFTC_Contract_Market_Code_Quotes"].strip()
+        report_Date = pd.to_datetime(row["As_of_Date_in_Form_YYYY_MM_DD"])
+
+        market = resolve_market(db, source="cot", source_symbol=market_name, canonical_name=canonical_name, symbol=symbol)
+
+        existing = db.query(models.COTReport).filter_by(market_id=market.id, report_date=report_Date).first()
+        if not existing:
+            db.add(models.COTReport(
+                market_id=market.id,
+                report_date=report_Date,
+                comms_long_positions=row["Commercial_Positions_Long_All"],
+                comms_short_positions=row["Commercial_Positions_Short_All"],
+                largeSpec_long_positions=row["Noncommercial_Positions_Long_All"],
+                largeSpec_short_positions=row["Noncommercial_Positions_Short_All"],
+                smallSpec_long_positions=row["Nonreportable_Positions_Long_All"],
+                smallSpec_short_positions=row["Nonreportable_Positions_Short_All"],
+            ))
+    db.commit()
+
+
+def bulk_ingest(db, df):
+    stored = store_cot_frame(db, df)
+    db.commit()
+    return stored
+
+
+def run(label, ingest, df):
+    db = fresh_session(os.path.join(tempfile.gettempdir(), f"bench_cot_{label}.db"))
+    try:
+        start = time.perf_counter()
+        ingest(db, df)
+        elapsed = time.perf_counter() - start
+        rows = db.query(models.COTReport).count()
+    finally:
+        db.close()
+    print(f"{label:>8}: {elapsed:8.3f}s  ({rows} cot_reports rows)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    weeks = int(sys.argv[1]) if len(sys.argv) > 1 else 52
+    df = synthetic_cot_frame(weeks=weeks)
+    # The legacy path also stores unmapped contracts; compare like for like
+    mapped = df[df["Market_and_Exchange_Names"].isin(COT_TO_CANONICAL.keys())]
+    print(f"{len(df)} rows in frame, {len(mapped)} for mapped markets")
+
+    legacy = run("legacy", legacy_ingest, mapped)
+    bulk = run("bulk", bulk_ingest, df)
+    print(f"speedup: {legacy / bulk:.1f}x")
@@ -0,0 +1,73 @@
+"""
+Compares the original /data/{market_name} merge loop against load_market_series
+for a 20-year daily series: latency and peak Python memory.
+
+Run from backend/:  python -m benchmarks.bench_market_data [years]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fixtures import fresh_session, populate_market_history
+import models
+from series import load_market_series, series_to_records
+
+
+def legacy_market_data(db, market_id):
+    """The pre-as-of merge: ORM rows for both tables, exact-date dict lookup."""
+    prices = db.query(models.Price).filter(models.Price.market_id == market_id).order_by(models.Price.timestamp).all()
+    reports = db.query(models.COTReport).filter(models.COTReport.market_id == market_id).order_by(models.COTReport.report_date).all()
+    reports_by_date = {r.report_date.isoformat(): r for r in reports}
+
+    result = []
+    for p in prices:
+        cot = reports_by_date.get(p.timestamp.date().isoformat())
+        result.append({
+            "date": p.timestamp.isoformat(),
+            "price": p.price,
+            "largeSpecLong": cot.largeSpec_long_positions if cot else None,
+            "largeSpecShort": cot.largeSpec_short_positions if cot else None,
+            "smallSpecLong": cot.smallSpec_long_positions if cot else None,
+            "smallSpecShort": cot.smallSpec_short_positions if cot else None,
+            "commsLong": cot.comms_long_positions if cot else None,
+            "commsShort": cot.comms_short_positions if cot else None,
+        })
+    return result
+
+
+def asof_market_data(db, market_id):
+    return series_to_records(load_market_series(db, market_id))
+
+
+def measure(label, fn, db, market_id, repeats=5):
+    timings = []
+    for _ in range(repeats):
+        db.expunge_all()
+        start = time.perf_counter()
+        result = fn(db, market_id)
+        timings.append(time.perf_counter() - start)
+
+    db.expunge_all()
+    tracemalloc.start()
+    fn(db, market_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    with_cot = sum(1 for r in result if r["largeSpecLong"] is not None)
+    print(f"{label:>8}: best {min(timings) * 1000:7.1f} ms  peak {peak / 2**20:6.1f} MiB  "
+          f"({len(result)} bars, {with_cot} with COT values)")
+    return min(timings)
+
+
+if __name__ == "__main__":
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    db = fresh_session(os.path.join(tempfile.gettempdir(), "bench_market_data.db"))
+    try:
+        market_id = populate_market_history(db, years=years)
+        legacy = measure("legacy", legacy_market_data, db, market_id)
+        asof = measure("as-of", asof_market_data, db, market_id)
+        print(f"speedup: {legacy / asof:.1f}x")
+    finally:
+        db.close()
@@ -0,0 +1,99 @@
+"""
+Overlay computation for every market in YAHOO_TO_CANONICAL: a per-bar Python
+loop against the vectorized compute_overlays (both reading the same bars, not
+writing), then update_overlays end to end for the full history and for the
+incremental update after one new bar per market.
+
+Run from backend/:  python -m benchmarks.bench_overlays [years]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import func, insert, select
+
+from benchmarks.fixtures import fresh_session, populate_market_history
+from models import Price, PriceOverlay
+from overlays import ATR_PERIOD, DISTANCE_MA, MA_PERIODS, compute_overlays, update_overlays
+from utils.market_mapping import YAHOO_TO_CANONICAL
+
+
+def loop_overlays(db, market_ids):
+    """Straightforward per-bar loop over ORM rows, computing the same overlays."""
+    results = {}
+    for market_id in market_ids:
+        bars = db.query(Price).filter(Price.market_id == market_id).order_by(Price.timestamp).all()
+        closes, atr, prev_close, rows = [], None, None, []
+        for i, bar in enumerate(bars):
+            closes.append(bar.price)
+            ranges = [bar.high - bar.low]
+            if prev_close is not None:
+                ranges += [abs(bar.high - prev_close), abs(bar.low - prev_close)]
+            tr = max(ranges)
+            atr = tr if atr is None else atr + (tr - atr) / ATR_PERIOD
+            row = {f"ma_{p}": sum(closes[-p:]) / p if len(closes) >= p else None for p in MA_PERIODS}
+            row["atr"] = atr if i + 1 >= ATR_PERIOD else None
+            ma = row[f"ma_{DISTANCE_MA}"]
+            row["distance"] = (bar.price - ma) / atr if ma is not None and row["atr"] else None
+            rows.append(row)
+            prev_close = bar.price
+        results[market_id] = rows
+    return results
+
+
+def load_bars(db, market_ids):
+    rows = db.execute(
+        select(Price.market_id, Price.timestamp, Price.price.label("close"), Price.high, Price.low)
+        .where(Price.market_id.in_(market_ids))
+        .order_by(Price.market_id, Price.timestamp)
+    ).all()
+    return pd.DataFrame(rows, columns=["market_id", "timestamp", "close", "high", "low"])
+
+
+def vectorized_overlays(bars):
+    return {market_id: compute_overlays(group.reset_index(drop=True)) for market_id, group in bars.groupby("market_id")}
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>24}: {elapsed * 1000:8.1f} ms")
+    return elapsed, result
+
+
+if __name__ == "__main__":
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    db = fresh_session(os.path.join(tempfile.gettempdir(), "bench_overlays.db"))
+    try:
+        market_ids = [
+            populate_market_history(db, name=f"{ticker} bench", symbol=canonical, years=years, seed=i)
+            for i, (ticker, canonical) in enumerate(YAHOO_TO_CANONICAL.items())
+        ]
+        bars = db.scalar(select(func.count()).select_from(Price))
+        print(f"{len(market_ids)} markets, {bars} bars")
+
+        loop, _ = timed("per-bar loop", lambda: loop_overlays(db, market_ids))
+        read, bars = timed("vectorized: read", lambda: load_bars(db, market_ids))
+        compute, _ = timed("vectorized: compute", lambda: vectorized_overlays(bars))
+        print(f"speedup: {loop / (read + compute):.1f}x with reads, {loop / compute:.0f}x compute alone")
+
+        _, written = timed("update_overlays (full)", lambda: update_overlays(db))
+        db.commit()
+        print(f"full build: {sum(written.values())} bars written")
+
+        # One new bar per market, as after a daily ingest
+        last = dict(db.execute(select(Price.market_id, func.max(Price.timestamp)).group_by(Price.market_id)).all())
+        db.execute(insert(Price), [
+            {"market_id": market_id, "timestamp": (pd.Timestamp(ts) + pd.offsets.BDay()).to_pydatetime(),
+             "open": 1000.0, "high": 1010.0, "low": 990.0, "price": 1005.0}
+            for market_id, ts in last.items()
+        ])
+        _, written = timed("update_overlays (1 bar)", lambda: update_overlays(db))
+        db.commit()
+        print(f"incremental: {sum(written.values())} bars written, "
+              f"{db.scalar(select(func.count()).select_from(PriceOverlay))} overlay rows stored")
+    finally:
+        db.close()
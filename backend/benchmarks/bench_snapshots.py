@@ -0,0 +1,95 @@
+"""
+Reading the full price and COT history of every market in CANONICAL_TO_NAME:
+ORM rows per market, one Core query per table into NumPy arrays, and the
+memory-mapped Arrow snapshots written by snapshots.export_snapshots (timed
+cold after the export and warm on a second pass).
+
+Run from backend/:  python -m benchmarks.bench_snapshots [years]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from benchmarks.fixtures import fresh_session, populate_market_history
+from models import COTReport, Price
+from snapshots import export_snapshots, load_snapshot
+from utils.market_mapping import CANONICAL_TO_NAME
+
+
+def orm_histories(db, market_ids):
+    histories = {}
+    for market_id in market_ids:
+        prices = db.query(Price).filter(Price.market_id == market_id).order_by(Price.timestamp).all()
+        reports = db.query(COTReport).filter(COTReport.market_id == market_id).order_by(COTReport.report_date).all()
+        histories[market_id] = (
+            np.array([p.price for p in prices]),
+            np.array([r.largeSpec_long_positions - r.largeSpec_short_positions for r in reports]),
+        )
+    return histories
+
+
+def core_histories(db, market_ids):
+    prices = db.execute(
+        select(Price.market_id, Price.timestamp, Price.price).order_by(Price.market_id, Price.timestamp)
+    ).all()
+    reports = db.execute(
+        select(COTReport.market_id, COTReport.report_date,
+               COTReport.largeSpec_long_positions - COTReport.largeSpec_short_positions)
+        .order_by(COTReport.market_id, COTReport.report_date)
+    ).all()
+    price_markets, _, closes = (np.array(c) for c in zip(*prices))
+    report_markets, _, nets = (np.array(c) for c in zip(*reports))
+    histories = {}
+    for market_id in market_ids:
+        p = slice(*np.searchsorted(price_markets, [market_id, market_id + 1]))
+        r = slice(*np.searchsorted(report_markets, [market_id, market_id + 1]))
+        histories[market_id] = (closes[p], nets[r])
+    return histories
+
+
+def snapshot_histories(root, market_ids):
+    histories = {}
+    for market_id in market_ids:
+        prices = load_snapshot("prices", market_id, root)
+        reports = load_snapshot("cot", market_id, root)
+        histories[market_id] = (prices["close"], reports["largeSpec_long_positions"] - reports["largeSpec_short_positions"])
+    return histories
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>20}: {elapsed * 1000:8.1f} ms")
+    return result
+
+
+if __name__ == "__main__":
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    root = os.path.join(tempfile.gettempdir(), "bench_snapshots")
+    shutil.rmtree(root, ignore_errors=True)
+    db = fresh_session(os.path.join(tempfile.gettempdir(), "bench_snapshots.db"))
+    try:
+        for i, (symbol, name) in enumerate(CANONICAL_TO_NAME.items()):
+            populate_market_history(db, name=name, symbol=symbol, years=years, seed=i)
+        db.commit()
+        market_ids = [market_id for market_id, in db.execute(select(Price.market_id).distinct())]
+        print(f"{len(market_ids)} markets, {years} years each")
+
+        orm = timed("ORM rows", lambda: orm_histories(db, market_ids))
+        core = timed("Core query", lambda: core_histories(db, market_ids))
+        timed("export", lambda: export_snapshots(db, root))
+        timed("snapshot (cold)", lambda: snapshot_histories(root, market_ids))
+        mapped = timed("snapshot (warm)", lambda: snapshot_histories(root, market_ids))
+
+        for market_id in market_ids:
+            for expected in (orm[market_id], core[market_id]):
+                assert np.array_equal(expected[0], mapped[market_id][0])
+                assert np.array_equal(expected[1], mapped[market_id][1])
+    finally:
+        db.close()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Benchmarks run against a throwaway SQLite file unless DATABASE_URL is set
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'positioning_bench.db')}")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from migrations import run_migrations
+from utils.market_mapping import COT_TO_CANONICAL
+
+
+def fresh_session(path: str):
+    """
+    Returns a session bound to a new, empty SQLite database at path.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    run_migrations(engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def synthetic_cot_frame(weeks: int = 52, unmapped_markets: int = 200, seed: int = 0) -> pd.DataFrame:
+    """
+    Builds a cleaned frame shaped like a CFTC annual.txt: every mapped market plus
+    a batch of unmapped contracts, one row per market per weekly report.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(COT_TO_CANONICAL.keys()) + [f"UNMAPPED CONTRACT {i} - SOME EXCHANGE" for i in range(unmapped_markets)]
+    report_dates = [date(2024, 1, 2) + timedelta(weeks=w) for w in range(weeks)]
+
+    n = len(names) * weeks
+    df = pd.DataFrame({
+        "Market_and_Exchange_Names": np.repeat(names, weeks),
+        "As_of_Date_in_Form_YYYY_MM_DD": np.tile([d.isoformat() for d in report_dates], len(names)),
+        "CFTC_Contract_Market_Code_Quotes": np.repeat([f"{i:06d}" for i in range(len(names))], weeks),
+    })
+    for column in (
+        "Commercial_Positions_Long_All", "Commercial_Positions_Short_All",
+        "Noncommercial_Positions_Long_All", "Noncommercial_Positions_Short_All",
+        "Nonreportable_Positions_Long_All", "Nonreportable_Positions_Short_All",
+    ):
+        df[column] = rng.integers(1_000, 500_000, size=n)
+    return df
+
+
+def populate_market_history(db, name: str = "Gold Futures (COMEX)", symbol: str = "XAU", years: int = 20, seed: int = 0):
+    """
+    Inserts a market with `years` of business-day OHLC bars and weekly (Tuesday)
+    COT reports. Returns the market id.
+    """
+    from sqlalchemy import insert
+    from models import COTReport, Market, Price
+
+    rng = np.random.default_rng(seed)
+    market = Market(name=name, symbol=symbol, asset_class="Metals")
+    db.add(market)
+    db.flush()
+
+    end = pd.Timestamp("2025-12-31")
+    bars = pd.bdate_range(end - pd.DateOffset(years=years), end)
+    closes = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, len(bars))))
+    opens = closes * np.exp(rng.normal(0, 0.004, len(bars)))
+    highs = np.maximum(opens, closes) * np.exp(np.abs(rng.normal(0, 0.005, len(bars))))
+    lows = np.minimum(opens, closes) * np.exp(-np.abs(rng.normal(0, 0.005, len(bars))))
+    db.execute(insert(Price), [
+        {"market_id": market.id, "timestamp": ts.to_pydatetime(), "open": float(o), "high": float(h), "low": float(l), "price": float(c)}
+        for ts, o, h, l, c in zip(bars, opens, highs, lows, closes)
+    ])
+
+    tuesdays = pd.date_range(bars[0], end, freq="W-TUE")
+    positions = rng.integers(1_000, 500_000, size=(len(tuesdays), 6))
+    db.execute(insert(COTReport), [
+        {
+            "market_id": market.id,
+            "report_date": day.date(),
+            "comms_long_positions": int(p[0]),
+            "comms_short_positions": int(p[1]),
+            "largeSpec_long_positions": int(p[2]),
+            "largeSpec_short_positions": int(p[3]),
+            "smallSpec_long_positions": int(p[4]),
+            "smallSpec_short_positions": int(p[5]),
+        }
+        for day, p in zip(tuesdays, positions)
+    ])
+    db.commit()
+    return market.id
@@ -0,0 +1,149 @@
+"""
+Load test for the read API: starts uvicorn on the sync (thread pool) and the
+async (DB_ASYNC=1) database path with each connection pool size in turn, drives
+it with concurrent clients over a mix of endpoints, and reports throughput and
+latency percentiles.
+
+Against the SQLite stand-in (seeded with every tracked market) by default, or an
+existing database with --database-url, e.g. a local Postgres that has been
+ingested into. --no-cache turns the response cache off so every request reaches
+the database.
+
+Run from backend/:  python -m benchmarks.load_test [--mode sync] [--pool-size 5 --pool-size 20] [--concurrency 64] [--no-cache]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.fixtures import fresh_session, populate_market_history
+from generate_alerts import backfill_alerts
+from metrics import update_metrics
+from overlays import update_overlays
+from utils.market_mapping import CANONICAL_TO_NAME
+
+
+def seed_database(path: str, years: int) -> list[str]:
+    """Tracked markets with price, COT, metrics, overlay and alert history. Returns their names."""
+    db = fresh_session(path)
+    try:
+        for i, (symbol, name) in enumerate(CANONICAL_TO_NAME.items()):
+            populate_market_history(db, name=name, symbol=symbol, years=years, seed=i)
+        update_metrics(db)
+        update_overlays(db)
+        backfill_alerts(db)
+        db.commit()
+    finally:
+        db.close()
+    return list(CANONICAL_TO_NAME.values())
+
+
+def request_mix(names: list[str]) -> list[str]:
+    """Paths in rough proportion to what the dashboard asks for."""
+    paths = ["/markets", "/alerts", "/alerts?alert_type=rapid_change", "/screener", "/screener?direction=long&limit=10"]
+    for name in names:
+        paths += [f"/data/{name}?limit=250", f"/data/{name}?limit=250&overlays=true", f"/metrics/{name}", f"/alerts/{name}"]
+    return paths
+
+
+def start_server(database_url: str, port: int, async_mode: bool, cache: bool, pool_size: int, max_overflow: int):
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        DB_ASYNC="1" if async_mode else "0",
+        DB_POOL_SIZE=str(pool_size),
+        DB_MAX_OVERFLOW=str(max_overflow),
+    )
+    if not cache:
+        env["RESPONSE_CACHE_ENTRIES"] = "0"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and server.poll() is None:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+async def drive(base_url: str, paths: list[str], concurrency: int, duration: float) -> tuple[list[float], int]:
+    """concurrency clients issuing requests back to back for `duration` seconds."""
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        stop = time.perf_counter() + duration
+
+        async def worker(seed: int):
+            nonlocal errors
+            rng = random.Random(seed)
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(rng.choice(paths))
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, errors
+
+
+def report(label: str, latencies: list[float], errors: int, duration: float):
+    ms = np.array(latencies) * 1000
+    p50, p99 = np.percentile(ms, [50, 99]) if len(ms) else (float("nan"), float("nan"))
+    print(f"{label:>14}: {len(ms) / duration:8.1f} req/s   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms   errors {errors}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and tail latency of the read API per database mode and pool size")
+    parser.add_argument("--database-url", help="existing database to test against (default: seeded SQLite file)")
+    parser.add_argument("--years", type=int, default=10, help="history per market when seeding")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15, help="seconds per run")
+    parser.add_argument("--mode", choices=["sync", "async"], action="append", help="mode to run (repeatable, default: both)")
+    parser.add_argument("--pool-size", type=int, action="append", help="pool size to run (repeatable, default: 5)")
+    parser.add_argument("--max-overflow", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url:
+        names = list(CANONICAL_TO_NAME.values())
+    else:
+        path = os.path.join(tempfile.gettempdir(), "load_test.db")
+        names = seed_database(path, args.years)
+        database_url = f"sqlite:///{path}"
+
+    paths = request_mix(names)
+    print(f"{len(paths)} paths, {args.concurrency} clients, {args.duration:.0f}s per run, "
+          f"overflow {args.max_overflow}, cache {'off' if args.no_cache else 'on'}")
+
+    for mode in args.mode or ["sync", "async"]:
+        for pool_size in args.pool_size or [5]:
+            server = start_server(database_url, args.port, mode == "async", not args.no_cache, pool_size, args.max_overflow)
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                asyncio.run(drive(base_url, paths, args.concurrency, 2))  # warm up
+                latencies, errors = asyncio.run(drive(base_url, paths, args.concurrency, args.duration))
+                report(f"{mode}, pool {pool_size}", latencies, errors, args.duration)
+            finally:
+                server.terminate()
+                server.wait()
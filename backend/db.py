@@ -1,12 +1,14 @@
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from starlette.concurrency import run_in_threadpool
 import os
 
-load_dotenv() 
+load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-
 if not DATABASE_URL:
     try:
         from env import DATABASE_URL as LOCAL_DATABASE_URL
@@ -14,6 +16,70 @@ if not DATABASE_URL:
     except ImportError:
         raise RuntimeError("DATABASE_URL not set and env.py missing")
 
-engine = create_engine(DATABASE_URL)
+# Connection pool settings (the defaults are SQLAlchemy's own). Each worker
+# process holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so keep the
+# total across workers under the server's max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds before a connection is replaced (-1 = never); set below any idle
+# timeout between the app and Postgres
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+# Server-side statement timeout in milliseconds on Postgres (0 = none)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Serve API requests from an async engine (asyncpg / aiosqlite) instead of a thread pool
+DB_ASYNC = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "yes")
+
+def async_url(url: str) -> str:
+    """The same database through its async driver: asyncpg for Postgres, aiosqlite for SQLite."""
+    url = make_url(url)
+    drivers = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+    if url.get_backend_name() not in drivers:
+        raise RuntimeError(f"No async driver configured for {url.get_backend_name()}")
+    return url.set(drivername=drivers[url.get_backend_name()]).render_as_string(hide_password=False)
+
+def engine_options(url: str) -> dict:
+    """create_engine / create_async_engine keyword arguments from the DB_* settings."""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite uses a single static connection, not a pool
+        return {}
+
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    if url.get_backend_name() == "postgresql" and DB_STATEMENT_TIMEOUT_MS:
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(async_url(DATABASE_URL), **engine_options(async_url(DATABASE_URL)))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def offload(fn, *args):
+    """
+    Calls fn(*args) for CPU-bound work in code that takes a Session: building
+    arrays from fetched rows, encoding responses, blocking cache clients.
+    Under AsyncSession.run_sync (DB_ASYNC) that code runs on the event loop,
+    with queries awaited on the async connection, so fn is sent to the thread
+    pool and awaited; elsewhere it is simply called.
+    fn must not use the session.
+    """
+    if AsyncSessionLocal is not None and in_greenlet():
+        return await_only(run_in_threadpool(fn, *args))
+    return fn(*args)
+
+Base = declarative_base()
@@ -1,84 +1,250 @@
-from datetime import datetime
+from datetime import datetime, time
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from models import Market, Alert, COTReport
 import numpy as np
+import pandas as pd
+from utils.bulk import insert_ignore
+from utils.rolling import RollingPercentile
+from utils.events import publish_events
+from utils.versions import bump_versions
 
-def generate_alerts(db: Session, market_identifier: str, identifier_type: str = "symbol"):
+# Reports used for the percentile window, and the minimum needed to alert
+HISTORY_WINDOW = 200
+MIN_HISTORY = 100
+
+def evaluate_alerts(market_name: str, current_net_position, net_long_90th, net_short_10th, position_change, mean_abs_net_position):
+    """
+    Applies the alert rules to precomputed statistics for one market.
+    position_change may be None when there is no previous report.
+    Returns a list of (alert_type, message, value).
+    """
+    alerts = []
+
+    # Check for maximum net long position (90th percentile)
+    if current_net_position > net_long_90th:
+        alert_message = f"{market_name} large speculators are at maximum net long (current: {current_net_position}, 90th percentile: {net_long_90th:.0f})"
+        alerts.append(("max_net_long", alert_message, current_net_position))
+
+    # Check for extreme short position (10th percentile)
+    if current_net_position < net_short_10th:
+        alert_message = f"{market_name} large speculators are at extreme net short (current: {current_net_position}, 10th percentile: {net_short_10th:.0f})"
+        alerts.append(("extreme_short", alert_message, current_net_position))
+
+    # Check for rapid change in positioning (compare to previous week)
+    if position_change is not None and abs(position_change) > 0.10 * mean_abs_net_position:  # 10% of the average absolute net position
+        alert_message = f"{market_name} large speculators have rapidly changed positioning (change: {position_change:+})"
+        alerts.append(("rapid_change", alert_message, position_change))
+
+    return alerts
+
+def generate_alerts(db: Session, market_identifier: str, identifier_type: str = "symbol") -> dict[str, int]:
     """
     Generates alerts for a given market based on recent COT data.
     market_identifier: can be either the market symbol or the market id
     identifier_type: can be either "symbol" or "id"
+    Returns {"created": n, "skipped": n}.
     """
+    counts = {"created": 0, "skipped": 0}
+
     if identifier_type == "symbol":
         market = db.query(Market).filter(Market.symbol == market_identifier).first()
     elif identifier_type == "id":
         market = db.query(Market).filter(Market.id == market_identifier).first()
     else:
         print(f"Invalid identifier_type: {identifier_type}. Must be 'symbol' or 'id'.")
-        return
+        return counts
 
     if not market:
         print(f"Market {market_identifier} not found.")
-        return
+        return counts
 
-    cot_report = db.query(COTReport).filter(COTReport.market_id == market.id).order_by(COTReport.report_date.desc()).first()
-    if not cot_report:
+    # Fetch historical COT data for percentile calculations (latest report first)
+    historical_cot_data = db.query(COTReport).filter(COTReport.market_id == market.id).order_by(COTReport.report_date.desc()).limit(HISTORY_WINDOW).all()
+    if not historical_cot_data:
         print(f"No COT data found for {market.name}.")
-        return
-
-    # Fetch historical COT data for percentile calculations
-    historical_cot_data = db.query(COTReport).filter(COTReport.market_id == market.id).order_by(COTReport.report_date.desc()).limit(200).all()
-    if not historical_cot_data or len(historical_cot_data) < 100:
+        return counts
+    if len(historical_cot_data) < MIN_HISTORY:
         print(f"Not enough historical COT data for {market.name}.")
-        return
+        return counts
 
     # Extract large speculator net positions from historical data
     historical_net_positions = [report.largeSpec_long_positions - report.largeSpec_short_positions for report in historical_cot_data]
+    current_net_position = historical_net_positions[0]
+    position_change = current_net_position - historical_net_positions[1] if len(historical_net_positions) > 1 else None
 
-    # Calculate current net position
-    current_net_position = cot_report.largeSpec_long_positions - cot_report.largeSpec_short_positions
+    now = datetime.now()
+    records = [
+        alert_record(market.id, historical_cot_data[0].report_date, alert_type, message, value, now)
+        for alert_type, message, value in evaluate_alerts(
+            market.name,
+            current_net_position,
+            np.percentile(historical_net_positions, 90),
+            np.percentile(historical_net_positions, 10),
+            position_change,
+            np.mean(np.abs(historical_net_positions)),
+        )
+    ]
+    counts = write_alerts(db, records)
+    db.commit()
+    return counts
 
-    # Check for maximum net long position (90th percentile)
-    net_long_90th = np.percentile(historical_net_positions, 90)
-    if current_net_position > net_long_90th:
-        alert_message = f"{market.name} large speculators are at maximum net long (current: {current_net_position}, 90th percentile: {net_long_90th:.0f})"
-        create_alert(db, market, "max_net_long", alert_message, current_net_position)
+def generate_alerts_batch(db: Session, market_ids=None) -> dict[str, int]:
+    """
+    Generates alerts for every market (or only market_ids) from one query.
+    The last HISTORY_WINDOW reports of each market are selected with a window
+    function, statistics are computed per market with grouped pandas operations,
+    and all new alerts are written with one bulk insert and a single commit.
+    Returns {"created": n, "skipped": n}.
+    """
+    net = (COTReport.largeSpec_long_positions - COTReport.largeSpec_short_positions).label("net")
+    ranked = select(
+        COTReport.market_id,
+        COTReport.report_date,
+        net,
+        func.row_number().over(partition_by=COTReport.market_id, order_by=COTReport.report_date.desc()).label("rn"),
+    )
+    if market_ids is not None:
+        ranked = ranked.where(COTReport.market_id.in_(market_ids))
+    ranked = ranked.subquery()
 
-    # Check for extreme short position (10th percentile)
-    net_short_10th = np.percentile(historical_net_positions, 10)
-    if current_net_position < net_short_10th:
-        alert_message = f"{market.name} large speculators are at extreme net short (current: {current_net_position}, 10th percentile: {net_short_10th:.0f})"
-        create_alert(db, market, "extreme_short", alert_message, current_net_position)
+    rows = db.execute(
+        select(ranked.c.market_id, ranked.c.report_date, ranked.c.net, ranked.c.rn).where(ranked.c.rn <= HISTORY_WINDOW)
+    ).all()
+    if not rows:
+        return {"created": 0, "skipped": 0}
 
-    # Check for rapid change in positioning (compare to previous week)
-    if len(historical_cot_data) > 1:
-        previous_net_position = historical_cot_data[1].largeSpec_long_positions - historical_cot_data[1].largeSpec_short_positions
-        position_change = current_net_position - previous_net_position
-        if abs(position_change) > 0.10 * np.mean(np.abs(historical_net_positions)):  # 10% of the average absolute net position
-            alert_message = f"{market.name} large speculators have rapidly changed positioning (change: {position_change:+})"
-            create_alert(db, market, "rapid_change", alert_message, position_change)
-
-def create_alert(db: Session, market: Market, alert_type: str, message: str, value: float):
-    
-    existing_alert = db.query(Alert).filter_by(
-        message=message,
-        market_id=market.id,
-        alert_type=alert_type
-    ).first()
-
-    if not existing_alert:
-        alert = Alert(
-            timestamp=datetime.now(),
-            market_id=market.id,
-            alert_type=alert_type,
-            message=message,
-            value=value,
-        )
-        db.add(alert)
-        db.commit()
-        print(f"Alert created: {message}")
-    else:
-        print(f"Duplicate alert found, skipping: {message}")
+    history = pd.DataFrame(rows, columns=["market_id", "report_date", "net", "rn"])
+    history["abs_net"] = history["net"].abs()
+    grouped = history.groupby("market_id")
+
+    stats = pd.DataFrame({
+        "count": grouped.size(),
+        "p90": grouped["net"].quantile(0.9),
+        "p10": grouped["net"].quantile(0.1),
+        "mean_abs": grouped["abs_net"].mean(),
+        "current": history[history["rn"] == 1].set_index("market_id")["net"],
+        "report_date": history[history["rn"] == 1].set_index("market_id")["report_date"],
+        "previous": history[history["rn"] == 2].set_index("market_id")["net"],
+    })
+    stats = stats[stats["count"] >= MIN_HISTORY]
+    stats["change"] = stats["current"] - stats["previous"]
+
+    # Only markets that trip at least one rule need their Market row and messages
+    flagged = stats[
+        (stats["current"] > stats["p90"])
+        | (stats["current"] < stats["p10"])
+        | (stats["change"].abs() > 0.10 * stats["mean_abs"])
+    ]
+    if flagged.empty:
+        return {"created": 0, "skipped": 0}
+
+    names = dict(db.query(Market.id, Market.name).filter(Market.id.in_(flagged.index.tolist())).all())
+
+    now = datetime.now()
+    records = []
+    for market_id, s in flagged.iterrows():
+        change = None if pd.isna(s["change"]) else int(s["change"])
+        for alert_type, message, value in evaluate_alerts(
+            names[market_id], int(s["current"]), s["p90"], s["p10"], change, s["mean_abs"]
+        ):
+            records.append(alert_record(market_id, s["report_date"], alert_type, message, value, now))
+
+    counts = write_alerts(db, records)
+    db.commit()
+    return counts
+
+def backfill_alerts(db: Session, market_ids=None) -> dict[str, int]:
+    """
+    Replays the alert rules over each market's full COT history in one pass.
+    A RollingPercentile over the last HISTORY_WINDOW reports is updated as each
+    report enters and leaves the window, so every report is evaluated exactly as
+    generate_alerts would have on its date without re-sorting the window.
+    Alerts are timestamped with their report date and inserted in bulk,
+    skipping any that already exist. Returns {"created": n, "skipped": n}.
+    """
+    net = (COTReport.largeSpec_long_positions - COTReport.largeSpec_short_positions).label("net")
+    query = select(COTReport.market_id, COTReport.report_date, net).order_by(COTReport.market_id, COTReport.report_date)
+    if market_ids is not None:
+        query = query.where(COTReport.market_id.in_(market_ids))
+    history = pd.DataFrame(db.execute(query).all(), columns=["market_id", "report_date", "net"])
+    if history.empty:
+        return {"created": 0, "skipped": 0}
+
+    names = dict(db.query(Market.id, Market.name).filter(Market.id.in_(history["market_id"].unique().tolist())).all())
+
+    records = []
+    for market_id, reports in history.groupby("market_id", sort=False):
+        nets = reports["net"].tolist()
+        report_dates = reports["report_date"].tolist()
+        window = RollingPercentile(nets)
+        abs_total = 0
+
+        for i, current_net_position in enumerate(nets):
+            window.add(current_net_position)
+            abs_total += abs(current_net_position)
+            if i >= HISTORY_WINDOW:
+                window.remove(nets[i - HISTORY_WINDOW])
+                abs_total -= abs(nets[i - HISTORY_WINDOW])
+            if window.size < MIN_HISTORY:
+                continue
+
+            for alert_type, message, value in evaluate_alerts(
+                names[market_id],
+                current_net_position,
+                window.percentile(90),
+                window.percentile(10),
+                current_net_position - nets[i - 1] if i > 0 else None,
+                abs_total / window.size,
+            ):
+                records.append(alert_record(
+                    market_id, report_dates[i], alert_type, message, value,
+                    datetime.combine(report_dates[i], time.min),
+                ))
+
+    counts = write_alerts(db, records)
+    db.commit()
+    return counts
+
+def alert_record(market_id: int, report_date, alert_type: str, message: str, value, timestamp: datetime) -> dict:
+    """Row for the alerts table; (market_id, alert_type, report_date) is its identity."""
+    return {
+        "timestamp": timestamp,
+        "market_id": int(market_id),
+        "alert_type": alert_type,
+        "report_date": report_date,
+        "message": message,
+        "value": float(value),
+    }
+
+def write_alerts(db: Session, records: list[dict]) -> dict[str, int]:
+    """
+    Inserts the alerts that don't exist yet in one statement, relying on the
+    (market_id, alert_type, report_date) unique index instead of per-alert lookups.
+    Stages the insert, and an event per market with the new alerts for push
+    subscribers, in the caller's transaction; nothing is committed here.
+    Returns {"created": n, "skipped": n}.
+    """
+    inserted = insert_ignore(
+        db, Alert, records,
+        conflict_columns=["market_id", "alert_type", "report_date"],
+        returning=[Alert.id, Alert.market_id, Alert.timestamp, Alert.alert_type, Alert.report_date, Alert.message, Alert.value],
+    )
+    if inserted:
+        bump_versions(db, ["alerts"])
+
+    deltas = {}
+    for alert_id, market_id, timestamp, alert_type, report_date, message, value in inserted:
+        deltas.setdefault(market_id, []).append({
+            "id": alert_id,
+            "timestamp": timestamp.isoformat(),
+            "alert_type": alert_type,
+            "report_date": report_date.isoformat() if report_date else None,
+            "message": message,
+            "value": value,
+        })
+    publish_events(db, "alerts", deltas, date_key="timestamp")
+    return {"created": len(inserted), "skipped": len(records) - len(inserted)}
 
 if __name__ == "__main__":
     # Example usage (for testing purposes)
@@ -95,4 +261,4 @@ if __name__ == "__main__":
         # Replace 'BITCOIN' with the actual market name you want to test
         generate_alerts(db, "BITCOIN")
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,13 +1,24 @@
-import requests
+import argparse
+import csv
 import io
+import itertools
+import os
 import zipfile
 import pandas as pd
+from contextlib import contextmanager
 from datetime import datetime
 from sqlalchemy.orm import Session
-from db import SessionLocal, engine, Base
+from db import SessionLocal, engine
 import models
-from utils.markets import resolve_market
-from generate_alerts import generate_alerts
+from utils.markets import MarketResolver
+from utils.cot_archive import CotArchive, DEFAULT_CACHE_DIR
+from utils.bulk import insert_ignore
+from utils.checkpoints import clear_checkpoints, commit_chunk, load_checkpoints, save_checkpoint
+from utils.events import publish_events
+from utils.versions import bump_versions, cot_scope, market_scope
+from migrations import run_migrations
+from generate_alerts import generate_alerts_batch
+from metrics import update_metrics
 from utils.market_mapping import COT_TO_CANONICAL
 
 def clean_columns(df):
@@ -19,87 +30,207 @@ def clean_columns(df):
     )
     return df
 
-def download_cot_file(year) -> pd.DataFrame:
-    url = f"https://www.cftc.gov/files/dea/history/deacot{year}.zip"
-    r = requests.get(url)
-    r.raise_for_status()
-
-    with zipfile.ZipFile(io.BytesIO(r.content)) as zf:
+# Columns we keep from annual.txt, mapped onto COTReport fields
+COT_COLUMNS = {
+    "Commercial_Positions_Long_All": "comms_long_positions",
+    "Commercial_Positions_Short_All": "comms_short_positions",
+    "Noncommercial_Positions_Long_All": "largeSpec_long_positions",
+    "Noncommercial_Positions_Short_All": "largeSpec_short_positions",
+    "Nonreportable_Positions_Long_All": "smallSpec_long_positions",
+    "Nonreportable_Positions_Short_All": "smallSpec_short_positions",
+}
+
+# File lines read, stored and committed at a time by backfills
+COT_CHUNK_ROWS = 50_000
+
+# (cleaned) columns read from the legacy report and their dtypes; everything else is skipped
+LEGACY_COT_DTYPES = {
+    "Market_and_Exchange_Names": "object",
+    "As_of_Date_in_Form_YYYY_MM_DD": "object",
+    "CFTC_Contract_Market_Code_Quotes": "category",
+    **{column: "int32" for column in COT_COLUMNS},
+}
+
+@contextmanager
+def open_cot_file(year, archive: CotArchive = None, path: str = None):
+    """annual.txt from the year's archive, or from the zip at path if already fetched."""
+    path = path or (archive or CotArchive()).path(year)
+
+    with zipfile.ZipFile(path) as zf:
         with zf.open("annual.txt") as f:
-            df = pd.read_csv(f, sep=",", header=0)  
-            df = clean_columns(df)
-
-    return df
-
-def ingest_cot(year): 
-    Base.metadata.create_all(bind=engine)
-
-    df = download_cot_file(year)
+            yield io.TextIOWrapper(f, encoding="utf-8")
+
+def iter_cot_batches(f, columns: dict = LEGACY_COT_DTYPES, markets=COT_TO_CANONICAL.keys(), chunksize: int = COT_CHUNK_ROWS):
+    """
+    Streams a CFTC report file in chunks, parsing only the given (cleaned) columns
+    with compact dtypes and keeping only rows for markets we map.
+    Works for the legacy, disaggregated and TFF files, which share the
+    Market_and_Exchange_Names column. Yields frames with cleaned column names.
+    """
+    header = next(csv.reader([f.readline()]))
+    cleaned = clean_columns(pd.DataFrame(columns=header)).columns
+    raw_names = dict(zip(cleaned, header))
+
+    missing = [c for c in columns if c not in raw_names]
+    if missing:
+        raise ValueError(f"COT file is missing columns: {missing}")
+
+    reader = pd.read_csv(
+        f,
+        header=None,
+        names=header,
+        usecols=[raw_names[c] for c in columns],
+        dtype={raw_names[c]: dtype for c, dtype in columns.items()},
+        chunksize=chunksize,
+    )
+    markets = set(markets)
+    for chunk in reader:
+        chunk = chunk.rename(columns={raw: c for c, raw in raw_names.items()})
+        names = chunk["Market_and_Exchange_Names"].str.strip()
+        chunk = chunk.loc[names.isin(markets)]
+        if not chunk.empty:
+            yield chunk.assign(Market_and_Exchange_Names=names.loc[chunk.index])
+
+def store_cot_frame(db: Session, df: pd.DataFrame, resolver: MarketResolver = None) -> dict[str, int]:
+    """
+    Bulk-stores the rows of a cleaned COT frame for markets in COT_TO_CANONICAL.
+    Markets are resolved once per contract and all rows go in with one
+    insert-on-conflict-do-nothing, so reports already stored are skipped by
+    the (market_id, report_date) unique index rather than a pre-check.
+    Data versions of markets that received rows are bumped, and their new reports
+    published to push subscribers, in the same transaction.
+    Returns the number of new rows stored per market name.
+    """
+    resolver = resolver or MarketResolver(db)
+    names = df["Market_and_Exchange_Names"].str.strip()
+    df = df.loc[names.isin(COT_TO_CANONICAL.keys())].copy()
+    if df.empty:
+        return {}
+
+    df["Market_and_Exchange_Names"] = names
+    df["report_date"] = pd.to_datetime(df["As_of_Date_in_Form_YYYY_MM_DD"]).dt.date
+
+    # Resolve each distinct contract once instead of once per row
+    contracts = df.drop_duplicates("Market_and_Exchange_Names")
+    market_names = {}
+    for market_name, symbol in zip(contracts["Market_and_Exchange_Names"], contracts["CFTC_Contract_Market_Code_Quotes"]):
+        market = resolver.resolve(
+                                source="cot",
+                                source_symbol=market_name,                     # full verbose COT name
+                                canonical_name=COT_TO_CANONICAL[market_name],  # e.g. "BTC"
+                                symbol=str(symbol).strip()
+                            )
+        market_names[market.id] = market_name
+    df["market_id"] = df["Market_and_Exchange_Names"].map({name: market_id for market_id, name in market_names.items()})
+
+    records = (
+        df[["market_id", "report_date", *COT_COLUMNS]]
+        .rename(columns=COT_COLUMNS)
+        .to_dict("records")
+    )
+    position_columns = [getattr(models.COTReport, column) for column in COT_COLUMNS.values()]
+    inserted = insert_ignore(
+        db, models.COTReport, records,
+        conflict_columns=["market_id", "report_date"],
+        returning=[models.COTReport.market_id, models.COTReport.report_date, *position_columns],
+    )
 
-    previousMarketId = -1
-    count = 0
+    stored = {}
+    deltas = {}
+    for market_id, report_date, *positions in inserted:
+        stored[market_names[market_id]] = stored.get(market_names[market_id], 0) + 1
+        deltas.setdefault(market_id, []).append({
+            "report_date": report_date.isoformat(),
+            **{column.key: value for column, value in zip(position_columns, positions)},
+        })
+    touched = set(deltas)
+    bump_versions(db, {market_scope(market_id) for market_id in touched} | {cot_scope(market_id) for market_id in touched})
+    publish_events(db, "cot", deltas, date_key="report_date")
+    return stored
+
+def backfill_cot_year(db: Session, year: int, archive: CotArchive = None, chunk_rows: int = COT_CHUNK_ROWS) -> dict[str, int]:
+    """
+    Stores a year's reports chunk_rows file lines at a time, committing each
+    batch with its positioning metrics and a checkpoint (source "cot", key
+    year, position = batches stored). A rerun skips the batches already
+    stored, or the whole year once complete; a changed archive for the year
+    (e.g. the current year re-downloaded) is read again from the start.
+    Returns the number of new rows stored per market name.
+    """
+    path = (archive or CotArchive()).path(year)
+    version = f"{os.path.basename(path)}/{chunk_rows}"
+    checkpoint = load_checkpoints(db, "cot").get(str(year))
+    if checkpoint is None or checkpoint.version != version:
+        done, rows = 0, 0
+    elif checkpoint.complete:
+        print(f"{year} already ingested ({checkpoint.rows} rows).")
+        return {}
+    else:
+        done, rows = int(checkpoint.position), checkpoint.rows
+        print(f"Resuming {year} after {done} batches.")
+
+    stored = {}
+    with open_cot_file(year, path=path) as f:
+        for batch in itertools.islice(iter_cot_batches(f, chunksize=chunk_rows), done, None):
+            # A fresh resolver per batch: commit_chunk detaches the markets it holds
+            resolver = MarketResolver(db)
+            counts = store_cot_frame(db, batch, resolver)
+            for market_name, count in counts.items():
+                stored[market_name] = stored.get(market_name, 0) + count
+            # Derived metrics for the new reports go in the same transaction
+            market_ids = [resolver.resolve("cot", name, COT_TO_CANONICAL[name]).id for name in counts]
+            metrics = update_metrics(db, market_ids=market_ids) if market_ids else {}
+            done += 1
+            rows += sum(counts.values())
+            save_checkpoint(db, "cot", str(year), position=str(done), rows=rows, version=version)
+            commit_chunk(db)
+            print(f"Batch {done}: {sum(counts.values())} rows, metrics for {sum(metrics.values())} reports.")
+
+    save_checkpoint(db, "cot", str(year), position=str(done), rows=rows, version=version, complete=True)
+    db.commit()
+    return stored
+
+def ingest_cot(year, archive: CotArchive = None, restart: bool = False, chunk_rows: int = COT_CHUNK_ROWS):
+    run_migrations(engine)
 
     db: Session = SessionLocal()
     try:
-        for _, row in df.iterrows():
-            market_name = row["Market_and_Exchange_Names"].strip()
-            canonical_name = COT_TO_CANONICAL.get(market_name, market_name)
-            symbol = row["CFTC_Contract_Market_Code_Quotes"].strip()
-            report_Date = pd.to_datetime(row["As_of_Date_in_Form_YYYY_MM_DD"])
-
-            # Prefer resolving by symbol, but also pass canonical for aliasing
-            market = resolve_market(
-                                    db,
-                                    source="cot",
-                                    source_symbol=market_name,                 # full verbose COT name
-                                    canonical_name=canonical_name,             # e.g. "Bitcoin Futures"
-                                    symbol=symbol
-                                )
-
-            existing = db.query(models.COTReport).filter_by(market_id=market.id, report_date=report_Date).first()
-
-            if not existing:
-                report = models.COTReport(
-                    market_id=market.id,
-                    report_date=report_Date,
-                    comms_long_positions=row["Commercial_Positions_Long_All"],
-                    comms_short_positions=row["Commercial_Positions_Short_All"],
-                    largeSpec_long_positions=row["Noncommercial_Positions_Long_All"],
-                    largeSpec_short_positions=row["Noncommercial_Positions_Short_All"],
-                    smallSpec_long_positions=row["Nonreportable_Positions_Long_All"],
-                    smallSpec_short_positions=row["Nonreportable_Positions_Short_All"],
-                )
-                db.add(report)
-                count += 1
-
-            if previousMarketId == -1:
-                previousMarketId = market.id
-
-            if previousMarketId != market.id:
-                print(f"Stored {count} rows for {market_name}.")
-                previousMarketId = market.id
-                count = 0    
-
-        db.commit()
+        if restart:
+            clear_checkpoints(db, "cot", str(year))
+        stored = backfill_cot_year(db, year, archive, chunk_rows)
+
+        for market_name, count in stored.items():
+            print(f"Stored {count} rows for {market_name}.")
         print("COT ingestion complete")
 
     except Exception as e:
         db.rollback()
-        print("Error occurred, rolling back:", e)
+        print("Error occurred, rolling back the batch in progress:", e)
 
     finally:
         db.close()
 
 
 if __name__ == "__main__":
-    current_year = datetime.now().year
-    for year in range(2023, current_year + 1):
+    parser = argparse.ArgumentParser(description="Ingest CFTC legacy COT reports")
+    parser.add_argument("--from-year", type=int, default=2023)
+    parser.add_argument("--cache-dir", help="COT archive cache directory (default: COT_CACHE_DIR or backend/.cot_cache)")
+    parser.add_argument("--offline", action="store_true", help="only read archives already in the cache directory")
+    parser.add_argument("--chunk-rows", type=int, default=COT_CHUNK_ROWS, help="file lines per committed batch")
+    parser.add_argument("--restart", action="store_true", help="ignore checkpoints and ingest every year from the start")
+    args = parser.parse_args()
+
+    archive = CotArchive(args.cache_dir or DEFAULT_CACHE_DIR, offline=args.offline)
+    years = range(args.from_year, datetime.now().year + 1)
+    archive.fetch_years(years)
+
+    for year in years:
         print(f"\n=== Ingesting COT data for {year} ===")
-        ingest_cot(year)
+        ingest_cot(year, archive, restart=args.restart, chunk_rows=args.chunk_rows)
 
     db: Session = SessionLocal()
     try:
-        for market_name in COT_TO_CANONICAL.values():
-            generate_alerts(db, market_name)
+        counts = generate_alerts_batch(db)
+        print(f"Alerts: {counts['created']} created, {counts['skipped']} already present.")
     finally:
         db.close()
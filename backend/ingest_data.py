@@ -3,21 +3,29 @@ from datetime import datetime
 from db import SessionLocal
 from ingest_yahoo import ingest_yahoo
 from ingest_cot import ingest_cot
-from generate_alerts import generate_alerts
-from generate_alerts import generate_alerts
-from utils.market_mapping import COT_TO_CANONICAL
+from generate_alerts import generate_alerts_batch
+from snapshots import export_snapshots, snapshots_available
+from utils.cot_archive import CotArchive
 
 if __name__ == "__main__":
     ingest_yahoo()
 
-    current_year = datetime.now().year
-    for year in range(2023, current_year + 1):
+    archive = CotArchive()
+    years = range(2023, datetime.now().year + 1)
+    archive.fetch_years(years)
+
+    for year in years:
         print(f"\n=== Ingesting COT data for {year} ===")
-        ingest_cot(year)
+        ingest_cot(year, archive)
 
     db: Session = SessionLocal()
     try:
-        for market_name in COT_TO_CANONICAL.values():
-            generate_alerts(db, market_name)
+        counts = generate_alerts_batch(db)
+        print(f"Alerts: {counts['created']} created, {counts['skipped']} already present.")
+        if snapshots_available():
+            written = export_snapshots(db)
+            print(f"Snapshots: {written['prices']} price and {written['cot']} COT files written.")
+        else:
+            print("Snapshots: skipped, pyarrow is not installed.")
     finally:
         db.close()
\ No newline at end of file
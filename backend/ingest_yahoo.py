@@ -1,61 +1,211 @@
-import yfinance as yf
-from datetime import date
+import argparse
+import pandas as pd
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from db import SessionLocal, Base, engine
+from db import SessionLocal, engine
 from models import Price, Market
-from utils.markets import resolve_market
-from generate_alerts import generate_alerts
+from utils.markets import MarketResolver
+from utils.bulk import insert_ignore
+from utils.checkpoints import clear_checkpoints, commit_chunk, load_checkpoints, save_checkpoint
+from utils.events import publish_events
+from utils.versions import bump_versions, market_scope, prices_scope
+from migrations import run_migrations
+from utils.price_sources import YahooPriceSource, CsvPriceSource
+from generate_alerts import generate_alerts_batch
+from overlays import update_overlays
 from utils.market_mapping import YAHOO_TO_CANONICAL
 
-def fetch_and_store_market_data(session: Session, marketName):
-    print(f"Fetching data for {marketName}...")
-
-    canonical = YAHOO_TO_CANONICAL.get(marketName, marketName)
-    market_obj = resolve_market(session, "yahoo", marketName, canonical_name=canonical)
-    
-    today = date.today().strftime("%Y-%m-%d")
-    data = yf.download(marketName, start="2023-01-01", end=today)
-
-    count = 0
-    
-    for timestamp, row in data.iterrows():
-        existing = session.query(Price).filter_by(market_id=market_obj.id, timestamp=timestamp).first()
-        if not existing:
-            price_entry = Price(
-                market_id=market_obj.id,
-                timestamp=timestamp,
-                price = row["Close"].item()
-            )
-            session.add(price_entry)
-            count += 1
-    
-    print(f"Stored {count} rows for {marketName}.")
-
-def ingest_yahoo():
+# First date fetched for a market with no stored prices
+DEFAULT_START = date(2023, 1, 1)
+
+# Days of history fetched and committed at a time by backfills
+BACKFILL_CHUNK_DAYS = 365
+
+def last_price_timestamps(session: Session, market_ids) -> dict[int, datetime]:
+    """
+    Latest stored Price.timestamp for each market, in a single grouped query.
+    """
+    rows = (
+        session.query(Price.market_id, func.max(Price.timestamp))
+        .filter(Price.market_id.in_(market_ids))
+        .group_by(Price.market_id)
+        .all()
+    )
+    return {market_id: timestamp for market_id, timestamp in rows}
+
+def _optional_price(value):
+    return None if pd.isna(value) else float(value)
+
+def sync_prices(session: Session, source=None, tickers=None, end: date = None, resolver: MarketResolver = None, start: date = None) -> dict[str, int]:
+    """
+    Fetches only the bars missing since each market's last stored price, for all
+    tickers in one batched source call, and bulk-inserts them. Bars that are
+    already stored are skipped by the (market_id, timestamp) unique index.
+    Data versions of markets that received bars are bumped, and their new bars
+    published to push subscribers, in the same transaction.
+    source: any object with fetch(tickers, start, end) -> {ticker: DataFrame}
+    start: fetch every ticker from this date instead (backfills), e.g. to fill
+    history older than what is stored.
+    Returns the number of new rows stored per ticker.
+    """
+    source = source or YahooPriceSource()
+    resolver = resolver or MarketResolver(session)
+    tickers = list(tickers or YAHOO_TO_CANONICAL.keys())
+    end = end or date.today()
+
+    markets = {
+        ticker: resolver.resolve("yahoo", ticker, canonical_name=YAHOO_TO_CANONICAL.get(ticker, ticker))
+        for ticker in tickers
+    }
+    last_stored = {} if start else last_price_timestamps(session, {m.id for m in markets.values()})
+
+    starts = {}
+    for ticker, market in markets.items():
+        last = last_stored.get(market.id)
+        ticker_start = start or (last.date() + timedelta(days=1) if last else DEFAULT_START)
+        if ticker_start < end:
+            starts[ticker] = ticker_start
+
+    if not starts:
+        return {}
+
+    frames = source.fetch(list(starts), start=min(starts.values()), end=end)
+
+    tickers_by_market = {}
+    records = []
+    for ticker, frame in frames.items():
+        if ticker not in starts:
+            continue
+        frame = frame[frame.index >= pd.Timestamp(starts[ticker])]
+        market_id = markets[ticker].id
+        tickers_by_market[market_id] = ticker
+        bars = frame.reindex(columns=["Open", "High", "Low", "Close"])
+        records.extend(
+            {
+                "market_id": market_id,
+                "timestamp": timestamp.to_pydatetime(),
+                "open": _optional_price(open_),
+                "high": _optional_price(high),
+                "low": _optional_price(low),
+                "price": float(close),
+            }
+            for timestamp, open_, high, low, close in bars.itertuples()
+        )
+
+    inserted = insert_ignore(
+        session, Price, records,
+        conflict_columns=["market_id", "timestamp"],
+        returning=[Price.market_id, Price.timestamp, Price.open, Price.high, Price.low, Price.price],
+    )
+
+    stored = {}
+    deltas = {}
+    for market_id, timestamp, open_, high, low, close in inserted:
+        stored[tickers_by_market[market_id]] = stored.get(tickers_by_market[market_id], 0) + 1
+        deltas.setdefault(market_id, []).append(
+            {"date": timestamp.isoformat(), "open": open_, "high": high, "low": low, "close": close}
+        )
+    bump_versions(session, {market_scope(market_id) for market_id in deltas} | {prices_scope(market_id) for market_id in deltas})
+    publish_events(session, "prices", deltas, date_key="date")
+    return stored
+
+def backfill_prices(session: Session, source=None, tickers=None, start: date = DEFAULT_START, end: date = None,
+                    chunk_days: int = BACKFILL_CHUNK_DAYS) -> dict[str, int]:
+    """
+    Loads prices from start to end (exclusive) in windows of chunk_days, each
+    fetched for all tickers at that point in one source call and committed with
+    its overlays and a per-ticker checkpoint (source "yahoo", position = date of
+    the last bar stored). A rerun resumes every ticker after its checkpoint, so
+    a failure only loses the chunk in progress.
+    A window that returns no bars for a ticker with stored history (a failed or
+    throttled fetch) freezes its checkpoint for the rest of the run, so the next
+    run fetches that window again instead of leaving a gap.
+    Returns the number of new rows stored per ticker.
+    """
+    tickers = list(tickers or YAHOO_TO_CANONICAL.keys())
+    end = end or date.today()
+    resolver = MarketResolver(session)
+    market_ids = {
+        ticker: resolver.resolve("yahoo", ticker, canonical_name=YAHOO_TO_CANONICAL.get(ticker, ticker)).id
+        for ticker in tickers
+    }
+    session.flush()  # new aliases must be visible to the resolvers of each chunk
+    checkpoints = load_checkpoints(session, "yahoo")
+    last_stored = last_price_timestamps(session, market_ids.values())
+
+    progress = {}
+    for ticker in tickers:
+        last = last_stored.get(market_ids[ticker])
+        if ticker in checkpoints and last is not None:
+            # Checkpoints never run ahead of the stored bars
+            resume = min(date.fromisoformat(checkpoints[ticker].position), last.date())
+            progress[ticker] = resume + timedelta(days=1)
+        else:
+            progress[ticker] = start
+    rows = {ticker: checkpoints[ticker].rows if ticker in checkpoints else 0 for ticker in tickers}
+    stored = {}
+    gaps = set()
+
+    while True:
+        pending = {ticker: next_start for ticker, next_start in progress.items() if next_start < end}
+        if not pending:
+            return stored
+        window_start = min(pending.values())
+        window_end = min(window_start + timedelta(days=chunk_days), end)
+        due = [ticker for ticker, next_start in pending.items() if next_start == window_start]
+
+        resolver = MarketResolver(session)
+        counts = sync_prices(session, source=source, tickers=due, start=window_start, end=window_end, resolver=resolver)
+        overlays = update_overlays(session, market_ids=[market_ids[ticker] for ticker in due])
+        last_stored = last_price_timestamps(session, [market_ids[ticker] for ticker in due])
+        for ticker in due:
+            progress[ticker] = window_end
+            rows[ticker] += counts.get(ticker, 0)
+            stored[ticker] = stored.get(ticker, 0) + counts.get(ticker, 0)
+            last = last_stored.get(market_ids[ticker])
+            if last is None or ticker in gaps:
+                continue
+            if last.date() < window_start:
+                print(f"No bars for {ticker} from {window_start}; its checkpoint stays at {last.date()}.")
+                gaps.add(ticker)
+                continue
+            save_checkpoint(session, "yahoo", ticker, position=last.date().isoformat(),
+                            rows=rows[ticker], complete=window_end >= end)
+        commit_chunk(session)
+        print(f"{window_start} to {window_end - timedelta(days=1)}: {sum(counts.values())} rows for {len(due)} tickers, "
+              f"overlays for {sum(overlays.values())} bars.")
+
+def ingest_yahoo(source=None, restart: bool = False, chunk_days: int = BACKFILL_CHUNK_DAYS):
     session = SessionLocal()
 
-    #Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
 
     try:
-        for market in YAHOO_TO_CANONICAL.keys():
-            print(f"Trying {market}")
-            fetch_and_store_market_data(session, market)
-        session.commit()
+        if restart:
+            clear_checkpoints(session, "yahoo")
+        stored = backfill_prices(session, source=source, chunk_days=chunk_days)
+        for ticker, count in stored.items():
+            print(f"Stored {count} rows for {ticker}.")
         print("All data committed successfully.")
     except Exception as e:
         session.rollback()
-        print("Error occurred, rolling back:", e)
+        print("Error occurred, rolling back the chunk in progress:", e)
     finally:
         session.close()
 
 if __name__ == "__main__":
-    ingest_yahoo()
+    parser = argparse.ArgumentParser(description="Backfill daily prices in checkpointed chunks")
+    parser.add_argument("prices_dir", nargs="?", help="directory of <ticker>.csv files to ingest instead of Yahoo")
+    parser.add_argument("--chunk-days", type=int, default=BACKFILL_CHUNK_DAYS, help="days of history per committed chunk")
+    parser.add_argument("--restart", action="store_true", help="ignore checkpoints and backfill from the start again")
+    args = parser.parse_args()
+
+    ingest_yahoo(CsvPriceSource(args.prices_dir) if args.prices_dir else None, restart=args.restart, chunk_days=args.chunk_days)
 
     session = SessionLocal()
     try:
-        for market in YAHOO_TO_CANONICAL.keys():
-            canonical_name = YAHOO_TO_CANONICAL.get(market, market)
-            generate_alerts(session, canonical_name, identifier_type="symbol")
+        counts = generate_alerts_batch(session)
+        print(f"Alerts: {counts['created']} created, {counts['skipped']} already present.")
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
@@ -1,12 +1,48 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+import numpy as np
+from typing import Literal, Optional
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from db import SessionLocal, engine, Base
+from db import AsyncSessionLocal, SessionLocal, engine, offload
 import models
+from migrations import run_migrations
+from alert_feed import FEED_MAX_PAGE_SIZE, FEED_PAGE_SIZE, decode_cursor, load_alert_feed
+from backtest import DEFAULT_HORIZONS, parse_condition, run_backtest, shutdown_executor
+from basket import basket_to_columns, load_basket, point_values_for
+from screener import screen_markets
+from series import (
+    COT_FIELDS,
+    OVERLAY_FIELDS,
+    aligned_to_columns,
+    downsample_series,
+    load_aligned_series,
+    load_market_series,
+    series_to_columns,
+    series_to_records,
+)
+from utils.cache import cache_from_env
+from utils.compression import CompressionMiddleware
+from utils.encoding import ARROW_STREAM, MSGPACK, arrow_stream, msgpack_bytes, preferred_binary_type
+from utils.events import EventHub, sse_message
 from utils.market_mapping import CANONICAL_TO_NAME
+from utils.versions import cot_scope, get_versions, market_scope
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Backtest scan workers are started lazily; stop them with the server
+    shutdown_executor()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS (keep this!)
 app.add_middleware(
@@ -17,8 +53,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Make sure tables exist
-Base.metadata.create_all(bind=engine)
+# gzip, or brotli when installed and accepted, for everything but streams
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Make sure the schema is up to date
+run_migrations(engine)
+
+# Encoded responses keyed by request + data versions; ingest jobs bump the versions
+response_cache = cache_from_env()
 
 # backend/mappings.py
 MARKET_MAPPING = {
@@ -28,12 +70,32 @@ MARKET_MAPPING = {
     "ETH": "ETH-USD"
 }
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def run_db(handler):
+    """
+    Calls handler(db) with a session and returns its result. With DB_ASYNC set
+    the handler runs through AsyncSession.run_sync: its queries are awaited on
+    the async engine, so requests waiting on the database don't each hold a
+    thread, and the array building and encoding it passes to db.offload run in
+    the thread pool. Otherwise the whole handler runs on a pooled connection in
+    the thread pool.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(handler)
+
+    def call():
+        db = SessionLocal()
+        try:
+            return handler(db)
+        finally:
+            db.close()
+
+    return await run_in_threadpool(call)
+
+# Push channel: new rows from the data_events outbox, fanned out to /events streams
+EVENT_POLL_SECONDS = float(os.getenv("EVENT_POLL_SECONDS", "2"))
+EVENT_HEARTBEAT_SECONDS = 15
+event_hub = EventHub(run_db, poll_interval=EVENT_POLL_SECONDS)
 
 
 @app.get("/")
@@ -41,121 +103,415 @@ def root():
     return {"message": "Backend is running with Postgres"}
 
 @app.get("/markets")
-def get_markets(db: Session = Depends(get_db)):
-    markets = db.query(models.Market.name, models.Market.asset_class).filter(models.Market.symbol.in_(CANONICAL_TO_NAME.keys())).all()
-    return {"markets": [{"name": m[0], "asset_class": m[1]} for m in markets]}
+async def get_markets(request: Request):
+    def handle(db: Session):
+        def build():
+            markets = db.query(models.Market.name, models.Market.asset_class).filter(models.Market.symbol.in_(CANONICAL_TO_NAME.keys())).all()
+            return {"markets": [{"name": m[0], "asset_class": m[1]} for m in markets]}
+
+        return response_cache.respond(request, get_versions(db, ["markets"]), build)
+
+    return await run_db(handle)
+
+def series_response(request: Request, series: dict, format: str):
+    """
+    Encodes a market series for the client: Arrow IPC or MessagePack when the
+    Accept header asks for them, otherwise JSON as rows (one dict per bar) or
+    columnar (one array per field).
+    """
+    media_type = preferred_binary_type(request.headers.get("accept"))
+    if media_type == ARROW_STREAM:
+        no_cot = series["cotIndex"] < 0
+        columns = {"date": series["date"], "price": series["price"], **{f: series[f] for f in COT_FIELDS}}
+        nulls = {f: no_cot for f in COT_FIELDS}
+        for field in OVERLAY_FIELDS:
+            if field in series:
+                columns[field] = series[field]
+                nulls[field] = np.isnan(series[field])
+        return Response(arrow_stream(columns, nulls), media_type=ARROW_STREAM)
+    if media_type == MSGPACK:
+        return Response(msgpack_bytes(series_to_columns(series)), media_type=MSGPACK)
+    if format == "columnar":
+        return series_to_columns(series)
+    return series_to_records(series)
 
 @app.get("/data/{market_name}")
-def get_market_data(market_name: str, db: Session = Depends(get_db)):
-    # Find market row by name
-    market_row = (
-        db.query(models.Market)
-        .filter(models.Market.name.ilike(market_name))
-        .first()
-    )
-    if not market_row:
-        raise HTTPException(status_code=404, detail=f"Market '{market_name}' not found")
-
-    # Get prices
-    prices = (
-        db.query(models.Price)
-        .filter(models.Price.market_id == market_row.id)
-        .order_by(models.Price.timestamp)
-        .all()
-    )
+async def get_market_data(
+    market_name: str,
+    request: Request,
+    format: Literal["rows", "columnar"] = "rows",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: Optional[int] = Query(None, gt=0),
+    max_points: Optional[int] = Query(None, ge=3),
+    overlays: bool = False,
+):
+    def handle(db: Session):
+        # Find market row by name
+        market_row = (
+            db.query(models.Market)
+            .filter(models.Market.name.ilike(market_name))
+            .first()
+        )
+        if not market_row:
+            raise HTTPException(status_code=404, detail=f"Market '{market_name}' not found")
 
-    # Get COT reports
-    reports = (
-        db.query(models.COTReport)
-        .filter(models.COTReport.market_id == market_row.id)
-        .order_by(models.COTReport.report_date)
-        .all()
-    )
+        def build():
+            # Prices with the latest COT report as of each bar, joined without ORM objects
+            series = load_market_series(db, market_row.id, start=start, end=end, limit=limit, overlays=overlays)
+            if max_points:
+                series = offload(downsample_series, series, max_points)
+            return offload(series_response, request, series, format)
 
-    # Convert reports into a dict for quick lookup by date
-    reports_by_date = {
-        r.report_date.isoformat(): r for r in reports
-    }
-
-    # Merge: for each price point, attach COT if available
-    result = []
-    for p in prices:
-        cot = reports_by_date.get(p.timestamp.date().isoformat())
-        result.append(
-            {
-                "date": p.timestamp.isoformat(),
-                "price": p.price,
-                "largeSpecLong": cot.largeSpec_long_positions if cot else None,
-                "largeSpecShort": cot.largeSpec_short_positions if cot else None,
-                "smallSpecLong": cot.smallSpec_long_positions if cot else None,
-                "smallSpecShort": cot.smallSpec_short_positions if cot else None,
-                "commsLong": cot.comms_long_positions if cot else None,
-                "commsShort": cot.comms_short_positions if cot else None,
-            }
+        return response_cache.respond(
+            request,
+            get_versions(db, [market_scope(market_row.id)]),
+            build,
+            vary=preferred_binary_type(request.headers.get("accept")) or "json",
         )
-    return result
 
-from typing import Optional
+    return await run_db(handle)
+
+def aligned_response(request: Request, aligned: dict, names: dict[int, str]):
+    """
+    Encodes several markets on a shared date axis. Arrow IPC flattens the
+    columns to "<market>.<field>"; MessagePack and JSON use the nested columnar
+    layout from aligned_to_columns.
+    """
+    media_type = preferred_binary_type(request.headers.get("accept"))
+    if media_type == ARROW_STREAM:
+        columns, nulls = {"date": aligned["date"]}, {}
+        for market_id, series in aligned["markets"].items():
+            no_cot = series["cotIndex"] < 0
+            columns[f"{names[market_id]}.price"] = series["price"]
+            nulls[f"{names[market_id]}.price"] = np.isnan(series["price"])
+            for field in COT_FIELDS:
+                columns[f"{names[market_id]}.{field}"] = series[field]
+                nulls[f"{names[market_id]}.{field}"] = no_cot
+        return Response(arrow_stream(columns, nulls), media_type=ARROW_STREAM)
+    if media_type == MSGPACK:
+        return Response(msgpack_bytes(aligned_to_columns(aligned, names)), media_type=MSGPACK)
+    return aligned_to_columns(aligned, names)
+
+@app.get("/data")
+async def get_markets_data(
+    request: Request,
+    markets: list[str] = Query(..., min_length=1),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    """
+    Several markets (e.g. ?markets=Gold Futures (COMEX)&markets=Silver Futures (COMEX))
+    aligned on one date axis, from a single batched query per table.
+    """
+    def handle(db: Session):
+        requested = {m.lower(): m for m in markets}
+        market_rows = (
+            db.query(models.Market.id, models.Market.name)
+            .filter(func.lower(models.Market.name).in_(requested.keys()))
+            .all()
+        )
+        found = {name.lower(): (market_id, name) for market_id, name in market_rows}
+        missing = [m for key, m in requested.items() if key not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Markets not found: {', '.join(missing)}")
+
+        names = {market_id: name for market_id, name in (found[key] for key in requested)}
+
+        def build():
+            aligned = load_aligned_series(db, list(names), start=start, end=end)
+            return offload(aligned_response, request, aligned, names)
+
+        return response_cache.respond(
+            request,
+            get_versions(db, [market_scope(market_id) for market_id in names]),
+            build,
+            vary=preferred_binary_type(request.headers.get("accept")) or "json",
+        )
+
+    return await run_db(handle)
+
+def metric_rows(metrics: list) -> list[dict]:
+    """JSON rows of loaded PositioningMetric objects."""
+    columns = [c.name for c in models.PositioningMetric.__table__.columns if c.name not in ("id", "market_id")]
+    metric_list = []
+    for metric in metrics:
+        row = {name: getattr(metric, name) for name in columns}
+        row["report_date"] = metric.report_date.isoformat()
+        metric_list.append(row)
+    return metric_list
+
+@app.get("/metrics/{market_name}")
+async def get_market_metrics(
+    market_name: str,
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    """Precomputed positioning metrics for a market, one entry per COT report."""
+    def handle(db: Session):
+        market_row = (
+            db.query(models.Market)
+            .filter(models.Market.name.ilike(market_name))
+            .first()
+        )
+        if not market_row:
+            raise HTTPException(status_code=404, detail=f"Market '{market_name}' not found")
+
+        def build():
+            query = (
+                db.query(models.PositioningMetric)
+                .filter(models.PositioningMetric.market_id == market_row.id)
+                .order_by(models.PositioningMetric.report_date)
+            )
+            if start:
+                query = query.filter(models.PositioningMetric.report_date >= start)
+            if end:
+                query = query.filter(models.PositioningMetric.report_date <= end)
+
+            return offload(metric_rows, query.all())
+
+        return response_cache.respond(request, get_versions(db, [market_scope(market_row.id)]), build)
+
+    return await run_db(handle)
+
+@app.get("/screener")
+async def get_screener(
+    request: Request,
+    group: Literal["largeSpec", "comms", "smallSpec"] = "largeSpec",
+    rank_by: Literal["percentile", "cot_index", "zscore", "net_change"] = "percentile",
+    direction: Literal["extreme", "long", "short"] = "extreme",
+    asset_class: Optional[list[str]] = Query(None),
+    limit: Optional[int] = Query(None, gt=0),
+):
+    """Tracked markets ranked by how extended their latest positioning is."""
+    def handle(db: Session):
+        def build():
+            return screen_markets(db, group, rank_by, direction, asset_class, limit)
+
+        return response_cache.respond(request, get_versions(db, ["metrics", "markets"]), build)
+
+    return await run_db(handle)
+
+@app.get("/basket")
+async def get_basket(
+    request: Request,
+    markets: list[str] = Query(..., min_length=1),
+    weighting: Literal["contracts", "notional"] = "contracts",
+):
+    """
+    Combined COT positioning of several markets (e.g. ?markets=Gold Futures (COMEX)&markets=Bitcoin Futures (CME)),
+    summed per report date, in contracts or USD notional, with where the latest
+    basket position sits against its history.
+    """
+    def handle(db: Session):
+        requested = {m.lower(): m for m in markets}
+        market_rows = (
+            db.query(models.Market.id, models.Market.name, models.Market.symbol)
+            .filter(func.lower(models.Market.name).in_(requested.keys()))
+            .order_by(models.Market.name)
+            .all()
+        )
+        found = {name.lower() for _, name, _ in market_rows}
+        missing = [m for key, m in requested.items() if key not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Markets not found: {', '.join(missing)}")
+
+        market_ids = [market_id for market_id, _, _ in market_rows]
+        names = [name for _, name, _ in market_rows]
+        point_values = None
+        if weighting == "notional":
+            point_values, unknown = point_values_for({market_id: symbol for market_id, _, symbol in market_rows})
+            if unknown:
+                unknown_names = [name for market_id, name, _ in market_rows if market_id in unknown]
+                raise HTTPException(status_code=400, detail=f"No contract point value for: {', '.join(unknown_names)}")
+
+        def build():
+            basket = load_basket(db, market_ids, weighting, point_values)
+            return offload(basket_to_columns, basket, names, weighting)
+
+        # Contract baskets only change with COT data; notional ones also move with prices
+        scope = cot_scope if weighting == "contracts" else market_scope
+        return response_cache.respond(request, get_versions(db, [scope(market_id) for market_id in market_ids]), build)
+
+    return await run_db(handle)
+
+@app.get("/backtest")
+async def get_backtest(
+    request: Request,
+    when: list[str] = Query(..., min_length=1),
+    horizons: list[int] = Query(list(DEFAULT_HORIZONS)),
+    markets: Optional[list[str]] = Query(None),
+):
+    """
+    Event study of a setup, e.g. ?when=largeSpec_percentile>=90&when=ma_50_atr_distance>=3&horizons=20:
+    every past occurrence per market with forward returns over each horizon
+    (trading days) and their distribution. Defaults to all tracked markets.
+    """
+    try:
+        for condition in when:
+            parse_condition(condition)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if any(h < 1 or h > 260 for h in horizons):
+        raise HTTPException(status_code=400, detail="Horizons must be between 1 and 260 trading days")
+
+    def handle(db: Session):
+        query = db.query(models.Market.id, models.Market.name)
+        if markets:
+            requested = {m.lower(): m for m in markets}
+            market_rows = query.filter(func.lower(models.Market.name).in_(requested.keys())).all()
+            found = {name.lower() for _, name in market_rows}
+            missing = [m for key, m in requested.items() if key not in found]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Markets not found: {', '.join(missing)}")
+        else:
+            market_rows = query.filter(models.Market.symbol.in_(CANONICAL_TO_NAME.keys())).all()
+        market_ids = [market_id for market_id, _ in market_rows]
+
+        def build():
+            # Waiting on the scan workers happens in the thread pool (see run_backtest)
+            return run_backtest(db, when, horizons, market_ids=market_ids)
+
+        return response_cache.respond(request, get_versions(db, [market_scope(market_id) for market_id in market_ids]), build)
+
+    return await run_db(handle)
 
 @app.get("/alerts")
-def get_all_alerts(
-    db: Session = Depends(get_db),
-    asset_class: Optional[str] = None,
-    market: Optional[str] = None,
-    alert_type: Optional[str] = None,
+async def get_all_alerts(
+    request: Request,
+    asset_class: Optional[list[str]] = Query(None),
+    market: Optional[list[str]] = Query(None),
+    alert_type: Optional[list[str]] = Query(None),
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(FEED_PAGE_SIZE, gt=0, le=FEED_MAX_PAGE_SIZE),
 ):
-    # Get all alerts
-    query = db.query(models.Alert).order_by(models.Alert.timestamp.desc())
-
-    if asset_class:
-        query = query.filter(models.Alert.asset_class == asset_class)
-    if market:
-        query = query.filter(models.Alert.market == market)
-    if alert_type:
-        query = query.filter(models.Alert.alert_type == alert_type)
-
-    alerts = query.all()
-
-    # Convert alerts to a list of dictionaries
-    alert_list = []
-    for alert in alerts:
-        alert_list.append({
-            "timestamp": alert.timestamp.isoformat(),
-            "alert_type": alert.alert_type,
-            "message": alert.message,
-            "value": alert.value,
-        })
-
-    return alert_list
+    """
+    Alerts feed, newest first, one page at a time: pass next_cursor back as
+    ?cursor= for older alerts, or the newest timestamp shown as ?since= to poll
+    for new ones. Filters are repeatable, e.g. ?asset_class=Metals&alert_type=extreme_short.
+    """
+    try:
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def handle(db: Session):
+        def build():
+            return load_alert_feed(db, asset_class, market, alert_type, since, cursor, limit)
+
+        return response_cache.respond(request, get_versions(db, ["alerts", "markets"]), build)
+
+    return await run_db(handle)
 
 @app.get("/alerts/{market_name}")
-def get_market_alerts(market_name: str, db: Session = Depends(get_db)):
-# Find market row by name
-    market_row = (
-    db.query(models.Market)
-    .filter(models.Market.name.ilike(market_name))
-    .first()
-    )
-    if not market_row:
-        raise HTTPException(status_code=404, detail=f"Market '{market_name}' not found")
-
-    # Get alerts for the market
-    alerts = (
-        db.query(models.Alert)
-        .filter(models.Alert.market_id == market_row.id)
-        .order_by(models.Alert.timestamp.desc())
-        .all()
-    )
+async def get_market_alerts(
+    market_name: str,
+    request: Request,
+    alert_type: Optional[list[str]] = Query(None),
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(FEED_PAGE_SIZE, gt=0, le=FEED_MAX_PAGE_SIZE),
+):
+    """One market's alerts feed, paginated like /alerts."""
+    try:
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def handle(db: Session):
+        # Find market row by name
+        market_row = (
+            db.query(models.Market)
+            .filter(models.Market.name.ilike(market_name))
+            .first()
+        )
+        if not market_row:
+            raise HTTPException(status_code=404, detail=f"Market '{market_name}' not found")
+
+        def build():
+            return load_alert_feed(db, alert_types=alert_type, since=since, cursor=cursor, limit=limit, market_ids=[market_row.id])
+
+        return response_cache.respond(request, get_versions(db, ["alerts"]), build)
+
+    return await run_db(handle)
 
-    # Convert alerts to a list of dictionaries
-    alert_list = []
-    for alert in alerts:
-        alert_list.append({
-            "timestamp": alert.timestamp.isoformat(),
-            "alert_type": alert.alert_type,
-            "message": alert.message,
-            "value": alert.value,
-        })
+@app.get("/events")
+async def stream_events(
+    request: Request,
+    markets: Optional[list[str]] = Query(None),
+    last_event_id: Optional[int] = None,
+):
+    """
+    Server-sent events as ingest jobs commit new data: "prices", "cot" and
+    "alerts" events, one per market per ingest, carrying the new rows (or for
+    large backfills only the first/last dates to reload). Limited to ?markets=
+    when given. Reconnecting clients send Last-Event-ID (or ?last_event_id=) and
+    get what they missed; a "reload" event means the gap was too large to replay.
+    """
+    after_id = request.headers.get("last-event-id") or last_event_id
+    try:
+        after_id = int(after_id) if after_id is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID must be an event id")
+
+    def lookup(db: Session):
+        query = db.query(models.Market.id, models.Market.name, models.Market.asset_class)
+        if markets:
+            query = query.filter(func.lower(models.Market.name).in_([m.lower() for m in markets]))
+        return query.all()
+
+    market_rows = await run_db(lookup)
+    if markets:
+        found = {name.lower() for _, name, _ in market_rows}
+        missing = [m for m in markets if m.lower() not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Markets not found: {', '.join(missing)}")
+    info = {market_id: {"market": name, "asset_class": asset_class} for market_id, name, asset_class in market_rows}
+    market_ids = set(info) if markets else None
+
+    def message(event):
+        event_id, kind, market_id, payload = event
+        data = {"market_id": market_id, **info.get(market_id, {"market": None, "asset_class": None}), **json.loads(payload)}
+        return sse_message(event_id, kind, data)
 
-    return alert_list
+    subscription = await event_hub.subscribe(market_ids)
+
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            sent = after_id
+            if after_id is not None:
+                missed = await event_hub.replay(after_id, market_ids)
+                if missed is None:
+                    sent = event_hub.last_id
+                    yield sse_message(sent, "reload", {})
+                for event in missed or []:
+                    sent = event[0]
+                    yield message(event)
+
+            while not (subscription.overflowed and subscription.queue.empty()):
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if sent is not None and event[0] <= sent:
+                    continue
+                sent = event[0]
+                yield message(event)
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
+@app.get("/cache/stats")
+def get_cache_stats():
+    return response_cache.stats()
@@ -0,0 +1,124 @@
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.orm import Session
+from db import SessionLocal, engine
+from models import COTReport, PositioningMetric
+from migrations import run_migrations
+from utils.bulk import frame_records, upsert
+from utils.versions import bump_versions, market_scope
+
+# Trader group -> (long column, short column)
+GROUPS = {
+    "comms": (COTReport.comms_long_positions, COTReport.comms_short_positions),
+    "largeSpec": (COTReport.largeSpec_long_positions, COTReport.largeSpec_short_positions),
+    "smallSpec": (COTReport.smallSpec_long_positions, COTReport.smallSpec_short_positions),
+}
+
+# Lookback for the COT index, percentile rank and z-score (three years of weekly
+# reports), and the reports needed before they are filled in
+METRICS_WINDOW = 156
+METRICS_MIN_HISTORY = 52
+
+def compute_metrics(nets: pd.DataFrame, window: int = METRICS_WINDOW, min_history: int = METRICS_MIN_HISTORY) -> pd.DataFrame:
+    """
+    Positioning metrics for one market's reports, oldest first.
+    nets: one net position column per group in GROUPS.
+    Returns <group>_net, _net_change, _cot_index, _percentile and _zscore columns,
+    NaN/NA where there is not enough history yet.
+    """
+    metrics = {}
+    for group in GROUPS:
+        net = nets[group].astype(np.float64)
+        rolling = net.rolling(window, min_periods=min_history)
+        low, high = rolling.min(), rolling.max()
+
+        metrics[f"{group}_net"] = nets[group].astype(np.int64)
+        metrics[f"{group}_net_change"] = nets[group].diff().astype("Int64")
+        metrics[f"{group}_cot_index"] = 100 * (net - low) / (high - low).replace(0, np.nan)
+        metrics[f"{group}_percentile"] = 100 * rolling.rank(method="max", pct=True)
+        metrics[f"{group}_zscore"] = (net - rolling.mean()) / rolling.std().replace(0, np.nan)
+    return pd.DataFrame(metrics, index=nets.index)
+
+def update_metrics(db: Session, market_ids=None, window: int = METRICS_WINDOW) -> dict[int, int]:
+    """
+    Brings positioning_metrics up to date with cot_reports. For each market, only
+    reports from the earliest one without a metrics row onwards are recomputed
+    (normally just the new week; more if older history was ingested later), with
+    the preceding window of reports read as context.
+    Writes are staged in the caller's transaction and the data versions of the
+    affected markets and of "metrics" are bumped. Returns the number of rows
+    written per market id.
+    """
+    has_metrics = and_(
+        PositioningMetric.market_id == COTReport.market_id,
+        PositioningMetric.report_date == COTReport.report_date,
+    )
+    ranked = (
+        select(
+            COTReport.market_id,
+            COTReport.report_date,
+            *[(long - short).label(group) for group, (long, short) in GROUPS.items()],
+            PositioningMetric.id.label("metric_id"),
+            func.row_number().over(partition_by=COTReport.market_id, order_by=COTReport.report_date).label("rn"),
+        )
+        .outerjoin(PositioningMetric, has_metrics)
+    )
+    if market_ids is not None:
+        ranked = ranked.where(COTReport.market_id.in_(list(market_ids)))
+    ranked = ranked.subquery()
+
+    first_missing = (
+        select(ranked.c.market_id, func.min(ranked.c.rn).label("first_rn"))
+        .where(ranked.c.metric_id.is_(None))
+        .group_by(ranked.c.market_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            ranked.c.market_id,
+            ranked.c.report_date,
+            *[ranked.c[group] for group in GROUPS],
+            (ranked.c.rn >= first_missing.c.first_rn).label("pending"),
+        )
+        .join(first_missing, first_missing.c.market_id == ranked.c.market_id)
+        .where(ranked.c.rn > first_missing.c.first_rn - window)
+        .order_by(ranked.c.market_id, ranked.c.report_date)
+    ).all()
+    if not rows:
+        return {}
+
+    history = pd.DataFrame(rows, columns=["market_id", "report_date", *GROUPS, "pending"])
+    written = {}
+    frames = []
+    for market_id, reports in history.groupby("market_id", sort=False):
+        pending = reports["pending"].astype(bool).to_numpy()
+        metrics = compute_metrics(reports[list(GROUPS)].reset_index(drop=True), window)[pending]
+        metrics.insert(0, "report_date", reports["report_date"].to_numpy()[pending])
+        metrics.insert(0, "market_id", market_id)
+        frames.append(metrics)
+        written[int(market_id)] = len(metrics)
+
+    records = frame_records(pd.concat(frames, ignore_index=True))
+    upsert(db, PositioningMetric, records, conflict_columns=["market_id", "report_date"])
+    bump_versions(db, {market_scope(market_id) for market_id in written} | {"metrics"})
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute positioning metrics for COT reports that don't have them yet")
+    parser.add_argument("--rebuild", action="store_true", help="drop stored metrics and recompute all history")
+    args = parser.parse_args()
+
+    run_migrations(engine)
+
+    db: Session = SessionLocal()
+    try:
+        if args.rebuild:
+            db.execute(delete(PositioningMetric))
+        written = update_metrics(db)
+        db.commit()
+        print(f"Updated metrics for {len(written)} markets ({sum(written.values())} reports).")
+    finally:
+        db.close()
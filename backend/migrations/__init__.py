@@ -0,0 +1,51 @@
+"""
+Minimal schema migration runner.
+
+Every module in this package named mNNNN_<description>.py is a migration with an
+upgrade(conn) function. Migrations run in version order inside one transaction
+each, and applied versions are recorded in the schema_migrations table, so
+run_migrations(engine) is safe to call on every startup.
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def available_migrations() -> list[tuple[str, object]]:
+    """(version, module) for every migration in this package, oldest first."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith("m") and info.name[1:5].isdigit():
+            found.append((info.name[1:5], importlib.import_module(f"{__name__}.{info.name}")))
+    return sorted(found, key=lambda item: item[0])
+
+
+def run_migrations(engine) -> list[str]:
+    """
+    Applies any pending migrations and returns the versions that were applied.
+    """
+    _metadata.create_all(bind=engine)
+
+    with engine.connect() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    ran = []
+    for version, module in available_migrations():
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.now()))
+        ran.append(version)
+    return ran
@@ -0,0 +1,6 @@
+from db import engine
+from migrations import run_migrations
+
+if __name__ == "__main__":
+    applied = run_migrations(engine)
+    print(f"Applied migrations: {', '.join(applied)}" if applied else "Schema is up to date")
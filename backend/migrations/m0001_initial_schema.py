@@ -0,0 +1,59 @@
+"""
+Baseline schema, as originally created by Base.metadata.create_all.
+Tables are defined here rather than imported from models so later migrations
+always start from the same point; checkfirst keeps it a no-op on existing databases.
+"""
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+Table(
+    "markets", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False, unique=True),
+    Column("symbol", String, nullable=False),
+    Column("asset_class", String, nullable=True),
+)
+
+Table(
+    "prices", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("market_id", Integer, ForeignKey("markets.id"), nullable=False),
+    Column("price", Float, nullable=False),
+    Column("timestamp", DateTime, nullable=False),
+)
+
+Table(
+    "cot_reports", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("market_id", Integer, ForeignKey("markets.id"), nullable=False),
+    Column("report_date", Date, nullable=False),
+    Column("comms_long_positions", Integer, nullable=False),
+    Column("comms_short_positions", Integer, nullable=False),
+    Column("largeSpec_long_positions", Integer, nullable=False),
+    Column("largeSpec_short_positions", Integer, nullable=False),
+    Column("smallSpec_long_positions", Integer, nullable=False),
+    Column("smallSpec_short_positions", Integer, nullable=False),
+)
+
+Table(
+    "market_aliases", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("market_id", Integer, ForeignKey("markets.id"), nullable=False),
+    Column("source", String, nullable=False),
+    Column("source_symbol", String, nullable=False),
+)
+
+Table(
+    "alerts", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("timestamp", DateTime, nullable=False),
+    Column("market_id", Integer, ForeignKey("markets.id"), nullable=False),
+    Column("alert_type", String, nullable=False),
+    Column("message", String, nullable=False),
+    Column("value", Float, nullable=True),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(bind=conn, checkfirst=True)
@@ -0,0 +1,24 @@
+"""
+Unique indexes for the hot lookup paths:
+prices (market_id, timestamp), cot_reports (market_id, report_date),
+market_aliases (source, source_symbol) and alerts (market_id, alert_type, message).
+Duplicate rows left by the old check-then-insert ingesters are removed first,
+keeping the earliest row of each key.
+"""
+from sqlalchemy import text
+
+UNIQUE_KEYS = {
+    "uq_prices_market_timestamp": ("prices", ("market_id", "timestamp")),
+    "uq_cot_reports_market_report_date": ("cot_reports", ("market_id", "report_date")),
+    "uq_market_aliases_source_symbol": ("market_aliases", ("source", "source_symbol")),
+    "uq_alerts_market_type_message": ("alerts", ("market_id", "alert_type", "message")),
+}
+
+
+def upgrade(conn):
+    for index_name, (table, columns) in UNIQUE_KEYS.items():
+        key = ", ".join(columns)
+        conn.execute(text(
+            f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {key})"
+        ))
+        conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table} ({key})"))
@@ -0,0 +1,19 @@
+"""
+data_versions: a counter per cache scope ("markets", "alerts", "market:<id>")
+that ingest jobs bump in the same transaction as the data they write, so
+API response caches know when to invalidate.
+"""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+Table(
+    "data_versions", metadata,
+    Column("scope", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(bind=conn, checkfirst=True)
@@ -0,0 +1,33 @@
+"""
+Alerts are identified by (market_id, alert_type, report_date) instead of their
+message text. Existing alerts get the report date of the latest COT report on
+or before the day they were raised; duplicates under the new key are removed,
+keeping the earliest, and the message-based unique index is replaced.
+"""
+from sqlalchemy import inspect, text
+
+
+def upgrade(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("alerts")}
+    if "report_date" not in columns:
+        conn.execute(text("ALTER TABLE alerts ADD COLUMN report_date DATE"))
+
+    alert_day = "DATE(alerts.timestamp)" if conn.dialect.name == "sqlite" else "CAST(alerts.timestamp AS DATE)"
+    conn.execute(text(f"""
+        UPDATE alerts SET report_date = (
+            SELECT MAX(c.report_date) FROM cot_reports c
+            WHERE c.market_id = alerts.market_id AND c.report_date <= {alert_day}
+        )
+        WHERE report_date IS NULL
+    """))
+
+    conn.execute(text("""
+        DELETE FROM alerts WHERE report_date IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM alerts GROUP BY market_id, alert_type, report_date
+        )
+    """))
+    conn.execute(text("DROP INDEX IF EXISTS uq_alerts_market_type_message"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_alerts_market_type_report_date "
+        "ON alerts (market_id, alert_type, report_date)"
+    ))
@@ -0,0 +1,34 @@
+"""
+positioning_metrics: net position, week-over-week change, COT index, percentile
+rank and z-score per trader group, one row per market per COT report.
+The table starts empty; the next COT ingest (or `python metrics.py`) fills it.
+"""
+from sqlalchemy import Column, Date, Float, ForeignKey, Index, Integer, MetaData, Table
+
+metadata = MetaData()
+
+# Only referenced for the foreign key; created by m0001
+Table("markets", metadata, Column("id", Integer, primary_key=True))
+
+positioning_metrics = Table(
+    "positioning_metrics", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("market_id", Integer, ForeignKey("markets.id"), nullable=False),
+    Column("report_date", Date, nullable=False),
+    *[
+        column
+        for group in ("comms", "largeSpec", "smallSpec")
+        for column in (
+            Column(f"{group}_net", Integer, nullable=False),
+            Column(f"{group}_net_change", Integer, nullable=True),
+            Column(f"{group}_cot_index", Float, nullable=True),
+            Column(f"{group}_percentile", Float, nullable=True),
+            Column(f"{group}_zscore", Float, nullable=True),
+        )
+    ],
+)
+Index("uq_positioning_metrics_market_report_date", positioning_metrics.c.market_id, positioning_metrics.c.report_date, unique=True)
+
+
+def upgrade(conn):
+    metadata.create_all(bind=conn, tables=[positioning_metrics], checkfirst=True)
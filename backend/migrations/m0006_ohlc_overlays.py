@@ -0,0 +1,34 @@
+"""
+Open/high/low on prices (existing rows keep only the close, in price) and the
+price_overlays table of moving averages and ATR per bar.
+The overlays start empty; the next price ingest (or `python overlays.py`) fills them.
+"""
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, MetaData, Table, inspect, text
+
+metadata = MetaData()
+
+# Only referenced for the foreign key; created by m0001
+Table("markets", metadata, Column("id", Integer, primary_key=True))
+
+price_overlays = Table(
+    "price_overlays", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("market_id", Integer, ForeignKey("markets.id"), nullable=False),
+    Column("timestamp", DateTime, nullable=False),
+    Column("ma_20", Float, nullable=True),
+    Column("ma_50", Float, nullable=True),
+    Column("ma_200", Float, nullable=True),
+    Column("atr_14", Float, nullable=True),
+    Column("atr_pct", Float, nullable=True),
+    Column("ma_50_atr_distance", Float, nullable=True),
+)
+Index("uq_price_overlays_market_timestamp", price_overlays.c.market_id, price_overlays.c.timestamp, unique=True)
+
+
+def upgrade(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("prices")}
+    for column in ("open", "high", "low"):
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE prices ADD COLUMN {column} FLOAT"))
+
+    metadata.create_all(bind=conn, tables=[price_overlays], checkfirst=True)
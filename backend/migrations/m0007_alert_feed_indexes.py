@@ -0,0 +1,16 @@
+"""
+Indexes for the paginated alerts feed, which reads newest first by
+(timestamp, id): across all markets, per market and per alert type.
+"""
+from sqlalchemy import text
+
+FEED_INDEXES = {
+    "ix_alerts_timestamp_id": ("timestamp", "id"),
+    "ix_alerts_market_timestamp_id": ("market_id", "timestamp", "id"),
+    "ix_alerts_type_timestamp_id": ("alert_type", "timestamp", "id"),
+}
+
+
+def upgrade(conn):
+    for index_name, columns in FEED_INDEXES.items():
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON alerts ({', '.join(columns)})"))
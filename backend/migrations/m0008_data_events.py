@@ -0,0 +1,24 @@
+"""
+data_events: outbox of new prices, COT reports and alerts per market, read by
+the API's /events stream. Rows older than the retention period are pruned by
+the ingest jobs that write new ones.
+"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text
+
+metadata = MetaData()
+
+# Only referenced for the foreign key; created by m0001
+Table("markets", metadata, Column("id", Integer, primary_key=True))
+
+data_events = Table(
+    "data_events", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("created_at", DateTime, nullable=False, index=True),
+    Column("kind", String, nullable=False),
+    Column("market_id", Integer, ForeignKey("markets.id"), nullable=False),
+    Column("payload", Text, nullable=False),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(bind=conn, tables=[data_events], checkfirst=True)
@@ -0,0 +1,24 @@
+"""
+job_runs: one row per scheduler job execution with its duration, status and
+the number of rows and markets it changed.
+"""
+from sqlalchemy import Column, DateTime, Float, Index, Integer, MetaData, String, Table, Text
+
+metadata = MetaData()
+
+job_runs = Table(
+    "job_runs", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("job", String, nullable=False),
+    Column("started_at", DateTime, nullable=False),
+    Column("duration_ms", Float, nullable=False),
+    Column("status", String, nullable=False),
+    Column("rows", Integer, nullable=False),
+    Column("markets", Integer, nullable=False),
+    Column("detail", Text, nullable=True),
+)
+Index("ix_job_runs_job_started_at", job_runs.c.job, job_runs.c.started_at)
+
+
+def upgrade(conn):
+    metadata.create_all(bind=conn, checkfirst=True)
@@ -0,0 +1,24 @@
+"""
+ingest_checkpoints: per-source, per-key progress of chunked backfills, so an
+interrupted backfill resumes after its last committed chunk.
+"""
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+ingest_checkpoints = Table(
+    "ingest_checkpoints", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("source", String, nullable=False),
+    Column("key", String, nullable=False),
+    Column("version", String, nullable=True),
+    Column("position", String, nullable=False),
+    Column("rows", Integer, nullable=False),
+    Column("complete", Boolean, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+Index("uq_ingest_checkpoints_source_key", ingest_checkpoints.c.source, ingest_checkpoints.c.key, unique=True)
+
+
+def upgrade(conn):
+    metadata.create_all(bind=conn, checkfirst=True)
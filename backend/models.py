@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, Date, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, Text, Boolean, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from db import Base
 
@@ -11,21 +11,44 @@ class Market(Base):
     asset_class = Column(String, nullable=True)
 
     prices = relationship("Price", back_populates="market")
+    overlays = relationship("PriceOverlay", back_populates="market")
     cot_reports = relationship("COTReport", back_populates="market")
     aliases = relationship("MarketAlias", back_populates="market")
     alerts = relationship("Alert", back_populates="market")
+    metrics = relationship("PositioningMetric", back_populates="market")
 
 class Price(Base):
     __tablename__ = "prices"
+    __table_args__ = (Index("uq_prices_market_timestamp", "market_id", "timestamp", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     market_id = Column(Integer, ForeignKey("markets.id"), nullable=False)
-    price = Column(Float, nullable=False)
+    price = Column(Float, nullable=False)  # close
+    open = Column(Float, nullable=True)
+    high = Column(Float, nullable=True)
+    low = Column(Float, nullable=True)
     timestamp = Column(DateTime, nullable=False)
     market = relationship("Market", back_populates="prices")
 
+class PriceOverlay(Base):
+    """Technical overlays per market per daily bar, maintained by overlays.update_overlays."""
+    __tablename__ = "price_overlays"
+    __table_args__ = (Index("uq_price_overlays_market_timestamp", "market_id", "timestamp", unique=True),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    market_id = Column(Integer, ForeignKey("markets.id"), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    ma_20 = Column(Float, nullable=True)
+    ma_50 = Column(Float, nullable=True)
+    ma_200 = Column(Float, nullable=True)
+    atr_14 = Column(Float, nullable=True)  # Wilder's average true range
+    atr_pct = Column(Float, nullable=True)  # ATR as a percentage of the close
+    ma_50_atr_distance = Column(Float, nullable=True)  # (close - 50-day MA) in ATRs
+    market = relationship("Market", back_populates="overlays")
+
 class COTReport(Base):
     __tablename__ = "cot_reports"
+    __table_args__ = (Index("uq_cot_reports_market_report_date", "market_id", "report_date", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     market_id = Column(Integer, ForeignKey("markets.id"), nullable=False)
@@ -40,6 +63,7 @@ class COTReport(Base):
 
 class MarketAlias(Base):
     __tablename__ = "market_aliases"
+    __table_args__ = (Index("uq_market_aliases_source_symbol", "source", "source_symbol", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     market_id = Column(Integer, ForeignKey("markets.id"), nullable=False)
@@ -49,13 +73,101 @@ class MarketAlias(Base):
 
 class Alert(Base):
     __tablename__ = "alerts"
+    __table_args__ = (
+        # One alert of each type per market per COT report
+        Index("uq_alerts_market_type_report_date", "market_id", "alert_type", "report_date", unique=True),
+        # Newest-first feed pages, overall and filtered by market or type
+        Index("ix_alerts_timestamp_id", "timestamp", "id"),
+        Index("ix_alerts_market_timestamp_id", "market_id", "timestamp", "id"),
+        Index("ix_alerts_type_timestamp_id", "alert_type", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, nullable=False)
     market_id = Column(Integer, ForeignKey("markets.id"), nullable=False)
     alert_type = Column(String, nullable=False)  # e.g. "max_net_long", "extreme_short", "rapid_change"
+    report_date = Column(Date, nullable=True)  # COT report the alert was evaluated on
     message = Column(String, nullable=False)  # e.g. "Ethereum large speculators are at maximum net long"
     value = Column(Float, nullable=True)  # The actual value that triggered the alert
 
     market = relationship("Market", back_populates="alerts")
 
+
+class PositioningMetric(Base):
+    """Derived positioning per market per COT report, maintained by metrics.update_metrics."""
+    __tablename__ = "positioning_metrics"
+    __table_args__ = (Index("uq_positioning_metrics_market_report_date", "market_id", "report_date", unique=True),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    market_id = Column(Integer, ForeignKey("markets.id"), nullable=False)
+    report_date = Column(Date, nullable=False)
+
+    # Per trader group: net position, week-over-week change, COT index (0-100 between
+    # the lookback window's low and high), percentile rank in the window (0-100) and z-score
+    comms_net = Column(Integer, nullable=False)
+    comms_net_change = Column(Integer, nullable=True)
+    comms_cot_index = Column(Float, nullable=True)
+    comms_percentile = Column(Float, nullable=True)
+    comms_zscore = Column(Float, nullable=True)
+    largeSpec_net = Column(Integer, nullable=False)
+    largeSpec_net_change = Column(Integer, nullable=True)
+    largeSpec_cot_index = Column(Float, nullable=True)
+    largeSpec_percentile = Column(Float, nullable=True)
+    largeSpec_zscore = Column(Float, nullable=True)
+    smallSpec_net = Column(Integer, nullable=False)
+    smallSpec_net_change = Column(Integer, nullable=True)
+    smallSpec_cot_index = Column(Float, nullable=True)
+    smallSpec_percentile = Column(Float, nullable=True)
+    smallSpec_zscore = Column(Float, nullable=True)
+
+    market = relationship("Market", back_populates="metrics")
+
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    scope = Column(String, primary_key=True)  # e.g. "markets", "alerts", "market:12"
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
+class DataEvent(Base):
+    """
+    Outbox of data changes for push subscribers: one row per market per kind
+    ("prices", "cot", "alerts") per ingest, written in the same transaction as
+    the data itself. See utils/events.py.
+    """
+    __tablename__ = "data_events"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    kind = Column(String, nullable=False)
+    market_id = Column(Integer, ForeignKey("markets.id"), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON: count, first/last date and the new rows
+
+class JobRun(Base):
+    """One run of a scheduler job (scheduler.py): when, how long, and what it wrote."""
+    __tablename__ = "job_runs"
+    __table_args__ = (Index("ix_job_runs_job_started_at", "job", "started_at"),)
+
+    id = Column(Integer, primary_key=True)
+    job = Column(String, nullable=False)  # "cot" or "prices"
+    started_at = Column(DateTime, nullable=False)
+    duration_ms = Column(Float, nullable=False)
+    status = Column(String, nullable=False)  # "ok" or "error"
+    rows = Column(Integer, nullable=False, default=0)  # new reports or bars stored
+    markets = Column(Integer, nullable=False, default=0)  # markets whose data changed
+    detail = Column(Text, nullable=True)  # JSON counts, or the error
+
+class IngestCheckpoint(Base):
+    """Progress of a chunked backfill per source and key (ticker or COT year), see utils/checkpoints.py."""
+    __tablename__ = "ingest_checkpoints"
+    __table_args__ = (Index("uq_ingest_checkpoints_source_key", "source", "key", unique=True),)
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String, nullable=False)  # "yahoo" or "cot"
+    key = Column(String, nullable=False)  # ticker, or report year
+    version = Column(String, nullable=True)  # input the position refers to, e.g. the archive file
+    position = Column(String, nullable=False)  # last date covered, or number of batches stored
+    rows = Column(Integer, nullable=False, default=0)  # rows stored so far
+    complete = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime, nullable=False)
@@ -0,0 +1,148 @@
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.orm import Session, aliased
+from db import SessionLocal, engine
+from models import Price, PriceOverlay
+from migrations import run_migrations
+from utils.bulk import frame_records, upsert
+from utils.versions import bump_versions, market_scope
+
+# Moving-average lengths (bars), ATR length, and the MA that distance is measured from
+MA_PERIODS = (20, 50, 200)
+ATR_PERIOD = 14
+DISTANCE_MA = 50
+
+# Bars read before the first one being recomputed: enough for the longest MA
+CONTEXT_BARS = max(MA_PERIODS) - 1
+
+def true_range(close: pd.Series, high: pd.Series, low: pd.Series) -> pd.Series:
+    """
+    Largest of high-low, |high-prev close| and |low-prev close|. Bars without
+    high/low (stored before OHLC was kept) fall back to |close-prev close|.
+    """
+    prev_close = close.shift()
+    ranges = np.vstack([
+        (high - low).to_numpy(),
+        (high - prev_close).abs().to_numpy(),
+        (low - prev_close).abs().to_numpy(),
+        (close - prev_close).abs().to_numpy(),
+    ])
+    return pd.Series(np.fmax.reduce(ranges, axis=0), index=close.index)
+
+def compute_overlays(bars: pd.DataFrame, atr_from: int = 0, atr_seed: float = None) -> pd.DataFrame:
+    """
+    Overlays for one market's bars (columns close, high, low), oldest first.
+    Without atr_seed, ATR is Wilder's smoothing from the first bar. With it, the
+    smoothing resumes at row atr_from from atr_seed (the stored ATR of the bar
+    before), so incremental updates match a full recompute; earlier rows are
+    only context and get no ATR.
+    """
+    close = bars["close"].astype(np.float64)
+    tr = true_range(close, bars["high"].astype(np.float64), bars["low"].astype(np.float64))
+
+    overlays = {f"ma_{period}": close.rolling(period, min_periods=period).mean() for period in MA_PERIODS}
+
+    if atr_seed is None:
+        atr = tr.ewm(alpha=1 / ATR_PERIOD, adjust=False, min_periods=ATR_PERIOD).mean()
+    else:
+        seeded = pd.concat([pd.Series([atr_seed]), tr.iloc[atr_from:]], ignore_index=True)
+        atr = pd.Series(np.nan, index=bars.index)
+        atr.iloc[atr_from:] = seeded.ewm(alpha=1 / ATR_PERIOD, adjust=False).mean().to_numpy()[1:]
+
+    overlays[f"atr_{ATR_PERIOD}"] = atr
+    overlays["atr_pct"] = 100 * atr / close
+    overlays[f"ma_{DISTANCE_MA}_atr_distance"] = (close - overlays[f"ma_{DISTANCE_MA}"]) / atr.replace(0, np.nan)
+    return pd.DataFrame(overlays, index=bars.index)
+
+def update_overlays(db: Session, market_ids=None) -> dict[int, int]:
+    """
+    Brings price_overlays up to date with prices. For each market, only bars from
+    the earliest one without an overlay row onwards are recomputed, reading the
+    preceding CONTEXT_BARS bars (located through the (market_id, timestamp)
+    index) for the moving averages and resuming ATR from the last stored value.
+    Writes are staged in the caller's transaction and the data versions of the
+    affected markets are bumped. Returns the number of bars written per market id.
+    """
+    has_overlay = and_(PriceOverlay.market_id == Price.market_id, PriceOverlay.timestamp == Price.timestamp)
+    missing = (
+        select(Price.market_id, func.min(Price.timestamp).label("first_missing"))
+        .outerjoin(PriceOverlay, has_overlay)
+        .where(PriceOverlay.id.is_(None))
+        .group_by(Price.market_id)
+    )
+    if market_ids is not None:
+        missing = missing.where(Price.market_id.in_(list(market_ids)))
+    missing = missing.subquery()
+
+    # The CONTEXT_BARS-th bar before the first missing one (None when there are fewer)
+    earlier = aliased(Price)
+    context_start = (
+        select(earlier.timestamp)
+        .where(earlier.market_id == missing.c.market_id, earlier.timestamp < missing.c.first_missing)
+        .order_by(earlier.timestamp.desc())
+        .offset(CONTEXT_BARS - 1)
+        .limit(1)
+        .scalar_subquery()
+    )
+    starts = db.execute(select(missing.c.market_id, missing.c.first_missing, context_start)).all()
+    if not starts:
+        return {}
+
+    ranges = [
+        and_(Price.market_id == market_id, Price.timestamp >= context) if context else Price.market_id == market_id
+        for market_id, _, context in starts
+    ]
+    rows = db.execute(
+        select(Price.market_id, Price.timestamp, Price.price, Price.high, Price.low, PriceOverlay.atr_14)
+        .outerjoin(PriceOverlay, has_overlay)
+        .where(or_(*ranges))
+        .order_by(Price.market_id, Price.timestamp)
+    ).all()
+
+    first_missing = {market_id: first for market_id, first, _ in starts}
+    history = pd.DataFrame(rows, columns=["market_id", "timestamp", "close", "high", "low", "atr_14"])
+    written = {}
+    frames = []
+    for market_id, bars in history.groupby("market_id", sort=False):
+        bars = bars.reset_index(drop=True)
+        pending = (bars["timestamp"] >= first_missing[market_id]).to_numpy()
+        first = int(np.argmax(pending))
+
+        # Resume ATR from the bar before; before ATR_PERIOD bars there is nothing
+        # stored, but then the context reaches back to the market's first bar
+        seed = bars["atr_14"].iloc[first - 1] if first > 0 else None
+        if seed is None or pd.isna(seed):
+            overlays = compute_overlays(bars)
+        else:
+            overlays = compute_overlays(bars, atr_from=first, atr_seed=float(seed))
+
+        overlays = overlays[pending]
+        overlays.insert(0, "timestamp", bars["timestamp"].to_numpy()[pending])
+        overlays.insert(0, "market_id", market_id)
+        frames.append(overlays)
+        written[int(market_id)] = len(overlays)
+
+    records = frame_records(pd.concat(frames, ignore_index=True))
+    upsert(db, PriceOverlay, records, conflict_columns=["market_id", "timestamp"])
+    bump_versions(db, {market_scope(market_id) for market_id in written})
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute technical overlays for price bars that don't have them yet")
+    parser.add_argument("--rebuild", action="store_true", help="drop stored overlays and recompute all history")
+    args = parser.parse_args()
+
+    run_migrations(engine)
+
+    db: Session = SessionLocal()
+    try:
+        if args.rebuild:
+            db.execute(delete(PriceOverlay))
+        written = update_overlays(db)
+        db.commit()
+        print(f"Updated overlays for {len(written)} markets ({sum(written.values())} bars).")
+    finally:
+        db.close()
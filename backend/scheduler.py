@@ -0,0 +1,276 @@
+import argparse
+import json
+import time as timer
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from db import SessionLocal, engine
+from models import COTReport, JobRun, MarketAlias, Price
+from migrations import run_migrations
+from generate_alerts import generate_alerts_batch
+from ingest_cot import iter_cot_batches, open_cot_file, store_cot_frame
+from ingest_yahoo import sync_prices
+from metrics import update_metrics
+from overlays import update_overlays
+from snapshots import SNAPSHOT_DIR, export_snapshots, snapshots_available
+from utils.cot_archive import DEFAULT_CACHE_DIR, CotArchive
+from utils.market_mapping import CANONICAL_TO_ASSETCLASS, YAHOO_TO_CANONICAL
+from utils.markets import MarketResolver
+from utils.price_sources import CsvPriceSource, YahooPriceSource
+
+EASTERN = ZoneInfo("America/New_York")
+
+# CFTC publishes the Tuesday positions on Friday at 3:30pm Eastern (later in
+# holiday weeks, which the retry covers)
+COT_RELEASE_WEEKDAY = 4
+COT_RELEASE_TIME = time(15, 30)
+COT_REPORT_LAG = timedelta(days=3)
+COT_START_YEAR = 2023
+
+# Daily bars are final once the session has closed and the feed has caught up:
+# futures close at 5pm Eastern on weekdays, crypto days end at midnight UTC
+FUTURES_CLOSE = time(17, 0)
+BAR_SETTLE = timedelta(minutes=30)
+
+# How often a job that is due but found nothing new is tried again
+RETRY_INTERVAL = timedelta(hours=1)
+
+
+class SystemClock:
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def sleep(self, seconds: float):
+        timer.sleep(seconds)
+
+
+class FakeClock:
+    """Clock for tests and dry runs: starts at `start` (UTC) and only moves when slept."""
+
+    def __init__(self, start: datetime):
+        self.current = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+
+    def now(self) -> datetime:
+        return self.current
+
+    def sleep(self, seconds: float):
+        self.current += timedelta(seconds=seconds)
+
+    def advance(self, **kwargs):
+        self.current += timedelta(**kwargs)
+
+
+def latest_cot_release(now: datetime) -> tuple[date, datetime]:
+    """(report date, release time in UTC) of the most recent COT release at or before now."""
+    local = now.astimezone(EASTERN)
+    release_day = local.date() - timedelta(days=(local.weekday() - COT_RELEASE_WEEKDAY) % 7)
+    if release_day == local.date() and local.time() < COT_RELEASE_TIME:
+        release_day -= timedelta(days=7)
+    released = datetime.combine(release_day, COT_RELEASE_TIME, EASTERN).astimezone(timezone.utc)
+    return release_day - COT_REPORT_LAG, released
+
+def last_completed_session(now: datetime, asset_class: str) -> date:
+    """Date of the latest daily bar that should be final at `now` for the asset class."""
+    settled = now - BAR_SETTLE
+    if asset_class == "Crypto":
+        return settled.astimezone(timezone.utc).date() - timedelta(days=1)
+
+    local = settled.astimezone(EASTERN)
+    day = local.date() if local.time() >= FUTURES_CLOSE else local.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+def next_session_close(now: datetime) -> datetime:
+    """Earliest time after now at which some market's next bar becomes final."""
+    utc_midnight = datetime.combine(now.astimezone(timezone.utc).date() + timedelta(days=1), time.min, timezone.utc)
+    local = now.astimezone(EASTERN)
+    day = local.date()
+    while True:
+        close = datetime.combine(day, FUTURES_CLOSE, EASTERN).astimezone(timezone.utc)
+        if day.weekday() < 5 and close + BAR_SETTLE > now:
+            break
+        day += timedelta(days=1)
+    return min(utc_midnight, close) + BAR_SETTLE
+
+
+class Scheduler:
+    """
+    Runs the incremental ingest jobs when they are due, instead of re-ingesting
+    everything on a timer:
+    - "cot" when the latest COT release is newer than the latest stored report,
+      reading only the years from the latest stored report on, and skipping
+      archives that haven't changed since they were last ingested;
+    - "prices" for the tickers whose latest stored bar is older than their last
+      completed session.
+    Positioning metrics and overlays are updated incrementally with the data,
+    alerts are regenerated only for markets that received new reports, and the
+    Arrow snapshots of changed markets are re-exported (when pyarrow is installed).
+    A job that was due but found nothing new waits RETRY_INTERVAL before trying
+    again (e.g. a delayed release or an exchange holiday). Every run is recorded
+    in job_runs.
+    """
+
+    def __init__(self, clock=None, archive: CotArchive = None, price_source=None, tickers=None, session_factory=SessionLocal,
+                 snapshot_dir: str = SNAPSHOT_DIR):
+        self.clock = clock or SystemClock()
+        self.archive = archive or CotArchive()
+        self.price_source = price_source or YahooPriceSource()
+        self.tickers = list(YAHOO_TO_CANONICAL if tickers is None else tickers)
+        self.session_factory = session_factory
+        self.snapshot_dir = snapshot_dir if snapshots_available() else None
+        self.last_attempt: dict[str, datetime] = {}
+        self.ingested_archives: dict[int, str] = {}
+
+    def cot_years_due(self, db: Session, now: datetime) -> list[int]:
+        """COT years to read now, or [] when the latest release is already stored."""
+        report_date, _ = latest_cot_release(now)
+        latest = db.query(func.max(COTReport.report_date)).scalar()
+        if latest is not None and latest >= report_date:
+            return []
+        first_year = latest.year if latest else COT_START_YEAR
+        return list(range(first_year, report_date.year + 1))
+
+    def price_tickers_due(self, db: Session, now: datetime) -> dict[date, list[str]]:
+        """Tickers missing a final bar, grouped by the last session date to fetch up to."""
+        last_bars = dict(
+            db.query(MarketAlias.source_symbol, func.max(Price.timestamp))
+            .outerjoin(Price, Price.market_id == MarketAlias.market_id)
+            .filter(MarketAlias.source == "yahoo", MarketAlias.source_symbol.in_(self.tickers))
+            .group_by(MarketAlias.source_symbol)
+            .all()
+        )
+        due = {}
+        for ticker in self.tickers:
+            session = last_completed_session(now, CANONICAL_TO_ASSETCLASS.get(YAHOO_TO_CANONICAL.get(ticker)))
+            last = last_bars.get(ticker)
+            if last is None or last.date() < session:
+                due.setdefault(session, []).append(ticker)
+        return due
+
+    def run_cot(self, db: Session, years: list[int]) -> dict:
+        resolver = MarketResolver(db)
+        stored = 0
+        read = {}
+        for year in years:
+            path = self.archive.path(year)
+            if self.ingested_archives.get(year) == path:
+                continue
+            with open_cot_file(year, path=path) as f:
+                for batch in iter_cot_batches(f):
+                    stored += sum(store_cot_frame(db, batch, resolver).values())
+            read[year] = path
+        metrics = update_metrics(db)
+        db.commit()
+        self.ingested_archives.update(read)
+
+        alerts = generate_alerts_batch(db, market_ids=list(metrics)) if metrics else {"created": 0, "skipped": 0}
+        return {
+            "rows": stored,
+            "markets": len(metrics),
+            "detail": {"years": list(read), "metrics": sum(metrics.values()), "alerts": alerts["created"]},
+        }
+
+    def run_prices(self, db: Session, due: dict[date, list[str]]) -> dict:
+        resolver = MarketResolver(db)
+        stored = {}
+        for session, tickers in due.items():
+            # end is exclusive; bars of sessions still trading are not fetched
+            stored.update(sync_prices(db, source=self.price_source, tickers=tickers, end=session + timedelta(days=1), resolver=resolver))
+        overlays = update_overlays(db)
+        db.commit()
+        return {
+            "rows": sum(stored.values()),
+            "markets": len(overlays),
+            "detail": {"tickers": sorted(stored), "overlays": sum(overlays.values())},
+        }
+
+    def run_pending(self) -> list[JobRun]:
+        """Runs every job that is due now. Returns the recorded runs."""
+        now = self.clock.now()
+        runs = []
+        db = self.session_factory()
+        try:
+            pending = {"cot": self.cot_years_due(db, now), "prices": self.price_tickers_due(db, now)}
+        finally:
+            db.close()
+
+        for job, work in pending.items():
+            if not work or now < self.last_attempt.get(job, now - RETRY_INTERVAL) + RETRY_INTERVAL:
+                continue
+            self.last_attempt[job] = now
+            runs.append(self._run(job, work, now))
+        return runs
+
+    def next_wakeup(self, now: datetime) -> datetime:
+        """When something may next be due: a COT release, a session close or a retry."""
+        _, released = latest_cot_release(now + timedelta(days=7))
+        wakeups = [released, next_session_close(now)]
+        wakeups += [attempt + RETRY_INTERVAL for attempt in self.last_attempt.values() if attempt + RETRY_INTERVAL > now]
+        return min(wakeups)
+
+    def run_forever(self):
+        while True:
+            for run in self.run_pending():
+                print(f"[{run.started_at:%Y-%m-%d %H:%M}] {run.job}: {run.status}, {run.rows} rows, "
+                      f"{run.markets} markets in {run.duration_ms:.0f} ms {run.detail}")
+            now = self.clock.now()
+            self.clock.sleep(max((self.next_wakeup(now) - now).total_seconds(), 1))
+
+    def _run(self, job: str, work, now: datetime) -> JobRun:
+        db = self.session_factory()
+        start = timer.perf_counter()
+        try:
+            result = self.run_cot(db, work) if job == "cot" else self.run_prices(db, work)
+            if self.snapshot_dir:
+                result["detail"]["snapshots"] = sum(export_snapshots(db, self.snapshot_dir).values())
+            status = "ok"
+        except Exception as e:
+            db.rollback()
+            result = {"rows": 0, "markets": 0, "detail": {"error": repr(e)}}
+            status = "error"
+        finally:
+            db.close()
+
+        run = JobRun(
+            job=job,
+            started_at=now.astimezone(timezone.utc).replace(tzinfo=None),
+            duration_ms=(timer.perf_counter() - start) * 1000,
+            status=status,
+            rows=result["rows"],
+            markets=result["markets"],
+            detail=json.dumps(result["detail"]),
+        )
+        db = self.session_factory()
+        try:
+            db.add(run)
+            db.commit()
+            db.refresh(run)
+            db.expunge(run)
+        finally:
+            db.close()
+        return run
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run COT and price ingest jobs as they become due")
+    parser.add_argument("--once", action="store_true", help="run the jobs that are due now and exit")
+    parser.add_argument("--prices-dir", help="directory of <ticker>.csv files to read instead of Yahoo")
+    parser.add_argument("--cache-dir", help="COT archive cache directory (default: COT_CACHE_DIR or backend/.cot_cache)")
+    parser.add_argument("--offline", action="store_true", help="only read COT archives already in the cache directory")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR, help="Arrow snapshot directory (default: SNAPSHOT_DIR or backend/.snapshots)")
+    args = parser.parse_args()
+
+    run_migrations(engine)
+
+    scheduler = Scheduler(
+        archive=CotArchive(args.cache_dir or DEFAULT_CACHE_DIR, offline=args.offline),
+        price_source=CsvPriceSource(args.prices_dir) if args.prices_dir else None,
+        snapshot_dir=args.snapshot_dir,
+    )
+    if args.once:
+        for run in scheduler.run_pending():
+            print(f"{run.job}: {run.status}, {run.rows} rows, {run.markets} markets in {run.duration_ms:.0f} ms {run.detail}")
+    else:
+        scheduler.run_forever()
@@ -0,0 +1,74 @@
+from sqlalchemy import func, nulls_last, select
+from sqlalchemy.orm import Session, aliased
+from models import Market, PositioningMetric
+from metrics import GROUPS
+from utils.market_mapping import CANONICAL_TO_NAME
+
+RANK_FIELDS = ("percentile", "cot_index", "zscore", "net_change")
+DIRECTIONS = ("extreme", "long", "short")
+
+def screen_markets(
+    db: Session,
+    group: str = "largeSpec",
+    rank_by: str = "percentile",
+    direction: str = "extreme",
+    asset_class: list[str] = None,
+    limit: int = None,
+) -> list[dict]:
+    """
+    Ranks every tracked market (CANONICAL_TO_NAME) by its latest positioning
+    metrics for one trader group, in a single query. Each market's latest row is
+    picked by id from a newest-first LIMIT 1 lookup on the (market_id, report_date)
+    index, so the query walks markets rather than metrics rows and its cost
+    doesn't grow with history length.
+    direction: "extreme" ranks by distance from neutral (50 for percentile and
+    COT index, 0 for z-score and change), "long"/"short" by the highest/lowest value.
+    net_change is in contracts, so it is not comparable across very different markets.
+    """
+    if group not in GROUPS:
+        raise ValueError(f"group must be one of {tuple(GROUPS)}")
+    if rank_by not in RANK_FIELDS:
+        raise ValueError(f"rank_by must be one of {RANK_FIELDS}")
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {DIRECTIONS}")
+
+    fields = {name: getattr(PositioningMetric, f"{group}_{name}") for name in ("net", *RANK_FIELDS)}
+    latest = aliased(PositioningMetric)
+    latest_id = (
+        select(latest.id)
+        .where(latest.market_id == Market.id)
+        .order_by(latest.report_date.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+    ranked = fields[rank_by]
+    if direction == "extreme":
+        neutral = 50 if rank_by in ("percentile", "cot_index") else 0
+        order = func.abs(ranked - neutral).desc()
+    elif direction == "long":
+        order = ranked.desc()
+    else:
+        order = ranked.asc()
+
+    query = (
+        select(Market.name, Market.asset_class, PositioningMetric.report_date, *fields.values())
+        .join(PositioningMetric, PositioningMetric.id == latest_id)
+        .where(Market.symbol.in_(CANONICAL_TO_NAME.keys()))
+        .order_by(nulls_last(order), Market.name)
+    )
+    if asset_class:
+        query = query.where(Market.asset_class.in_(asset_class))
+    if limit:
+        query = query.limit(limit)
+
+    results = []
+    for rank, (name, market_asset_class, report_date, *values) in enumerate(db.execute(query).all(), start=1):
+        results.append({
+            "rank": rank,
+            "market": name,
+            "asset_class": market_asset_class,
+            "report_date": report_date.isoformat(),
+            **dict(zip(fields, values)),
+        })
+    return results
@@ -0,0 +1,258 @@
+from datetime import date, datetime, time, timedelta
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session, aliased
+from db import offload
+from models import Price, PriceOverlay, COTReport
+from utils.downsample import lttb_indices
+
+# Response field -> COTReport column
+COT_FIELDS = {
+    "largeSpecLong": COTReport.largeSpec_long_positions,
+    "largeSpecShort": COTReport.largeSpec_short_positions,
+    "smallSpecLong": COTReport.smallSpec_long_positions,
+    "smallSpecShort": COTReport.smallSpec_short_positions,
+    "commsLong": COTReport.comms_long_positions,
+    "commsShort": COTReport.comms_short_positions,
+}
+
+# Response field -> PriceOverlay column, included when overlays are requested
+OVERLAY_FIELDS = {
+    "ma20": PriceOverlay.ma_20,
+    "ma50": PriceOverlay.ma_50,
+    "ma200": PriceOverlay.ma_200,
+    "atr14": PriceOverlay.atr_14,
+    "atrPct": PriceOverlay.atr_pct,
+    "ma50AtrDistance": PriceOverlay.ma_50_atr_distance,
+}
+
+def _in_range(query, start: date = None, end: date = None):
+    """Restricts a prices query to an inclusive date range."""
+    if start:
+        query = query.where(Price.timestamp >= datetime.combine(start, time.min))
+    if end:
+        query = query.where(Price.timestamp < datetime.combine(end + timedelta(days=1), time.min))
+    return query
+
+def _report_query(market_ids, first_day: date, last_day: date):
+    """
+    COT reports for the given markets covering first_day..last_day, including
+    the report already in effect on first_day (which may predate the range).
+    """
+    earlier = aliased(COTReport)
+    in_effect = (
+        select(func.max(earlier.report_date))
+        .where(earlier.market_id == COTReport.market_id, earlier.report_date <= first_day)
+        .scalar_subquery()
+    )
+    return (
+        select(COTReport.market_id, COTReport.report_date, *COT_FIELDS.values())
+        .where(
+            COTReport.market_id.in_(market_ids),
+            COTReport.report_date >= func.coalesce(in_effect, first_day),
+            COTReport.report_date <= last_day,
+        )
+        .order_by(COTReport.market_id, COTReport.report_date)
+    )
+
+def _transpose(rows, width: int) -> list[tuple]:
+    return list(zip(*rows)) or [()] * width
+
+def _attach_cot(series: dict, dates: np.ndarray, report_dates: np.ndarray, report_values: list[np.ndarray]) -> dict:
+    """Adds cotIndex and the COT fields of the latest report on or before each date."""
+    cot_index = np.searchsorted(report_dates, dates.astype("datetime64[D]"), side="right") - 1
+    series["cotIndex"] = cot_index
+
+    take = np.maximum(cot_index, 0)
+    for field, values in zip(COT_FIELDS, report_values):
+        series[field] = values[take] if len(values) else np.zeros(len(dates), dtype=np.int64)
+    return series
+
+def load_market_series(
+    db: Session,
+    market_id: int,
+    start: date = None,
+    end: date = None,
+    limit: int = None,
+    overlays: bool = False,
+) -> dict[str, np.ndarray]:
+    """
+    Daily prices for a market with the latest COT report as of each bar
+    forward-filled onto it. Rows are read as plain tuples (no ORM objects) and
+    joined with a vectorized as-of lookup.
+    start/end: optional inclusive date range; limit: keep only the latest N bars.
+    Returns columnar arrays: "date" (datetime64), "price", "cotIndex" (position
+    of the report in effect, -1 before the first report) and one int64 array per
+    COT field (only meaningful where cotIndex >= 0).
+    overlays: also return a float array per OVERLAY_FIELDS entry, NaN where not computed.
+    """
+    overlay_columns = list(OVERLAY_FIELDS.values()) if overlays else []
+    price_query = select(Price.timestamp, Price.price, *overlay_columns).where(Price.market_id == market_id)
+    if overlays:
+        price_query = price_query.outerjoin(
+            PriceOverlay,
+            and_(PriceOverlay.market_id == Price.market_id, PriceOverlay.timestamp == Price.timestamp),
+        )
+    price_query = _in_range(price_query, start, end)
+    if limit:
+        prices = db.execute(price_query.order_by(Price.timestamp.desc()).limit(limit)).all()[::-1]
+    else:
+        prices = db.execute(price_query.order_by(Price.timestamp)).all()
+
+    reports = []
+    if prices:
+        reports = db.execute(_report_query([market_id], prices[0][0].date(), prices[-1][0].date())).all()
+
+    return offload(_market_series, prices, reports, overlays)
+
+def _market_series(prices: list, reports: list, overlays: bool) -> dict[str, np.ndarray]:
+    """load_market_series arrays from its fetched price and report rows."""
+    price_columns = _transpose(prices, 2 + (len(OVERLAY_FIELDS) if overlays else 0))
+    dates = np.array(price_columns[0], dtype="datetime64[s]")
+    series = {"date": dates, "price": np.array(price_columns[1], dtype=np.float64)}
+    if overlays:
+        for field, values in zip(OVERLAY_FIELDS, price_columns[2:]):
+            series[field] = np.array(values, dtype=np.float64)
+
+    report_columns = _transpose(reports, len(COT_FIELDS) + 2)
+    return _attach_cot(
+        series,
+        dates,
+        np.array(report_columns[1], dtype="datetime64[D]"),
+        [np.array(values, dtype=np.int64) for values in report_columns[2:]],
+    )
+
+def load_aligned_series(
+    db: Session,
+    market_ids: list[int],
+    start: date = None,
+    end: date = None,
+) -> dict:
+    """
+    Series for several markets on one shared date axis (the union of their
+    trading days), read with one prices query and one COT query for all markets.
+    Returns {"date": axis, "markets": {market_id: series}}, where each series
+    has "price" (NaN on days that market has no bar), "cotIndex" and the COT
+    fields as of every date on the axis.
+    """
+    prices = db.execute(
+        _in_range(select(Price.market_id, Price.timestamp, Price.price).where(Price.market_id.in_(market_ids)), start, end)
+        .order_by(Price.market_id, Price.timestamp)
+    ).all()
+    price_columns = offload(_price_columns, prices)
+    axis = price_columns[-1]
+
+    reports = []
+    if len(axis):
+        first_day, last_day = axis[0].astype(datetime).date(), axis[-1].astype(datetime).date()
+        reports = db.execute(_report_query(market_ids, first_day, last_day)).all()
+    return offload(_aligned_series, market_ids, price_columns, reports)
+
+def _price_columns(prices: list) -> tuple[np.ndarray, ...]:
+    """Market ids, dates and closes of (market_id, timestamp, price) rows, and their unique dates."""
+    price_columns = _transpose(prices, 3)
+    price_dates = np.array(price_columns[1], dtype="datetime64[s]")
+    return (
+        np.array(price_columns[0], dtype=np.int64),
+        price_dates,
+        np.array(price_columns[2], dtype=np.float64),
+        np.unique(price_dates),
+    )
+
+def _aligned_series(market_ids: list[int], price_columns: tuple, reports: list) -> dict:
+    """load_aligned_series output from the _price_columns arrays and the fetched report rows."""
+    price_markets, price_dates, price_values, axis = price_columns
+    report_columns = _transpose(reports, len(COT_FIELDS) + 2)
+    report_markets = np.array(report_columns[0], dtype=np.int64)
+    report_dates = np.array(report_columns[1], dtype="datetime64[D]")
+    report_values = [np.array(values, dtype=np.int64) for values in report_columns[2:]]
+
+    # Rows are sorted by market, so each market is one contiguous slice
+    markets = {}
+    for market_id in market_ids:
+        p = slice(*np.searchsorted(price_markets, [market_id, market_id + 1]))
+        r = slice(*np.searchsorted(report_markets, [market_id, market_id + 1]))
+
+        price = np.full(len(axis), np.nan)
+        price[np.searchsorted(axis, price_dates[p])] = price_values[p]
+        markets[market_id] = _attach_cot({"price": price}, axis, report_dates[r], [v[r] for v in report_values])
+
+    return {"date": axis, "markets": markets}
+
+def downsample_series(series: dict[str, np.ndarray], max_points: int) -> dict[str, np.ndarray]:
+    """
+    Reduces a series to roughly max_points bars with LTTB on the price line.
+    The first bar of every COT report is always kept, so positioning values are
+    never dropped; those bars count towards the budget but can push the result
+    past max_points when there are more reports than points.
+    """
+    n = len(series["date"])
+    if n <= max_points:
+        return series
+
+    cot_points = np.flatnonzero(np.diff(series["cotIndex"], prepend=-2) != 0)
+    budget = max(max_points - len(cot_points), 3)
+    price_points = lttb_indices(series["date"].astype(np.int64), series["price"], budget)
+
+    keep = np.union1d(price_points, cot_points)
+    return {name: values[keep] for name, values in series.items()}
+
+def _nullable_floats(values: np.ndarray) -> list:
+    """Float array as a list with None in place of NaN."""
+    nullable = values.astype(object)
+    nullable[np.isnan(values)] = None
+    return nullable.tolist()
+
+def series_to_records(series: dict[str, np.ndarray]) -> list[dict]:
+    """Row-oriented view of a series: one dict per bar, COT fields None before the first report."""
+    dates = np.datetime_as_string(series["date"], unit="s").tolist()
+    has_cot = (series["cotIndex"] >= 0).tolist()
+    cot_columns = [series[field].tolist() for field in COT_FIELDS]
+    overlay_columns = {field: _nullable_floats(series[field]) for field in OVERLAY_FIELDS if field in series}
+
+    records = []
+    for i, (date, price) in enumerate(zip(dates, series["price"].tolist())):
+        record = {"date": date, "price": price}
+        for field, values in zip(COT_FIELDS, cot_columns):
+            record[field] = values[i] if has_cot[i] else None
+        for field, values in overlay_columns.items():
+            record[field] = values[i]
+        records.append(record)
+    return records
+
+def series_to_columns(series: dict[str, np.ndarray]) -> dict[str, list]:
+    """Columnar view of a series: one list per field, COT fields None before the first report."""
+    no_cot = series["cotIndex"] < 0
+    columns = {
+        "date": np.datetime_as_string(series["date"], unit="s").tolist(),
+        "price": series["price"].tolist(),
+    }
+    for field in COT_FIELDS:
+        values = series[field].astype(object)
+        values[no_cot] = None
+        columns[field] = values.tolist()
+    for field in OVERLAY_FIELDS:
+        if field in series:
+            columns[field] = _nullable_floats(series[field])
+    return columns
+
+def aligned_to_columns(aligned: dict, names: dict[int, str]) -> dict:
+    """
+    Columnar view of load_aligned_series output keyed by market name:
+    {"date": [...], "markets": {name: {"price": [...], <COT field>: [...]}}},
+    with None for missing prices and for COT values before a market's first report.
+    """
+    markets = {}
+    for market_id, series in aligned["markets"].items():
+        price = series["price"].astype(object)
+        price[np.isnan(series["price"])] = None
+        columns = {"price": price.tolist()}
+
+        no_cot = series["cotIndex"] < 0
+        for field in COT_FIELDS:
+            values = series[field].astype(object)
+            values[no_cot] = None
+            columns[field] = values.tolist()
+        markets[names[market_id]] = columns
+
+    return {"date": np.datetime_as_string(aligned["date"], unit="s").tolist(), "markets": markets}
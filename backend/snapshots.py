@@ -0,0 +1,161 @@
+import argparse
+import importlib.util
+import json
+import os
+from typing import TYPE_CHECKING
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db import SessionLocal, engine
+from migrations import run_migrations
+from models import COTReport, Market, Price
+from ingest_cot import COT_COLUMNS
+from utils.versions import cot_scope, get_versions, prices_scope
+
+# pyarrow is optional and only imported when snapshots are written or read, so
+# the ingest jobs that export them can run (and skip exporting) without it
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+SNAPSHOT_DIR = os.getenv(
+    "SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshots"),
+)
+
+COT_POSITION_COLUMNS = list(COT_COLUMNS.values())
+
+# table -> (model, date column, value columns, data version scope of a market)
+SNAPSHOT_TABLES = {
+    "prices": (Price, "timestamp", ["open", "high", "low", "price"], prices_scope),
+    "cot": (COTReport, "report_date", COT_POSITION_COLUMNS, cot_scope),
+}
+
+
+def snapshots_available() -> bool:
+    """Whether pyarrow is installed, without importing it."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def snapshot_path(root: str, table: str, market_id: int) -> str:
+    return os.path.join(root, table, f"{market_id}.arrow")
+
+
+def read_manifest(root: str) -> dict:
+    """{"markets": {id: {name, symbol, asset_class}}, "versions": {table: {id: version}}} of the last export."""
+    try:
+        with open(os.path.join(root, "manifest.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"markets": {}, "versions": {table: {} for table in SNAPSHOT_TABLES}}
+
+
+def market_table(db: Session, table: str, market_id: int) -> "pa.Table":
+    """One market's rows of a snapshot table, oldest first, as an Arrow table without nulls."""
+    import pyarrow as pa
+
+    model, date_column, value_columns, _ = SNAPSHOT_TABLES[table]
+    rows = db.execute(
+        select(getattr(model, date_column), *[getattr(model, c) for c in value_columns])
+        .where(model.market_id == market_id)
+        .order_by(getattr(model, date_column))
+    ).all()
+    columns = list(zip(*rows)) or [()] * (1 + len(value_columns))
+
+    # Seconds since the epoch without nulls, so loaders get datetime64[s] without conversion
+    arrays = {"date": pa.array(np.array(columns[0], dtype="datetime64[s]"), type=pa.timestamp("s"))}
+    for name, values in zip(value_columns, columns[1:]):
+        if table == "prices":
+            # Missing open/high/low become NaN rather than nulls
+            arrays["close" if name == "price" else name] = pa.array(np.array(values, dtype=np.float64))
+        else:
+            arrays[name] = pa.array(np.array(values, dtype=np.int64))
+    return pa.table(arrays)
+
+
+def write_arrow(table: "pa.Table", path: str) -> None:
+    """Writes an uncompressed Arrow IPC file in one record batch, replacing path atomically."""
+    import pyarrow as pa
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table.combine_chunks(), max_chunksize=max(table.num_rows, 1))
+    os.replace(tmp, path)
+
+
+def export_snapshots(db: Session, root: str = SNAPSHOT_DIR, market_ids=None) -> dict[str, int]:
+    """
+    Brings the per-market Arrow snapshots of prices and COT reports up to date.
+    Only files whose data version changed since the last export are rewritten
+    (prices follow the market's prices version, COT its cot version), so COT,
+    metrics and overlay updates leave price files alone. Each file is replaced
+    atomically so readers holding the old file keep a consistent view.
+    Returns the number of files written per table.
+    """
+    manifest = read_manifest(root)
+    query = select(Market.id, Market.name, Market.symbol, Market.asset_class)
+    if market_ids is not None:
+        query = query.where(Market.id.in_(list(market_ids)))
+    markets = db.execute(query).all()
+
+    written = {}
+    for table, (_, _, _, scope) in SNAPSHOT_TABLES.items():
+        exported = manifest["versions"].setdefault(table, {})
+        versions = get_versions(db, [scope(m.id) for m in markets])
+        written[table] = 0
+        for market in markets:
+            version = versions[scope(market.id)]
+            path = snapshot_path(root, table, market.id)
+            if exported.get(str(market.id)) == version and os.path.exists(path):
+                continue
+            write_arrow(market_table(db, table, market.id), path)
+            exported[str(market.id)] = version
+            written[table] += 1
+
+    for market in markets:
+        manifest["markets"][str(market.id)] = {"name": market.name, "symbol": market.symbol, "asset_class": market.asset_class}
+    tmp = os.path.join(root, "manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(root, "manifest.json"))
+    return written
+
+
+def load_snapshot(table: str, market_id: int, root: str = SNAPSHOT_DIR) -> dict[str, np.ndarray]:
+    """
+    A market's exported prices ("date", "open", "high", "low", "close") or COT
+    reports ("date" and the position columns) as NumPy arrays backed directly
+    by the memory-mapped file: nothing is copied or read until it is used.
+    Raises FileNotFoundError when the market has not been exported.
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(snapshot_path(root, table, market_id)) as source:
+        data = pa.ipc.open_file(source).read_all()
+    return {
+        name: column.chunk(0).to_numpy(zero_copy_only=True) if column.num_chunks == 1 else column.to_numpy()
+        for name, column in zip(data.column_names, data.columns)
+    }
+
+
+def snapshot_market_ids(root: str = SNAPSHOT_DIR) -> dict[str, int]:
+    """Market name -> id of the markets in the last export."""
+    return {market["name"]: int(market_id) for market_id, market in read_manifest(root)["markets"].items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export per-market Arrow snapshots of prices and COT reports")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help="snapshot directory (default: SNAPSHOT_DIR or backend/.snapshots)")
+    args = parser.parse_args()
+
+    run_migrations(engine)
+
+    db: Session = SessionLocal()
+    try:
+        written = export_snapshots(db, args.dir)
+        print(f"Wrote {written['prices']} price and {written['cot']} COT snapshots to {args.dir}.")
+    finally:
+        db.close()
@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+
+# Modules import each other flat from backend/, and db.py needs a URL at import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'positioning_tests.db')}")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from migrations import run_migrations
+from tests.fixtures import FakeCftc
+from utils import cot_archive
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Sessions bound to a new, migrated SQLite database for the test."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    run_migrations(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def price_dir(tmp_path):
+    """Directory for CsvPriceSource fixtures (see fixtures.write_prices)."""
+    directory = tmp_path / "prices"
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def cftc(monkeypatch):
+    """The CFTC download endpoint, served from memory (see fixtures.FakeCftc)."""
+    server = FakeCftc()
+    monkeypatch.setattr(cot_archive.requests, "get", server.get)
+    return server
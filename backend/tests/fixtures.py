@@ -0,0 +1,67 @@
+import io
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+import requests
+
+from ingest_cot import LEGACY_COT_DTYPES
+
+
+def write_prices(directory, ticker: str, dates) -> pd.DataFrame:
+    """Writes <directory>/<ticker>.csv with a random walk on the given dates and returns it."""
+    dates = pd.DatetimeIndex(dates)
+    close = 100 + np.cumsum(np.random.default_rng(len(dates)).normal(size=len(dates)))
+    frame = pd.DataFrame({"Date": dates, "Open": close, "High": close + 1, "Low": close - 1, "Close": close})
+    frame.to_csv(os.path.join(directory, f"{ticker}.csv"), index=False)
+    return frame
+
+
+class FakeCftc:
+    """Stands in for requests.get against the CFTC site: serves the current zip per year, honouring ETags."""
+
+    def __init__(self):
+        self.zips = {}
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        year = int(url.rsplit("deacot", 1)[1].split(".")[0])
+        self.requests.append((year, dict(headers or {})))
+        if year not in self.zips:
+            return FakeResponse(404, b"", {})
+        content = self.zips[year]
+        etag = f'"{hash(content)}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return FakeResponse(304, b"", {})
+        return FakeResponse(200, content, {"ETag": etag})
+
+
+class FakeResponse:
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(self.status_code)
+
+
+def cot_zip(report_dates, markets=("GOLD - COMMODITY EXCHANGE INC.",), seed: int = 0) -> bytes:
+    """A deacot{year}.zip with an annual.txt holding one report per market per date."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for code, market in enumerate(markets):
+        for report_date in report_dates:
+            row = {column: int(rng.integers(1_000, 500_000)) for column in LEGACY_COT_DTYPES}
+            row.update({
+                "Market_and_Exchange_Names": market,
+                "As_of_Date_in_Form_YYYY_MM_DD": pd.Timestamp(report_date).date().isoformat(),
+                "CFTC_Contract_Market_Code_Quotes": f"{code:06d}",
+            })
+            rows.append(row)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("annual.txt", pd.DataFrame(rows, columns=list(LEGACY_COT_DTYPES)).to_csv(index=False))
+    return buffer.getvalue()
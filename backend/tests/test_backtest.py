@@ -0,0 +1,44 @@
+import threading
+import time
+
+import backtest
+
+
+class SlowPool:
+    """Stands in for ProcessPoolExecutor, slow to start so first callers overlap."""
+
+    created = []
+
+    def __init__(self, max_workers=None, mp_context=None):
+        time.sleep(0.05)
+        self.shut_down = False
+        SlowPool.created.append(self)
+
+    def shutdown(self, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_concurrent_first_calls_share_one_executor(monkeypatch):
+    monkeypatch.setattr(backtest, "ProcessPoolExecutor", SlowPool)
+    monkeypatch.setattr(backtest, "_pool", None)
+    SlowPool.created = []
+    start = threading.Barrier(8)
+    pools = []
+
+    def first_request():
+        start.wait()
+        pools.append(backtest._executor())
+
+    threads = [threading.Thread(target=first_request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(SlowPool.created) == 1
+    assert all(pool is SlowPool.created[0] for pool in pools)
+
+    backtest.shutdown_executor()
+    assert SlowPool.created[0].shut_down
+    assert backtest._pool is None
+    backtest.shutdown_executor()
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+
+from utils.cot_archive import CotArchive
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_year_cached_while_current_is_revalidated_after_it_ends(tmp_path, cftc):
+    now = datetime(2025, 6, 15)
+    archive = CotArchive(str(tmp_path), now=lambda: now)
+    cftc.zips[2025] = b"reports to june"
+    assert read(archive.path(2025)) == b"reports to june"
+
+    # Still 2025: unchanged, revalidated with the ETag
+    assert read(archive.path(2025)) == b"reports to june"
+    assert "If-None-Match" in cftc.requests[-1][1]
+
+    # The rest of the year's reports land; after new year the cached partial copy must not be final
+    cftc.zips[2025] = b"reports to december"
+    now = datetime(2026, 1, 2)
+    archive = CotArchive(str(tmp_path), now=lambda: now)
+    assert read(archive.path(2025)) == b"reports to december"
+    assert len(cftc.requests) == 3
+
+    # Fetched after the year ended, so it is final and read from disk from now on
+    assert read(archive.path(2025)) == b"reports to december"
+    assert len(cftc.requests) == 3
+
+
+def test_year_confirmed_unchanged_after_it_ends_becomes_final(tmp_path, cftc):
+    cftc.zips[2025] = b"whole year"
+    CotArchive(str(tmp_path), now=lambda: datetime(2025, 12, 31)).path(2025)
+
+    # Nothing new after new year: a 304, which now dates the cached copy
+    archive = CotArchive(str(tmp_path), now=lambda: datetime(2026, 1, 2))
+    assert read(archive.path(2025)) == b"whole year"
+    assert len(cftc.requests) == 2
+    assert "If-None-Match" in cftc.requests[-1][1]
+
+    assert read(archive.path(2025)) == b"whole year"
+    assert len(cftc.requests) == 2
+
+
+def test_current_year_is_always_revalidated(tmp_path, cftc):
+    archive = CotArchive(str(tmp_path), now=lambda: datetime(2025, 6, 15))
+    cftc.zips[2025] = b"week 1"
+    archive.path(2025)
+    cftc.zips[2025] = b"week 2"
+    assert read(archive.path(2025)) == b"week 2"
+    assert len(cftc.requests) == 2
+
+
+def test_offline_serves_cache_without_requests(tmp_path, cftc):
+    cftc.zips[2025] = b"reports to june"
+    CotArchive(str(tmp_path), now=lambda: datetime(2025, 6, 15)).path(2025)
+
+    offline = CotArchive(str(tmp_path), offline=True, now=lambda: datetime(2026, 1, 2))
+    assert read(offline.path(2025)) == b"reports to june"
+    assert len(cftc.requests) == 1
+    with pytest.raises(FileNotFoundError):
+        offline.path(2024)
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import db as database
+from db import async_url, offload
+from ingest_yahoo import sync_prices
+from models import Market
+from overlays import update_overlays
+from series import load_aligned_series, load_market_series
+from tests.fixtures import write_prices
+from utils.price_sources import CsvPriceSource
+
+
+@pytest.fixture
+def async_sessions(session_factory, monkeypatch):
+    """DB_ASYNC sessions on the test database."""
+    url = session_factory.kw["bind"].url.render_as_string(hide_password=False)
+    engine = create_async_engine(async_url(url))
+    sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    monkeypatch.setattr(database, "AsyncSessionLocal", sessions)
+    yield sessions
+    asyncio.run(engine.dispose())
+
+
+def run_sync(sessions, handler):
+    async def call():
+        async with sessions() as session:
+            return await session.run_sync(handler)
+    return asyncio.run(call())
+
+
+def test_offload_calls_directly_outside_async_mode():
+    assert offload(threading.get_ident) == threading.get_ident()
+
+
+def test_offload_keeps_the_event_loop_free_under_run_sync(async_sessions):
+    ticks = []
+
+    def slow():
+        time.sleep(0.2)
+        return threading.get_ident()
+
+    async def main():
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        async with async_sessions() as session:
+            worker = await session.run_sync(lambda db: offload(slow))
+        task.cancel()
+        return worker
+
+    assert asyncio.run(main()) != threading.get_ident()
+    # The loop kept running while the offloaded call slept
+    assert len(ticks) >= 10
+
+
+def test_series_loaders_match_between_sync_and_async_sessions(db, price_dir, async_sessions):
+    for ticker in ("GC=F", "SI=F"):
+        write_prices(price_dir, ticker, pd.bdate_range("2024-01-02", "2024-12-31"))
+    sync_prices(db, source=CsvPriceSource(str(price_dir)), tickers=["GC=F", "SI=F"], end=date(2025, 1, 1))
+    update_overlays(db)
+    db.commit()
+    market_ids = sorted(market_id for market_id, in db.query(Market.id))
+
+    expected = load_market_series(db, market_ids[0], limit=100, overlays=True)
+    series = run_sync(async_sessions, lambda s: load_market_series(s, market_ids[0], limit=100, overlays=True))
+    assert series.keys() == expected.keys()
+    for field in expected:
+        np.testing.assert_array_equal(series[field], expected[field])
+
+    expected = load_aligned_series(db, market_ids)
+    aligned = run_sync(async_sessions, lambda s: load_aligned_series(s, market_ids))
+    np.testing.assert_array_equal(aligned["date"], expected["date"])
+    for market_id in market_ids:
+        np.testing.assert_array_equal(aligned["markets"][market_id]["price"], expected["markets"][market_id]["price"])
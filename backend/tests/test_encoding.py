@@ -0,0 +1,24 @@
+import pytest
+
+from utils.encoding import ARROW_STREAM, MSGPACK, preferred_binary_type
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, None),
+    ("application/json", None),
+    ("application/msgpack", MSGPACK),
+    ("application/x-msgpack;q=0.5, application/vnd.apache.arrow.stream", ARROW_STREAM),
+    ("application/msgpack;q=0", None),
+    # JSON is preferred, or ranked the same
+    ("application/json, application/msgpack;q=0.1", None),
+    ("application/msgpack;q=0.8, application/json;q=0.8", None),
+    ("application/msgpack;q=0.9, application/json", None),
+    # Wildcards rank JSON too, the most specific one counting
+    ("application/msgpack;q=0.5, */*", None),
+    ("application/msgpack, */*;q=0.1", MSGPACK),
+    ("application/msgpack;q=0.5, application/*;q=0.2, */*", MSGPACK),
+    ("application/msgpack;q=0.5, application/json;q=0.2, */*", MSGPACK),
+    ("*/*", None),
+])
+def test_preferred_binary_type(accept, expected):
+    assert preferred_binary_type(accept) == expected
@@ -0,0 +1,91 @@
+import asyncio
+
+from models import Market
+from utils.events import EventHub, publish_events
+
+
+def hub_for(session_factory, **kwargs) -> EventHub:
+    async def run(fn):
+        session = session_factory()
+        try:
+            return fn(session)
+        finally:
+            session.close()
+
+    return EventHub(run, poll_interval=0.01, **kwargs)
+
+
+def publish(session_factory, market_id: int, day: str):
+    session = session_factory()
+    publish_events(session, "prices", {market_id: [{"date": day}]}, date_key="date")
+    session.commit()
+    session.close()
+
+
+def add_market(session_factory) -> int:
+    session = session_factory()
+    market = Market(name="Gold", symbol="XAU", asset_class="Metals")
+    session.add(market)
+    session.commit()
+    market_id = market.id
+    session.close()
+    return market_id
+
+
+async def next_event(subscription, timeout=1.0):
+    return await asyncio.wait_for(subscription.queue.get(), timeout)
+
+
+def test_new_subscriber_after_idle_period_gets_only_new_events(session_factory):
+    market_id = add_market(session_factory)
+
+    async def scenario():
+        hub = hub_for(session_factory)
+        first = await hub.subscribe()
+        publish(session_factory, market_id, "2024-01-02")
+        assert (await next_event(first))[1] == "prices"
+        hub.unsubscribe(first)
+        await asyncio.wait_for(hub._task, 1.0)
+
+        # Committed while nobody is connected: a fresh connection must not receive it
+        publish(session_factory, market_id, "2024-01-03")
+        second = await hub.subscribe()
+        publish(session_factory, market_id, "2024-01-04")
+        event = await next_event(second)
+        assert '"2024-01-04"' in event[3]
+        assert second.queue.empty()
+        hub.unsubscribe(second)
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_first_subscribers_share_one_poller(session_factory):
+    market_id = add_market(session_factory)
+
+    async def scenario():
+        hub = hub_for(session_factory)
+        subscriptions = await asyncio.gather(*(hub.subscribe() for _ in range(5)))
+        task = hub._task
+        publish(session_factory, market_id, "2024-01-02")
+        for subscription in subscriptions:
+            await next_event(subscription)
+            assert subscription.queue.empty()
+        assert hub._task is task
+        for subscription in subscriptions:
+            hub.unsubscribe(subscription)
+
+    asyncio.run(scenario())
+
+
+def test_replay_returns_events_after_the_given_id(session_factory):
+    market_id = add_market(session_factory)
+    for day in ("2024-01-02", "2024-01-03", "2024-01-04"):
+        publish(session_factory, market_id, day)
+
+    async def scenario():
+        hub = hub_for(session_factory)
+        events = await hub.replay(1)
+        assert [event[0] for event in events] == [2, 3]
+        assert await hub_for(session_factory, batch_size=1).replay(1) is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,93 @@
+from datetime import date
+
+import pandas as pd
+
+from ingest_yahoo import backfill_prices, sync_prices
+from models import MarketAlias, Price
+from tests.fixtures import write_prices
+from utils.checkpoints import load_checkpoints
+from utils.price_sources import CsvPriceSource
+
+
+class RecordingSource(CsvPriceSource):
+    """CsvPriceSource that remembers the ranges it was asked for."""
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.calls = []
+
+    def fetch(self, tickers, start, end):
+        self.calls.append((list(tickers), start, end))
+        return super().fetch(tickers, start, end)
+
+
+def test_second_sync_fetches_only_bars_after_the_last_stored_one(db, price_dir):
+    bars = write_prices(price_dir, "GC=F", pd.bdate_range("2023-01-02", "2023-03-31"))
+    source = RecordingSource(str(price_dir))
+
+    first = sync_prices(db, source=source, tickers=["GC=F"], end=date(2023, 2, 1))
+    db.commit()
+    assert first == {"GC=F": (bars["Date"] < "2023-02-01").sum()}
+    last_stored = db.query(Price.timestamp).order_by(Price.timestamp.desc()).first()[0]
+    assert last_stored == pd.Timestamp("2023-01-31")
+
+    second = sync_prices(db, source=source, tickers=["GC=F"], end=date(2023, 4, 1))
+    db.commit()
+    assert source.calls[-1] == (["GC=F"], date(2023, 2, 1), date(2023, 4, 1))
+    assert second == {"GC=F": (bars["Date"] >= "2023-02-01").sum()}
+
+    timestamps = [t for t, in db.query(Price.timestamp).order_by(Price.timestamp)]
+    assert len(timestamps) == len(set(timestamps)) == len(bars)
+    assert timestamps == list(bars["Date"])
+
+
+def test_sync_with_nothing_missing_stores_nothing(db, price_dir):
+    write_prices(price_dir, "GC=F", pd.bdate_range("2023-01-02", "2023-01-31"))
+    source = RecordingSource(str(price_dir))
+    sync_prices(db, source=source, tickers=["GC=F"], end=date(2023, 2, 1))
+    db.commit()
+    calls = len(source.calls)
+
+    assert sync_prices(db, source=source, tickers=["GC=F"], end=date(2023, 2, 1)) == {}
+    assert len(source.calls) == calls
+
+
+class DroppingSource(CsvPriceSource):
+    """CsvPriceSource that returns an empty frame for `ticker` on windows starting at `start`."""
+
+    def __init__(self, directory, ticker, start):
+        super().__init__(directory)
+        self.ticker = ticker
+        self.start = start
+
+    def fetch(self, tickers, start, end):
+        frames = super().fetch(tickers, start, end)
+        if start == self.start and self.ticker in frames:
+            frames[self.ticker] = frames[self.ticker].iloc[:0]
+        return frames
+
+
+def stored_bars(db, ticker) -> list:
+    market_id = db.query(MarketAlias.market_id).filter_by(source="yahoo", source_symbol=ticker).scalar()
+    return [t for t, in db.query(Price.timestamp).filter(Price.market_id == market_id).order_by(Price.timestamp)]
+
+
+def test_backfill_does_not_checkpoint_past_an_empty_fetch(db, price_dir):
+    gold = write_prices(price_dir, "GC=F", pd.bdate_range("2023-01-02", "2023-03-31"))
+    oil = write_prices(price_dir, "CL=F", pd.bdate_range("2023-01-02", "2023-03-31"))
+    # Oil comes back empty for the second window and the third one still has bars
+    source = DroppingSource(str(price_dir), "CL=F", date(2023, 1, 31))
+
+    backfill_prices(db, source=source, tickers=["GC=F", "CL=F"], start=date(2023, 1, 1), end=date(2023, 4, 1), chunk_days=30)
+    checkpoints = load_checkpoints(db, "yahoo")
+    assert checkpoints["GC=F"].position == "2023-03-31"
+    assert checkpoints["CL=F"].position == "2023-01-30"
+    assert len(stored_bars(db, "CL=F")) < len(oil)
+
+    source = RecordingSource(str(price_dir))
+    stored = backfill_prices(db, source=source, tickers=["GC=F", "CL=F"], start=date(2023, 1, 1), end=date(2023, 4, 1), chunk_days=30)
+    assert source.calls[0] == (["CL=F"], date(2023, 1, 31), date(2023, 3, 2))
+    assert set(stored) == {"CL=F"}
+    assert stored_bars(db, "CL=F") == list(oil["Date"])
+    assert stored_bars(db, "GC=F") == list(gold["Date"])
+    assert load_checkpoints(db, "yahoo")["CL=F"].position == "2023-03-31"
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from utils.rolling import RollingPercentile
+
+WINDOW = 50
+
+
+def replay(values, window, qs):
+    """RollingPercentile over a sliding window next to np.percentile of each window, from the first value on."""
+    rolling = RollingPercentile(values)
+    for i, value in enumerate(values):
+        rolling.add(value)
+        if i >= window:
+            rolling.remove(values[i - window])
+        current = np.asarray(values[max(0, i - window + 1):i + 1])
+        for q in qs:
+            yield rolling.percentile(q), np.percentile(current, q)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_np_percentile_on_random_data(seed):
+    values = np.random.default_rng(seed).normal(size=400).tolist()
+    for actual, expected in replay(values, WINDOW, [0, 10, 33.3, 50, 90, 100]):
+        assert actual == expected
+
+
+def test_matches_np_percentile_with_ties():
+    # Few distinct integers, like net positions that repeat
+    values = np.random.default_rng(7).integers(-5, 5, size=400).tolist()
+    for actual, expected in replay(values, WINDOW, [10, 25, 50, 75, 90]):
+        assert actual == pytest.approx(expected, rel=0, abs=1e-12)
+
+
+def test_warm_up_windows_smaller_than_the_window_size():
+    values = [3, 1, 2]
+    results = list(replay(values, WINDOW, [10, 90]))
+    assert results == [(3.0, 3.0), (3.0, 3.0), (1.2, 1.2), (2.8, 2.8), (1.2, 1.2), (2.8, 2.8)]
+
+
+def test_nan_in_window_gives_nan_until_it_leaves():
+    values = np.random.default_rng(3).normal(size=200)
+    values[60] = np.nan
+    values = values.tolist()
+    for i, (actual, expected) in enumerate(replay(values, WINDOW, [90])):
+        if 60 <= i < 60 + WINDOW:
+            assert np.isnan(actual) and np.isnan(expected)
+        else:
+            assert actual == expected
+
+
+def test_empty_window_raises():
+    with pytest.raises(ValueError):
+        RollingPercentile([1, 2, 3]).percentile(50)
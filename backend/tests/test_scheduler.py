@@ -0,0 +1,200 @@
+import json
+from datetime import date, datetime, timezone
+
+import pandas as pd
+import pytest
+
+from models import COTReport, JobRun, Price
+from scheduler import (
+    FakeClock,
+    Scheduler,
+    last_completed_session,
+    latest_cot_release,
+    next_session_close,
+)
+from tests.fixtures import cot_zip, write_prices
+from utils.cot_archive import CotArchive
+from utils.price_sources import CsvPriceSource
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def tuesdays(start: str, end: str) -> list[date]:
+    return [d.date() for d in pd.date_range(start, end, freq="W-TUE")]
+
+
+def make_scheduler(tmp_path, session_factory, clock, price_dir=None, tickers=(), price_source=None):
+    return Scheduler(
+        clock=clock,
+        archive=CotArchive(str(tmp_path / "cot"), now=clock.now),
+        price_source=price_source or CsvPriceSource(str(price_dir or tmp_path)),
+        tickers=list(tickers),
+        session_factory=session_factory,
+        snapshot_dir=None,
+    )
+
+
+def runs_by_job(runs) -> dict[str, JobRun]:
+    return {run.job: run for run in runs}
+
+
+def latest_report(session_factory) -> date:
+    session = session_factory()
+    try:
+        return session.query(COTReport.report_date).order_by(COTReport.report_date.desc()).first()[0]
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def cot_history(cftc):
+    """CFTC archives with nothing for 2023-2024 and 2025 reports up to mid-December."""
+    cftc.zips[2023] = cot_zip([])
+    cftc.zips[2024] = cot_zip([])
+    cftc.zips[2025] = cot_zip(tuesdays("2025-01-01", "2025-12-16"))
+    return cftc
+
+
+# Release and session calendar
+
+def test_cot_release_boundary_is_friday_1530_eastern():
+    # 15:30 EST is 20:30 UTC in December
+    assert latest_cot_release(utc(2025, 12, 19, 20, 29)) == (date(2025, 12, 9), utc(2025, 12, 12, 20, 30))
+    assert latest_cot_release(utc(2025, 12, 19, 20, 30)) == (date(2025, 12, 16), utc(2025, 12, 19, 20, 30))
+    # and 19:30 UTC in summer
+    assert latest_cot_release(utc(2025, 7, 11, 19, 29))[0] == date(2025, 7, 1)
+    assert latest_cot_release(utc(2025, 7, 11, 19, 30))[0] == date(2025, 7, 8)
+    # Over the weekend and early in the week the last Friday's release stands
+    assert latest_cot_release(utc(2025, 12, 22, 12, 0))[0] == date(2025, 12, 16)
+
+
+def test_futures_sessions_skip_weekends():
+    # Saturday and Monday before the close: Friday's bar is the latest final one
+    assert last_completed_session(utc(2025, 12, 20, 12, 0), "Metals") == date(2025, 12, 19)
+    assert last_completed_session(utc(2025, 12, 22, 15, 0), "Metals") == date(2025, 12, 19)
+    # Monday's bar is final 30 minutes after the 17:00 ET close (22:00 UTC)
+    assert last_completed_session(utc(2025, 12, 22, 22, 29), "Energy") == date(2025, 12, 19)
+    assert last_completed_session(utc(2025, 12, 22, 22, 30), "Energy") == date(2025, 12, 22)
+
+
+def test_crypto_sessions_run_every_day():
+    assert last_completed_session(utc(2025, 12, 20, 0, 29), "Crypto") == date(2025, 12, 18)
+    assert last_completed_session(utc(2025, 12, 20, 0, 30), "Crypto") == date(2025, 12, 19)
+    assert last_completed_session(utc(2025, 12, 21, 12, 0), "Crypto") == date(2025, 12, 20)
+    # Weekend wake-ups come from the crypto day boundary
+    assert next_session_close(utc(2025, 12, 20, 1, 0)) == utc(2025, 12, 21, 0, 30)
+    assert next_session_close(utc(2025, 12, 19, 21, 0)) == utc(2025, 12, 19, 22, 30)
+
+
+# Running due jobs
+
+def test_jobs_do_not_rerun_once_data_is_current(tmp_path, session_factory, price_dir, cot_history):
+    write_prices(price_dir, "GC=F", pd.bdate_range("2025-12-01", "2025-12-31"))
+    write_prices(price_dir, "BTC-USD", pd.date_range("2025-12-01", "2025-12-31"))
+    clock = FakeClock(utc(2025, 12, 20, 12, 0))  # Saturday
+    scheduler = make_scheduler(tmp_path, session_factory, clock, price_dir, tickers=["GC=F", "BTC-USD"])
+
+    runs = runs_by_job(scheduler.run_pending())
+    assert runs["cot"].status == runs["prices"].status == "ok"
+    assert latest_report(session_factory) == date(2025, 12, 16)
+    session = session_factory()
+    assert session.query(Price).count() == 15 + 19  # GC to Friday 19th, BTC to the 19th
+    session.close()
+
+    assert scheduler.run_pending() == []
+    clock.advance(hours=2)
+    assert scheduler.run_pending() == []
+
+    # After midnight UTC only the crypto bar for Saturday is due
+    clock.current = utc(2025, 12, 21, 1, 0)
+    runs = runs_by_job(scheduler.run_pending())
+    assert list(runs) == ["prices"]
+    assert (runs["prices"].rows, json.loads(runs["prices"].detail)["tickers"]) == (1, ["BTC-USD"])
+
+
+class FailingOnce(CsvPriceSource):
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.failed = False
+
+    def fetch(self, tickers, start, end):
+        if not self.failed:
+            self.failed = True
+            raise ConnectionError("rate limited")
+        return super().fetch(tickers, start, end)
+
+
+def test_failed_run_is_recorded_and_retried_after_the_interval(tmp_path, session_factory, price_dir, cot_history):
+    write_prices(price_dir, "GC=F", pd.bdate_range("2025-12-01", "2025-12-31"))
+    clock = FakeClock(utc(2025, 12, 20, 12, 0))
+    source = FailingOnce(str(price_dir))
+    scheduler = make_scheduler(tmp_path, session_factory, clock, tickers=["GC=F"], price_source=source)
+
+    failed = runs_by_job(scheduler.run_pending())["prices"]
+    assert (failed.status, failed.rows) == ("error", 0)
+    assert "rate limited" in json.loads(failed.detail)["error"]
+
+    clock.advance(minutes=59)
+    assert scheduler.run_pending() == []
+    assert scheduler.next_wakeup(clock.now()) == utc(2025, 12, 20, 13, 0)
+
+    clock.advance(minutes=1)
+    retried = runs_by_job(scheduler.run_pending())["prices"]
+    assert (retried.status, retried.rows) == ("ok", 15)
+
+    session = session_factory()
+    assert [(r.job, r.status) for r in session.query(JobRun).order_by(JobRun.id)] == [
+        ("cot", "ok"), ("prices", "error"), ("prices", "ok"),
+    ]
+    session.close()
+
+
+def test_holiday_delayed_release_is_picked_up_by_retries(tmp_path, session_factory, cftc):
+    cftc.zips[2023] = cot_zip([])
+    cftc.zips[2024] = cot_zip([])
+    cftc.zips[2025] = cot_zip(tuesdays("2025-01-01", "2025-06-24"))
+    clock = FakeClock(utc(2025, 6, 27, 20, 0))
+    scheduler = make_scheduler(tmp_path, session_factory, clock)
+    assert runs_by_job(scheduler.run_pending())["cot"].status == "ok"
+
+    # Friday 4 July: the release is due but CFTC publishes on Monday 7 July instead
+    clock.current = utc(2025, 7, 4, 20, 0)
+    run = runs_by_job(scheduler.run_pending())["cot"]
+    assert (run.status, run.rows) == ("ok", 0)
+    clock.advance(minutes=30)
+    assert scheduler.run_pending() == []
+    clock.advance(minutes=30)
+    assert runs_by_job(scheduler.run_pending())["cot"].rows == 0
+
+    cftc.zips[2025] = cot_zip(tuesdays("2025-01-01", "2025-07-01"))
+    clock.current = utc(2025, 7, 7, 20, 0)
+    run = runs_by_job(scheduler.run_pending())["cot"]
+    assert (run.status, run.rows) == ("ok", 1)
+    assert latest_report(session_factory) == date(2025, 7, 1)
+
+    clock.advance(hours=2)
+    assert scheduler.run_pending() == []
+
+
+def test_january_rollover_reads_the_rest_of_last_year(tmp_path, session_factory, cot_history):
+    clock = FakeClock(utc(2025, 12, 19, 21, 0))
+    scheduler = make_scheduler(tmp_path, session_factory, clock)
+    assert runs_by_job(scheduler.run_pending())["cot"].status == "ok"
+    assert latest_report(session_factory) == date(2025, 12, 16)
+
+    # The last 2025 reports are released after the cached copy of the 2025 archive was fetched
+    cot_history.zips[2025] = cot_zip(tuesdays("2025-01-01", "2025-12-30"))
+    clock.current = utc(2026, 1, 2, 21, 0)
+    run = runs_by_job(scheduler.run_pending())["cot"]
+    assert (run.status, run.rows) == ("ok", 2)
+    assert latest_report(session_factory) == date(2025, 12, 30)
+
+    # From then on 2025 is final and only the new year's archive is requested
+    cot_history.zips[2026] = cot_zip(tuesdays("2026-01-01", "2026-01-06"))
+    requests_before = len(cot_history.requests)
+    clock.current = utc(2026, 1, 9, 21, 0)
+    run = runs_by_job(scheduler.run_pending())["cot"]
+    assert (run.status, run.rows) == ("ok", 1)
+    assert [year for year, _ in cot_history.requests[requests_before:]] == [2026]
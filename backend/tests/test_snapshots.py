@@ -0,0 +1,49 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from ingest_cot import iter_cot_batches, open_cot_file, store_cot_frame
+from ingest_yahoo import sync_prices
+from metrics import update_metrics
+from overlays import update_overlays
+from snapshots import export_snapshots, load_snapshot, snapshot_market_ids
+from tests.fixtures import cot_zip, write_prices
+from utils.price_sources import CsvPriceSource
+
+
+def store_cot(db, tmp_path, report_dates):
+    path = tmp_path / "cot.zip"
+    path.write_bytes(cot_zip(report_dates))
+    with open_cot_file(2025, path=str(path)) as f:
+        for batch in iter_cot_batches(f):
+            store_cot_frame(db, batch)
+    update_metrics(db)
+    db.commit()
+
+
+def test_cot_and_metrics_updates_do_not_rewrite_price_snapshots(db, tmp_path, price_dir):
+    root = str(tmp_path / "snapshots")
+    bars = write_prices(price_dir, "GC=F", pd.bdate_range("2025-01-02", "2025-03-31"))
+    sync_prices(db, source=CsvPriceSource(str(price_dir)), tickers=["GC=F"], end=date(2025, 4, 1))
+    db.commit()
+    store_cot(db, tmp_path, pd.date_range("2025-01-07", "2025-03-25", freq="W-TUE").date)
+
+    assert export_snapshots(db, root) == {"prices": 1, "cot": 1}
+    assert export_snapshots(db, root) == {"prices": 0, "cot": 0}
+
+    # New reports, metrics and overlays bump the market's version but not its prices
+    store_cot(db, tmp_path, pd.date_range("2025-01-07", "2025-04-08", freq="W-TUE").date)
+    update_overlays(db)
+    db.commit()
+    assert export_snapshots(db, root) == {"prices": 0, "cot": 1}
+
+    write_prices(price_dir, "GC=F", pd.bdate_range("2025-01-02", "2025-04-30"))
+    sync_prices(db, source=CsvPriceSource(str(price_dir)), tickers=["GC=F"], end=date(2025, 5, 1))
+    db.commit()
+    assert export_snapshots(db, root) == {"prices": 1, "cot": 0}
+
+    [market_id] = snapshot_market_ids(root).values()
+    prices = load_snapshot("prices", market_id, root)
+    assert len(prices["close"]) == len(pd.bdate_range("2025-01-02", "2025-04-30"))
+    np.testing.assert_allclose(prices["close"][:len(bars)], bars["Close"].to_numpy())
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+
+def insert_ignore(session: Session, model, records: list[dict], conflict_columns: list[str], returning=()):
+    """
+    Multi-row INSERT ... ON CONFLICT DO NOTHING against the unique key made of
+    conflict_columns. Supported on Postgres and SQLite.
+    If returning columns are given, returns their values for the rows actually inserted.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"insert_ignore is not supported for {dialect}")
+
+    if not records:
+        return []
+
+    # Core insert on the table: skips the ORM bulk-save bookkeeping per row
+    stmt = insert(model.__table__).on_conflict_do_nothing(index_elements=conflict_columns)
+    if returning:
+        return session.execute(stmt.returning(*returning), records).all()
+    session.execute(stmt, records)
+    return []
+
+
+def upsert(session: Session, model, records: list[dict], conflict_columns: list[str]):
+    """
+    Multi-row INSERT ... ON CONFLICT DO UPDATE against the unique key made of
+    conflict_columns, overwriting every other column given in the records.
+    Supported on Postgres and SQLite.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upsert is not supported for {dialect}")
+
+    if not records:
+        return
+
+    stmt = insert(model.__table__)
+    updated = [column for column in records[0] if column not in conflict_columns]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=conflict_columns,
+        set_={column: stmt.excluded[column] for column in updated},
+    )
+    session.execute(stmt, records)
+
+
+def frame_records(frame: pd.DataFrame) -> list[dict]:
+    """
+    Rows of a DataFrame as dicts of plain Python values with None for NaN/NA,
+    built column by column (much faster than DataFrame.to_dict for long frames).
+    """
+    names = list(frame.columns)
+    columns = []
+    for name in names:
+        values = frame[name].tolist()
+        for i in np.flatnonzero(frame[name].isna().to_numpy()):
+            values[i] = None
+        columns.append(values)
+    return [dict(zip(names, row)) for row in zip(*columns)]
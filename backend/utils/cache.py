@@ -0,0 +1,151 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+from db import offload
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU of encoded responses, bounded by entry count and total bytes.
+    """
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: tuple[bytes, str]):
+        size = len(value[0])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key)[0])
+            self._entries[key] = value
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[0])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+class RedisCache:
+    """
+    Shared backend for several API processes. Needs the redis package.
+    Entries expire after ttl seconds; version changes make old keys unreachable anyway.
+    """
+
+    # Calls wait on the network, so they are kept off the event loop (see db.offload)
+    blocking = True
+
+    def __init__(self, url: str, ttl: int = 7 * 24 * 3600, prefix: str = "positioning:response:"):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            return None
+        media_type, _, body = raw.partition(b"\n")
+        return body, media_type.decode()
+
+    def set(self, key: str, value: tuple[bytes, str]):
+        body, media_type = value
+        self._client.set(self.prefix + key, media_type.encode() + b"\n" + body, ex=self.ttl)
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class ResponseCache:
+    """
+    Caches encoded read-endpoint responses keyed by path, query, negotiated
+    format and the data versions they depend on. The same key is the ETag, so
+    clients revalidating with If-None-Match get a 304 until an ingest bumps a version.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or LRUCache()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def respond(self, request: Request, versions: dict[str, int], build, vary: str = "") -> Response:
+        """
+        build: callable producing the response (a Response or JSON-able content) on a miss.
+        vary: anything else the encoding depends on, e.g. the negotiated media type.
+        """
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        material = "|".join([request.url.path, query, vary, *(f"{s}={v}" for s, v in sorted(versions.items()))])
+        etag = f'"{hashlib.sha1(material.encode()).hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+            self._count("not_modified")
+            return Response(status_code=304, headers=headers)
+
+        cached = self._call(self.backend.get, etag)
+        if cached is not None:
+            self._count("hits")
+            body, media_type = cached
+            return Response(content=body, media_type=media_type, headers=headers)
+
+        self._count("misses")
+        response = build()
+        if not isinstance(response, Response):
+            response = offload(JSONResponse, response)
+        if response.status_code == 200:
+            self._call(self.backend.set, etag, (bytes(response.body), response.media_type))
+            response.headers.update(headers)
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = {"hits": self.hits, "misses": self.misses, "not_modified": self.not_modified}
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else None,
+            **self.backend.stats(),
+        }
+
+    def _call(self, method, *args):
+        return offload(method, *args) if self.backend.blocking else method(*args)
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def cache_from_env() -> ResponseCache:
+    """In-process LRU by default; RESPONSE_CACHE_URL=redis://... shares the cache between workers."""
+    url = os.getenv("RESPONSE_CACHE_URL")
+    if url and url.startswith(("redis://", "rediss://")):
+        return ResponseCache(RedisCache(url))
+    return ResponseCache(LRUCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_ENTRIES", "512")),
+        max_bytes=int(os.getenv("RESPONSE_CACHE_BYTES", str(64 * 2**20))),
+    ))
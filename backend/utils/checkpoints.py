@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from models import IngestCheckpoint
+from utils.bulk import upsert
+
+
+def load_checkpoints(session: Session, source: str) -> dict:
+    """Checkpoint rows (version, position, rows, complete) of a source by key."""
+    rows = session.execute(
+        select(IngestCheckpoint.key, IngestCheckpoint.version, IngestCheckpoint.position,
+               IngestCheckpoint.rows, IngestCheckpoint.complete)
+        .where(IngestCheckpoint.source == source)
+    ).all()
+    return {row.key: row for row in rows}
+
+
+def save_checkpoint(session: Session, source: str, key: str, position: str, rows: int,
+                    version: str = None, complete: bool = False) -> None:
+    """
+    Records progress for source/key in the caller's transaction, so it commits
+    together with the chunk it describes.
+    """
+    upsert(session, IngestCheckpoint, [{
+        "source": source,
+        "key": key,
+        "version": version,
+        "position": position,
+        "rows": rows,
+        "complete": complete,
+        "updated_at": datetime.now(),
+    }], conflict_columns=["source", "key"])
+
+
+def clear_checkpoints(session: Session, source: str, key: str = None) -> None:
+    """Forgets the progress of a source (or one of its keys), so the next backfill starts over."""
+    query = delete(IngestCheckpoint).where(IngestCheckpoint.source == source)
+    if key is not None:
+        query = query.where(IngestCheckpoint.key == key)
+    session.execute(query)
+
+
+def commit_chunk(session: Session) -> None:
+    """
+    Commits a backfill chunk and empties the identity map, so objects loaded
+    for one chunk are not carried into the next. ORM objects held from before
+    (e.g. by a MarketResolver) are detached and must be reloaded.
+    """
+    session.commit()
+    session.expunge_all()
@@ -0,0 +1,94 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CompressionMiddleware:
+    """
+    Compresses complete (non-streaming) responses with brotli when the client
+    accepts it and the brotli package is installed, otherwise with gzip.
+    Streaming responses (e.g. event streams) and already-encoded bodies pass through.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1").lower()
+        encoding = self._choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            headers = {k.lower(): v for k, v in start_message.get("headers", [])}
+            body = message.get("body", b"")
+            if message.get("more_body", False) or b"content-encoding" in headers or len(body) < self.minimum_size:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body = self._compress(body, encoding)
+            raw_headers = [
+                (k, v) for k, v in start_message.get("headers", [])
+                if k.lower() not in (b"content-length", b"vary")
+            ]
+            vary = headers.get(b"vary")
+            raw_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": raw_headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _choose_encoding(self, accept_encoding: str) -> str | None:
+        offered = set()
+        for part in accept_encoding.split(","):
+            coding, *params = [p.strip() for p in part.split(";")]
+            if not any(p.startswith("q=") and _quality(p[2:]) == 0 for p in params):
+                offered.add(coding)
+        if brotli is not None and "br" in offered:
+            return "br"
+        if "gzip" in offered:
+            return "gzip"
+        return None
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+
+def _quality(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+COT_URL = "https://www.cftc.gov/files/dea/history/deacot{year}.zip"
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "COT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cot_cache"),
+)
+
+
+class CotArchive:
+    """
+    Local cache of the CFTC deacot{year}.zip archives.
+
+    Zips are stored content-addressed under <root>/objects/<sha256>.zip and
+    <root>/index.json maps each year to its object plus the ETag/Last-Modified
+    it was served with. A year's archive stops changing once the year is over,
+    so a copy fetched after the year ended is read from disk; anything older
+    (the current year, or a past year cached while it was still current) is
+    revalidated with a conditional request.
+    A deacot{year}.zip dropped into <root> is picked up as-is, and offline=True
+    never touches the network, so backfills can run from a local directory.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, offline: bool = False, timeout: float = 60, now=datetime.now):
+        self.root = root
+        self.offline = offline
+        self.timeout = timeout
+        self.now = now  # clock for fetched_at, e.g. a scheduler's fake clock
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._index = self._read_index()
+
+    def path(self, year: int) -> str:
+        """Local path of the zip for year, downloading or revalidating it as needed."""
+        entry = self._index.get(str(year))
+        cached = entry and os.path.exists(self._object_path(entry["sha256"]))
+
+        if not cached:
+            dropped = os.path.join(self.root, f"deacot{year}.zip")
+            if os.path.exists(dropped):
+                with open(dropped, "rb") as f:
+                    return self._store(year, f.read(), {})
+
+        if self.offline or (cached and self._final(year, entry)):
+            if not cached:
+                raise FileNotFoundError(f"No cached COT archive for {year} in {self.root}")
+            return self._object_path(entry["sha256"])
+
+        return self._download(year, entry if cached else None)
+
+    def fetch_years(self, years, max_workers: int = 8) -> dict[int, str]:
+        """Makes every year available locally, downloading missing ones concurrently."""
+        years = list(years)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return dict(zip(years, pool.map(self.path, years)))
+
+    def _download(self, year: int, entry: dict = None) -> str:
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        r = requests.get(COT_URL.format(year=year), headers=headers, timeout=self.timeout)
+        if r.status_code == 304 and entry:
+            # Still current as of now: record that (and any new validators), so
+            # a copy confirmed after the year ended counts as final
+            with self._lock:
+                self._index[str(year)] = {
+                    **entry,
+                    "etag": r.headers.get("ETag") or entry.get("etag"),
+                    "last_modified": r.headers.get("Last-Modified") or entry.get("last_modified"),
+                    "fetched_at": self.now().isoformat(timespec="seconds"),
+                }
+                self._write_index()
+            return self._object_path(entry["sha256"])
+        r.raise_for_status()
+        return self._store(year, r.content, r.headers)
+
+    def _store(self, year: int, content: bytes, headers) -> str:
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self._object_path(sha256)
+        if not os.path.exists(path):
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+
+        with self._lock:
+            self._index[str(year)] = {
+                "sha256": sha256,
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "fetched_at": self.now().isoformat(timespec="seconds"),
+            }
+            self._write_index()
+        return path
+
+    @staticmethod
+    def _final(year: int, entry: dict) -> bool:
+        """Whether the cached copy was fetched after the year ended, so it can't change any more."""
+        fetched_at = entry.get("fetched_at")
+        return fetched_at is not None and datetime.fromisoformat(fetched_at).year > year
+
+    def _object_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "objects", f"{sha256}.zip")
+
+    def _read_index(self) -> dict:
+        try:
+            with open(os.path.join(self.root, "index.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_index(self):
+        path = os.path.join(self.root, "index.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(self._index, f, indent=2, sort_keys=True)
+        os.replace(f"{path}.tmp", path)
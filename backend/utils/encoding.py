@@ -0,0 +1,81 @@
+import numpy as np
+
+# Optional binary encoders; a format is only negotiated when its library is installed
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+MSGPACK = "application/msgpack"
+
+_MEDIA_TYPES = {
+    ARROW_STREAM: ARROW_STREAM,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+}
+
+# Accept ranges that JSON (the default representation) matches, most specific first
+_JSON_RANGES = ("application/json", "application/*", "*/*")
+
+
+def preferred_binary_type(accept: str | None) -> str | None:
+    """
+    The highest-quality binary media type in an Accept header that we can produce,
+    or None if the client should get JSON. Binary types are only sent when named,
+    and only when ranked above JSON, whose quality is that of the most specific
+    of application/json, application/* and */* in the header (0 if none).
+    """
+    if not accept:
+        return None
+
+    candidates = []
+    json_quality = {}
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        media_type = media_type.lower()
+        if media_type in _JSON_RANGES:
+            json_quality.setdefault(media_type, quality)
+            continue
+        media_type = _MEDIA_TYPES.get(media_type)
+        if media_type and quality > 0 and _available(media_type):
+            candidates.append((-quality, position, media_type))
+
+    if not candidates:
+        return None
+    quality, _, media_type = min(candidates)
+    json = next((json_quality[r] for r in _JSON_RANGES if r in json_quality), 0.0)
+    return None if json >= -quality else media_type
+
+
+def _available(media_type: str) -> bool:
+    return (pa is not None) if media_type == ARROW_STREAM else (msgpack is not None)
+
+
+def arrow_stream(columns: dict[str, np.ndarray], null_mask: dict[str, np.ndarray] = None) -> bytes:
+    """
+    Encodes NumPy columns as a single-batch Arrow IPC stream.
+    null_mask: optional per-column boolean arrays marking null entries.
+    """
+    null_mask = null_mask or {}
+    table = pa.table({name: pa.array(values, mask=null_mask.get(name)) for name, values in columns.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def msgpack_bytes(payload) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
@@ -0,0 +1,134 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from models import DataEvent
+
+# Outbox rows older than this are deleted when new ones are written; clients
+# reconnecting after longer than this reload instead of replaying
+EVENT_RETENTION = timedelta(days=7)
+
+# Deltas with more rows than this (e.g. a first backfill) are sent without the
+# rows, as a notice to reload the range from first to last
+EVENT_MAX_ROWS = 500
+
+
+def publish_events(session: Session, kind: str, deltas: dict[int, list[dict]], date_key: str) -> None:
+    """
+    Stages one event per market with the rows it just received, in the caller's
+    transaction, so subscribers hear about data exactly when it is committed.
+    deltas: market_id -> JSON-ready rows, each with an ISO date under date_key.
+    """
+    now = datetime.now()
+    events = []
+    for market_id, rows in deltas.items():
+        if not rows:
+            continue
+        dates = [row[date_key] for row in rows]
+        payload = {"count": len(rows), "first": min(dates), "last": max(dates)}
+        if len(rows) <= EVENT_MAX_ROWS:
+            payload["rows"] = rows
+        events.append({"created_at": now, "kind": kind, "market_id": int(market_id), "payload": json.dumps(payload)})
+
+    if events:
+        if session.get_bind().dialect.name == "postgresql":
+            # Publishers take turns until commit, so events become visible in id
+            # order and a reader never moves past an id that commits later
+            session.execute(text("LOCK TABLE data_events IN EXCLUSIVE MODE"))
+        session.execute(delete(DataEvent).where(DataEvent.created_at < now - EVENT_RETENTION))
+        session.execute(insert(DataEvent.__table__), events)
+
+
+def latest_event_id(session: Session) -> int:
+    return session.scalar(select(func.max(DataEvent.id))) or 0
+
+
+def read_events(session: Session, after_id: int, limit: int, market_ids=None) -> list[tuple[int, str, int, str]]:
+    """(id, kind, market_id, payload JSON) of the events after after_id, oldest first."""
+    query = select(DataEvent.id, DataEvent.kind, DataEvent.market_id, DataEvent.payload).where(DataEvent.id > after_id)
+    if market_ids is not None:
+        query = query.where(DataEvent.market_id.in_(list(market_ids)))
+    return [tuple(row) for row in session.execute(query.order_by(DataEvent.id).limit(limit)).all()]
+
+
+def sse_message(event_id: int, kind: str, data: dict) -> str:
+    """One server-sent event in text/event-stream framing."""
+    return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscription:
+    def __init__(self, market_ids, queue_size: int):
+        self.market_ids = market_ids
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, event) -> None:
+        if self.market_ids is not None and event[2] not in self.market_ids:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The stream ends and the client resumes from its last event id
+            self.overflowed = True
+
+
+class EventHub:
+    """
+    Fans the data_events outbox out to the push subscribers of this API process.
+    While anyone is subscribed, one task reads the events after the last id it
+    has seen every poll_interval seconds, so the database sees one small indexed
+    query per interval per process however many clients are connected.
+    db(fn) runs fn(session) and is awaited, e.g. main.run_db.
+    """
+
+    def __init__(self, db, poll_interval: float = 2.0, batch_size: int = 1000, queue_size: int = 1000):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.subscribers: set[Subscription] = set()
+        self.last_id = None
+        self._task = None
+        self._start_lock = asyncio.Lock()
+
+    async def subscribe(self, market_ids=None) -> Subscription:
+        subscription = Subscription(market_ids, self.queue_size)
+        async with self._start_lock:
+            if self._task is None or self._task.done():
+                # Nobody was listening, so start from what is committed now rather
+                # than where the last poll stopped; resuming clients use replay()
+                self.last_id = await self.db(latest_event_id)
+                self._task = asyncio.create_task(self._poll())
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+
+    async def replay(self, after_id: int, market_ids=None) -> list[tuple[int, str, int, str]] | None:
+        """
+        Stored events after after_id for a resuming client, or None when the gap
+        is too large to replay (or has been pruned) and the client should reload.
+        """
+        oldest = await self.db(lambda session: session.scalar(select(func.min(DataEvent.id))))
+        if oldest is not None and after_id < oldest - 1:
+            return None
+        events = await self.db(lambda session: read_events(session, after_id, self.batch_size + 1, market_ids))
+        return events if len(events) <= self.batch_size else None
+
+    async def _poll(self):
+        while self.subscribers:
+            try:
+                events = await self.db(lambda session: read_events(session, self.last_id, self.batch_size))
+            except Exception as e:
+                print("Event poll failed:", e)
+                events = []
+            for event in events:
+                self.last_id = event[0]
+                for subscription in list(self.subscribers):
+                    subscription.offer(event)
+            if len(events) < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
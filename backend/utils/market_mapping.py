@@ -200,4 +200,42 @@ CANONICAL_TO_ASSETCLASS = {
     "6S": "Currencies",
     "6C": "Currencies",
     "6A": "Currencies"
-}
\ No newline at end of file
+}
+
+# USD value of one contract per 1.0 move in the Yahoo quote (contract size x
+# quote unit), for notional-weighting positions. Grains, softs and livestock are
+# quoted in cents, hence the /100.
+CANONICAL_TO_POINT_VALUE = {
+    "BTC": 5,            # 5 BTC
+    "ETH": 50,           # 50 ETH
+    "XRP": 50_000,       # 50,000 XRP
+    "XAU": 100,          # 100 troy oz
+    "XAG": 5_000,        # 5,000 troy oz
+    "XPT": 50,           # 50 troy oz
+    "XPD": 100,          # 100 troy oz
+    "HG": 25_000,        # 25,000 lb
+    "CL": 1_000,         # 1,000 bbl
+    "BZ": 1_000,         # 1,000 bbl
+    "NG": 10_000,        # 10,000 MMBtu
+    "HO": 42_000,        # 42,000 gal
+    "RB": 42_000,        # 42,000 gal
+    "ZC": 50,            # 5,000 bu, cents/bu
+    "ZS": 50,            # 5,000 bu, cents/bu
+    "ZW": 50,            # 5,000 bu, cents/bu
+    "KC": 375,           # 37,500 lb, cents/lb
+    "CT": 500,           # 50,000 lb, cents/lb
+    "CC": 10,            # 10 t, USD/t
+    "OJ": 150,           # 15,000 lb, cents/lb
+    "LE": 400,           # 40,000 lb, cents/lb
+    "HE": 400,           # 40,000 lb, cents/lb
+    "ES": 50,            # $50 x index
+    "NQ": 20,            # $20 x index
+    "YM": 5,             # $5 x index
+    "RTY": 50,           # $50 x index
+    "6E": 125_000,       # EUR 125,000
+    "6B": 62_500,        # GBP 62,500
+    "6J": 12_500_000,    # JPY 12.5m
+    "6S": 125_000,       # CHF 125,000
+    "6C": 100_000,       # CAD 100,000
+    "6A": 100_000,       # AUD 100,000
+}
@@ -1,6 +1,7 @@
 from models import Market, MarketAlias
 from sqlalchemy.orm import Session
 from utils.market_mapping import CANONICAL_TO_NAME
+from utils.versions import bump_versions
 
 def resolve_market(
     session: Session,
@@ -45,3 +46,69 @@ def resolve_market(
     return market
 
 
+class MarketResolver:
+    """
+    In-memory version of resolve_market for ingest runs.
+    Preloads every MarketAlias and Market once, serves lookups from dictionaries
+    and adds any new markets/aliases to the caller's transaction (flushed, never
+    committed) so the ingest job decides when to commit.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.hits = 0
+        self.misses = 0
+        self.created_markets = 0
+        self.created_aliases = 0
+
+        markets = session.query(Market).all()
+        self._markets_by_id = {m.id: m for m in markets}
+        self._markets_by_name = {m.name: m for m in markets}
+        self._aliases = {
+            (source, source_symbol): market_id
+            for source, source_symbol, market_id in session.query(
+                MarketAlias.source, MarketAlias.source_symbol, MarketAlias.market_id
+            )
+        }
+
+    def resolve(
+        self,
+        source: str,
+        source_symbol: str,
+        canonical_name: str,
+        symbol: str = None,
+    ) -> Market:
+        """Same contract as resolve_market, minus the per-alias commit."""
+        market_id = self._aliases.get((source, source_symbol))
+        if market_id is not None:
+            self.hits += 1
+            return self._markets_by_id[market_id]
+
+        self.misses += 1
+        name = CANONICAL_TO_NAME.get(canonical_name, canonical_name)
+        market = self._markets_by_name.get(name)
+
+        if not market:
+            from utils.market_mapping import CANONICAL_TO_ASSETCLASS
+            asset_class = CANONICAL_TO_ASSETCLASS.get(canonical_name)
+            market = Market(name=name, symbol=canonical_name, asset_class=asset_class)
+            self.session.add(market)
+            self.session.flush()  # assigns market.id inside the current transaction
+            self._markets_by_id[market.id] = market
+            self._markets_by_name[name] = market
+            self.created_markets += 1
+            bump_versions(self.session, ["markets"])
+
+        self.session.add(MarketAlias(market_id=market.id, source=source, source_symbol=source_symbol))
+        self._aliases[(source, source_symbol)] = market.id
+        self.created_aliases += 1
+
+        return market
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "created_markets": self.created_markets,
+            "created_aliases": self.created_aliases,
+        }
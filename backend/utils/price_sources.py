@@ -0,0 +1,53 @@
+import os
+from datetime import date
+
+import pandas as pd
+
+
+class YahooPriceSource:
+    """
+    Daily bars from Yahoo Finance, fetched for all tickers in one yfinance call.
+    """
+
+    def fetch(self, tickers: list[str], start: date, end: date) -> dict[str, pd.DataFrame]:
+        import yfinance as yf
+
+        data = yf.download(tickers, start=start.isoformat(), end=end.isoformat(), group_by="ticker", progress=False)
+        if data.empty:
+            return {}
+
+        frames = {}
+        for ticker in tickers:
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            frames[ticker] = _normalise(data[ticker])
+        return frames
+
+
+class CsvPriceSource:
+    """
+    Daily bars read from <directory>/<ticker>.csv files with a Date column and
+    Yahoo-style Open/High/Low/Close columns. Used for fixtures and offline runs.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch(self, tickers: list[str], start: date, end: date) -> dict[str, pd.DataFrame]:
+        frames = {}
+        for ticker in tickers:
+            path = os.path.join(self.directory, f"{ticker}.csv")
+            if not os.path.exists(path):
+                continue
+            frame = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+            frame = frame[(frame.index >= pd.Timestamp(start)) & (frame.index < pd.Timestamp(end))]
+            frames[ticker] = _normalise(frame)
+        return frames
+
+
+def _normalise(frame: pd.DataFrame) -> pd.DataFrame:
+    """Drops empty bars and strips timezones so timestamps match the prices table."""
+    frame = frame.dropna(subset=["Close"])
+    if frame.index.tz is not None:
+        frame = frame.tz_localize(None)
+    return frame.sort_index()
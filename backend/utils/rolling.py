@@ -0,0 +1,76 @@
+from bisect import bisect_left
+
+import numpy as np
+
+
+class RollingPercentile:
+    """
+    Order statistics over a sliding window whose values all come from a known
+    universe (e.g. a market's full history). Values are rank-compressed once and
+    counted in a Fenwick tree, so add, remove and percentile are all O(log n).
+    percentile() matches np.percentile's default linear interpolation, including
+    returning NaN while the window holds a NaN.
+    """
+
+    def __init__(self, universe):
+        universe = np.asarray(universe)
+        if universe.dtype.kind == "f":
+            universe = universe[~np.isnan(universe)]
+        self._values = np.unique(universe).tolist()
+        self._tree = [0] * (len(self._values) + 1)
+        self._top_bit = 1 << (len(self._values).bit_length() - 1) if self._values else 0
+        self.size = 0
+        self._nans = 0  # NaNs in the window, counted apart from the ranked values
+
+    def add(self, value):
+        if value != value:
+            self._nans += 1
+        else:
+            self._update(self._rank(value), 1)
+        self.size += 1
+
+    def remove(self, value):
+        if value != value:
+            self._nans -= 1
+        else:
+            self._update(self._rank(value), -1)
+        self.size -= 1
+
+    def kth(self, k: int):
+        """k-th smallest value in the window (0-based)."""
+        position, remaining = 0, k + 1
+        step = self._top_bit
+        while step:
+            nxt = position + step
+            if nxt < len(self._tree) and self._tree[nxt] < remaining:
+                position = nxt
+                remaining -= self._tree[nxt]
+            step >>= 1
+        return self._values[position]
+
+    def percentile(self, q: float) -> float:
+        if self.size == 0:
+            raise ValueError("percentile of an empty window")
+        if self._nans:
+            return float("nan")
+
+        # Same virtual index and lerp as numpy's "linear" method
+        quantile = q / 100
+        virtual_index = (self.size - 1) * quantile
+        lower = int(np.floor(virtual_index))
+        lower = min(max(lower, 0), self.size - 1)
+        upper = min(lower + 1, self.size - 1)
+        t = virtual_index - np.floor(virtual_index)
+
+        a, b = self.kth(lower), self.kth(upper)
+        diff = b - a
+        return float(b - diff * (1 - t)) if t >= 0.5 else float(a + diff * t)
+
+    def _rank(self, value) -> int:
+        return bisect_left(self._values, value)
+
+    def _update(self, rank: int, delta: int):
+        i = rank + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from models import DataVersion
+from utils.bulk import insert_ignore
+
+
+def market_scope(market_id: int) -> str:
+    return f"market:{market_id}"
+
+
+def cot_scope(market_id: int) -> str:
+    """Bumped only when a market receives COT reports, for results that ignore prices."""
+    return f"cot:{market_id}"
+
+
+def prices_scope(market_id: int) -> str:
+    """Bumped only when a market receives price bars, for results that ignore COT and derived data."""
+    return f"prices:{market_id}"
+
+
+def bump_versions(session: Session, scopes) -> None:
+    """
+    Increments the data version of each scope inside the caller's transaction,
+    so readers see the new version exactly when the data itself is committed.
+    """
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return
+
+    now = datetime.now()
+    insert_ignore(
+        session, DataVersion,
+        [{"scope": scope, "version": 0, "updated_at": now} for scope in scopes],
+        conflict_columns=["scope"],
+    )
+    session.execute(
+        update(DataVersion)
+        .where(DataVersion.scope.in_(scopes))
+        .values(version=DataVersion.version + 1, updated_at=now)
+    )
+
+
+def get_versions(session: Session, scopes) -> dict[str, int]:
+    """Current version of each scope (0 if it has never been bumped), in one query."""
+    scopes = sorted(set(scopes))
+    rows = session.query(DataVersion.scope, DataVersion.version).filter(DataVersion.scope.in_(scopes)).all()
+    versions = dict.fromkeys(scopes, 0)
+    versions.update(rows)
+    return versions
@@ -4,8 +4,11 @@ import { MultiSelect } from "react-multi-select-component";
 type MultiSelectOption = { label: string; value: string };
 
 export interface Alert {
+  id: number;
   market: string | null;
+  asset_class?: string | null;
   timestamp: string;
+  report_date?: string | null;
   message: string;
   alert_type: string;
   value?: number | null;
@@ -22,6 +25,9 @@ interface Props {
   setAssetClassFilter: (filter: string[] | null) => void;
   setMarketFilter: (filter: string[] | null) => void;
   setAlertTypeFilter: (filter: string[] | null) => void;
+  hasMore: boolean;
+  loadingMore: boolean;
+  onLoadMore: () => void;
 }
 
 function AlertsPanel({
@@ -35,6 +41,9 @@ function AlertsPanel({
   setAssetClassFilter,
   setMarketFilter,
   setAlertTypeFilter,
+  hasMore,
+  loadingMore,
+  onLoadMore,
 }: Props) {
   const buildOptions = (values: string[]): MultiSelectOption[] =>
     values.map((value) => ({ label: value, value }));
@@ -128,14 +137,19 @@ function AlertsPanel({
           <div>No alerts for current selection.</div>
         ) : (
           <ul style={{ margin: 0, paddingLeft: "1.25rem" }}>
-            {alerts.map((alert, idx) => (
-              <li key={`${alert.timestamp}-${alert.alert_type}-${idx}`}>
+            {alerts.map((alert) => (
+              <li key={alert.id}>
                 <strong>{alert.market ?? "Unknown market"}</strong> (
                 {new Date(alert.timestamp).toLocaleDateString()}): {alert.message}
               </li>
             ))}
           </ul>
         )}
+        {hasMore && (
+          <button onClick={onLoadMore} disabled={loadingMore} style={{ marginTop: "0.5rem" }}>
+            {loadingMore ? "Loading..." : "Load older alerts"}
+          </button>
+        )}
       </div>
     </div>
   );
@@ -1,4 +1,4 @@
-import React, { useEffect, useMemo, useState } from "react";
+import React, { useCallback, useEffect, useMemo, useRef, useState } from "react";
 import axios from "axios";
 import Chart, { MarketDataPoint } from "./Chart";
 import AlertsPanel, { Alert } from "./AlertsPanel";
@@ -9,23 +9,114 @@ interface Market {
 }
 
 interface ApiAlert {
+  id: number;
   timestamp: string;
   alert_type: string;
+  report_date?: string | null;
   message: string;
   value?: number | null;
   market?: string | null;
+  asset_class?: string | null;
 }
 
-const MARKET_NAME_REGEX = /^(.*?)\s+large speculators\b/i;
+interface AlertPage {
+  alerts: ApiAlert[];
+  next_cursor: string | null;
+}
 
-function deriveMarketName(alert: { market?: string | null; message: string }): string | null {
-  if (alert.market && alert.market.trim().length > 0) {
-    return alert.market.trim();
-  }
+// Event from the /events push channel: the rows one ingest added for a market,
+// or only their date range when there were too many to send
+interface PushEvent<Row> {
+  market_id: number;
+  market: string | null;
+  asset_class: string | null;
+  count: number;
+  first: string;
+  last: string;
+  rows?: Row[];
+}
+
+interface PriceRow {
+  date: string;
+  close: number;
+}
+
+// Alert types produced by the backend; more are picked up as they arrive
+const ALERT_TYPES = ["max_net_long", "extreme_short", "rapid_change"];
+const ALERT_PAGE_SIZE = 50;
+
+type ColumnarSeries = Record<string, unknown[]>;
+
+interface AlignedSeries {
+  date: string[];
+  markets: Record<string, ColumnarSeries>;
+}
+
+// The API sends series column by column (one array per field); expand to one object per date.
+function columnsToRows(columns: ColumnarSeries): Record<string, unknown>[] {
+  const dates = Array.isArray(columns?.date) ? columns.date : [];
+  const fields = Object.keys(columns ?? {});
+  return dates.map((_, i) =>
+    fields.reduce((row, field) => {
+      row[field] = columns[field]?.[i];
+      return row;
+    }, {} as Record<string, unknown>)
+  );
+}
 
-  const message = alert.message ?? "";
-  const match = message.match(MARKET_NAME_REGEX);
-  return match?.[1]?.trim() ?? null;
+function normalizeAlert(alert: ApiAlert): Alert {
+  return {
+    id: alert.id,
+    timestamp: alert.timestamp,
+    alert_type: alert.alert_type,
+    report_date: alert.report_date ?? null,
+    message: alert.message,
+    market: alert.market ?? null,
+    asset_class: alert.asset_class ?? null,
+    value: alert.value ?? null,
+  };
+}
+
+function alignedToChartData(data: AlignedSeries): Record<string, MarketDataPoint[]> {
+  const dates = Array.isArray(data?.date) ? data.date : [];
+  const chartData: Record<string, MarketDataPoint[]> = {};
+
+  Object.entries(data?.markets ?? {}).forEach(([market, columns]) => {
+    chartData[market] = columnsToRows({ ...columns, date: dates })
+      .filter((d: any) => d.price !== null && d.price !== undefined)
+      .map((d: any) => ({
+        ...d,
+        date: d.date.slice(0, 10),
+        largeSpecLong: d.largeSpecLong ?? 0,
+        largeSpecShort: d.largeSpecShort ?? 0,
+        smallSpecLong: d.smallSpecLong ?? 0,
+        smallSpecShort: d.smallSpecShort ?? 0,
+        commsLong: d.commsLong ?? 0,
+        commsShort: d.commsShort ?? 0,
+        price: d.price ?? null,
+        alerts: d.alerts ?? [],
+      }))
+      .sort((a: MarketDataPoint, b: MarketDataPoint) => (a.date < b.date ? -1 : 1));
+  });
+  return chartData;
+}
+
+// New bars carry the positioning of the latest report already shown
+function appendBars(points: MarketDataPoint[], bars: PriceRow[]): MarketDataPoint[] {
+  const byDate = new Map(points.map((point) => [point.date, point]));
+  bars.forEach((bar) => {
+    const date = bar.date.slice(0, 10);
+    const previous = byDate.get(date) ?? points[points.length - 1];
+    byDate.set(date, { ...previous, date, price: bar.close, alerts: [] });
+  });
+  return Array.from(byDate.values()).sort((a, b) => (a.date < b.date ? -1 : 1));
+}
+
+function compareAlerts(a: Alert, b: Alert): number {
+  if (a.timestamp !== b.timestamp) {
+    return a.timestamp < b.timestamp ? 1 : -1;
+  }
+  return b.id - a.id;
 }
 
 function MarketDashboard() {
@@ -33,7 +124,12 @@ function MarketDashboard() {
   const [selectedMarkets, setSelectedMarkets] = useState<string[]>([]);
   const [marketData, setMarketData] = useState<Record<string, MarketDataPoint[]>>({});
   const [alerts, setAlerts] = useState<Alert[]>([]);
+  const [alertsCursor, setAlertsCursor] = useState<string | null>(null);
+  const [loadingOlderAlerts, setLoadingOlderAlerts] = useState(false);
   const [loading, setLoading] = useState(false);
+  // Bumped to refetch from scratch when pushed changes can't be applied as deltas
+  const [dataVersion, setDataVersion] = useState(0);
+  const [alertsVersion, setAlertsVersion] = useState(0);
 
   const [assetClassFilter, setAssetClassFilter] = useState<string[] | null>(null);
   const [marketFilter, setMarketFilter] = useState<string[] | null>(null);
@@ -83,44 +179,21 @@ function MarketDashboard() {
 
     const fetchMarketData = async () => {
       setLoading(true);
-      const newData: Record<string, MarketDataPoint[]> = {};
 
       try {
-        await Promise.all(
-          selectedMarkets.map(async (market) => {
-            try {
-              const res = await axios.get(`${apiUrl}/data/${encodeURIComponent(market)}`);
-              const rawData = Array.isArray(res.data) ? res.data : [];
-
-              const normalized = rawData
-                .map((d: any) => ({
-                  ...d,
-                  date: d.date.slice(0, 10),
-                  largeSpecLong: d.largeSpecLong ?? 0,
-                  largeSpecShort: d.largeSpecShort ?? 0,
-                  smallSpecLong: d.smallSpecLong ?? 0,
-                  smallSpecShort: d.smallSpecShort ?? 0,
-                  commsLong: d.commsLong ?? 0,
-                  commsShort: d.commsShort ?? 0,
-                  price: d.price ?? null,
-                  alerts: d.alerts ?? [],
-                }))
-                .sort((a: MarketDataPoint, b: MarketDataPoint) => (a.date < b.date ? -1 : 1));
-
-              if (!isCancelled) {
-                newData[market] = normalized;
-              }
-            } catch (error) {
-              if (!isCancelled) {
-                console.error(`Failed to fetch market ${market}:`, error);
-              }
-            }
-          })
-        );
+        // One request for every selected market, aligned on a shared date axis
+        const params = new URLSearchParams();
+        selectedMarkets.forEach((market) => params.append("markets", market));
+        const res = await axios.get<AlignedSeries>(`${apiUrl}/data`, { params });
+        const newData = alignedToChartData(res.data);
 
         if (!isCancelled) {
           setMarketData((prev) => ({ ...prev, ...newData }));
         }
+      } catch (error) {
+        if (!isCancelled) {
+          console.error("Failed to fetch market data:", error);
+        }
       } finally {
         if (!isCancelled) {
           setLoading(false);
@@ -133,57 +206,14 @@ function MarketDashboard() {
     return () => {
       isCancelled = true;
     };
-  }, [selectedMarkets, apiUrl]);
-
-  useEffect(() => {
-    let isMounted = true;
-
-    const fetchAlerts = async () => {
-      try {
-        const res = await axios.get<ApiAlert[]>(`${apiUrl}/alerts`);
-        if (!isMounted) {
-          return;
-        }
-
-        const rawAlerts = Array.isArray(res.data) ? res.data : [];
-        const normalizedAlerts = rawAlerts.map((alert) => ({
-          timestamp: alert.timestamp,
-          alert_type: alert.alert_type,
-          message: alert.message,
-          market: deriveMarketName(alert),
-          value: alert.value ?? null,
-        }));
-
-        setAlerts(normalizedAlerts);
-      } catch (error) {
-        if (isMounted) {
-          console.error("Failed to fetch alerts:", error);
-        }
-      }
-    };
-
-    fetchAlerts();
-
-    return () => {
-      isMounted = false;
-    };
-  }, [apiUrl]);
+  }, [selectedMarkets, apiUrl, dataVersion]);
 
   const marketsByAssetClass = useMemo(() => groupByAssetClass(markets), [markets]);
 
-  const marketToAssetClass = useMemo(
-    () =>
-      markets.reduce((acc, market) => {
-        acc[market.name] = market.asset_class;
-        return acc;
-      }, {} as Record<string, string>),
-    [markets]
-  );
-
   const allAssetClasses = useMemo(() => Object.keys(marketsByAssetClass), [marketsByAssetClass]);
   const allMarkets = useMemo(() => markets.map((m) => m.name), [markets]);
   const allAlertTypes = useMemo(
-    () => Array.from(new Set(alerts.map((a) => a.alert_type).filter(Boolean))),
+    () => Array.from(new Set([...ALERT_TYPES, ...alerts.map((a) => a.alert_type).filter(Boolean)])),
     [alerts]
   );
 
@@ -204,37 +234,169 @@ function MarketDashboard() {
       ? alertTypeFilter
       : null;
 
-  const filteredAlerts = useMemo(() => {
-    const validMarkets = new Set(allMarkets);
+  // Filters are applied by the API; an empty selection matches nothing
+  const noAlertsSelected = [effectiveAssetFilter, effectiveMarketFilter, effectiveAlertTypeFilter].some(
+    (filter) => filter !== null && filter.length === 0
+  );
+  const alertParams = new URLSearchParams({ limit: String(ALERT_PAGE_SIZE) });
+  effectiveAssetFilter?.forEach((value) => alertParams.append("asset_class", value));
+  effectiveMarketFilter?.forEach((value) => alertParams.append("market", value));
+  effectiveAlertTypeFilter?.forEach((value) => alertParams.append("alert_type", value));
+  const alertQuery = alertParams.toString();
+
+  useEffect(() => {
+    let isMounted = true;
+    setAlerts([]);
+    setAlertsCursor(null);
+
+    if (noAlertsSelected) {
+      return;
+    }
+
+    const fetchNewestAlerts = async () => {
+      try {
+        const res = await axios.get<AlertPage>(`${apiUrl}/alerts?${alertQuery}`);
+        if (!isMounted) {
+          return;
+        }
 
-    return alerts.filter((alert) => {
-      if (!alert.market || !validMarkets.has(alert.market)) {
-        return false;
+        setAlerts((res.data?.alerts ?? []).map(normalizeAlert));
+        setAlertsCursor(res.data?.next_cursor ?? null);
+      } catch (error) {
+        if (isMounted) {
+          console.error("Failed to fetch alerts:", error);
+        }
       }
+    };
 
-      const alertAssetClass = marketToAssetClass[alert.market];
+    fetchNewestAlerts();
 
-      const assetClassMatch =
-        !effectiveAssetFilter ||
-        (alertAssetClass && effectiveAssetFilter.includes(alertAssetClass));
+    return () => {
+      isMounted = false;
+    };
+  }, [apiUrl, alertQuery, noAlertsSelected, alertsVersion]);
+
+  // The push handlers below outlive renders; they read the current selection from refs
+  const alertFiltersRef = useRef({
+    assetClass: effectiveAssetFilter,
+    market: effectiveMarketFilter,
+    alertType: effectiveAlertTypeFilter,
+    none: noAlertsSelected,
+  });
+  alertFiltersRef.current = {
+    assetClass: effectiveAssetFilter,
+    market: effectiveMarketFilter,
+    alertType: effectiveAlertTypeFilter,
+    none: noAlertsSelected,
+  };
+  const selectedMarketsRef = useRef(selectedMarkets);
+  selectedMarketsRef.current = selectedMarkets;
+
+  // New prices, COT reports and alerts pushed by the API as ingest jobs commit them.
+  // EventSource reconnects by itself and the API replays what was missed.
+  useEffect(() => {
+    const source = new EventSource(`${apiUrl}/events`);
 
-      const marketMatch =
-        !effectiveMarketFilter ||
-        (alert.market && effectiveMarketFilter.includes(alert.market));
+    const onAlerts = (event: MessageEvent) => {
+      const data: PushEvent<ApiAlert> = JSON.parse(event.data);
+      const filters = alertFiltersRef.current;
+      if (filters.none) {
+        return;
+      }
+      if (!data.rows) {
+        setAlertsVersion((version) => version + 1);
+        return;
+      }
 
-      const alertTypeMatch =
-        !effectiveAlertTypeFilter || effectiveAlertTypeFilter.includes(alert.alert_type);
+      const fresh = data.rows
+        .map((row) => normalizeAlert({ ...row, market: data.market, asset_class: data.asset_class }))
+        .filter(
+          (alert) =>
+            (!filters.assetClass || filters.assetClass.includes(alert.asset_class ?? "")) &&
+            (!filters.market || filters.market.includes(alert.market ?? "")) &&
+            (!filters.alertType || filters.alertType.includes(alert.alert_type))
+        );
+      if (fresh.length === 0) {
+        return;
+      }
+      setAlerts((prev) => {
+        const ids = new Set(fresh.map((alert) => alert.id));
+        return [...fresh, ...prev.filter((alert) => !ids.has(alert.id))].sort(compareAlerts);
+      });
+    };
+
+    const refreshMarket = async (market: string, start: string) => {
+      try {
+        const params = new URLSearchParams({ markets: market, start: start.slice(0, 10) });
+        const res = await axios.get<AlignedSeries>(`${apiUrl}/data`, { params });
+        const fresh = alignedToChartData(res.data)[market] ?? [];
+        setMarketData((prev) => ({
+          ...prev,
+          [market]: [...(prev[market] ?? []).filter((point) => point.date < start.slice(0, 10)), ...fresh],
+        }));
+      } catch (error) {
+        console.error("Failed to refresh market data:", error);
+      }
+    };
 
-      return assetClassMatch && marketMatch && alertTypeMatch;
-    });
-  }, [alerts, effectiveAssetFilter, effectiveMarketFilter, effectiveAlertTypeFilter, marketToAssetClass, allMarkets]);
+    // Bars are appended as they come; a COT report changes the positioning of
+    // every bar from its date on, so that range is fetched again
+    const onMarketData = (event: MessageEvent) => {
+      const data: PushEvent<PriceRow> = JSON.parse(event.data);
+      const market = data.market;
+      if (!market || !selectedMarketsRef.current.includes(market)) {
+        return;
+      }
+      const bars = data.rows;
+      if (event.type === "prices" && bars) {
+        setMarketData((prev) => (prev[market]?.length ? { ...prev, [market]: appendBars(prev[market], bars) } : prev));
+        return;
+      }
+      refreshMarket(market, data.first);
+    };
+
+    const onReload = () => {
+      setAlertsVersion((version) => version + 1);
+      setDataVersion((version) => version + 1);
+    };
+
+    source.addEventListener("alerts", onAlerts as EventListener);
+    source.addEventListener("prices", onMarketData as EventListener);
+    source.addEventListener("cot", onMarketData as EventListener);
+    source.addEventListener("reload", onReload);
+
+    return () => {
+      source.close();
+    };
+  }, [apiUrl]);
+
+  const loadOlderAlerts = useCallback(async () => {
+    if (!alertsCursor) {
+      return;
+    }
+    setLoadingOlderAlerts(true);
+    try {
+      const cursor = encodeURIComponent(alertsCursor);
+      const res = await axios.get<AlertPage>(`${apiUrl}/alerts?${alertQuery}&cursor=${cursor}`);
+      const older = (res.data?.alerts ?? []).map(normalizeAlert);
+      setAlerts((prev) => {
+        const ids = new Set(prev.map((alert) => alert.id));
+        return [...prev, ...older.filter((alert) => !ids.has(alert.id))];
+      });
+      setAlertsCursor(res.data?.next_cursor ?? null);
+    } catch (error) {
+      console.error("Failed to fetch older alerts:", error);
+    } finally {
+      setLoadingOlderAlerts(false);
+    }
+  }, [apiUrl, alertQuery, alertsCursor]);
 
   return (
     <div style={{ display: "grid", gap: "1rem" }}>
       {loading && <p>Loading market data...</p>}
 
       <AlertsPanel
-        alerts={filteredAlerts}
+        alerts={alerts}
         assetClasses={allAssetClasses}
         markets={allMarkets}
         alertTypes={allAlertTypes}
@@ -244,6 +406,9 @@ function MarketDashboard() {
         setAssetClassFilter={setAssetClassFilter}
         setMarketFilter={setMarketFilter}
         setAlertTypeFilter={setAlertTypeFilter}
+        hasMore={alertsCursor !== null}
+        loadingMore={loadingOlderAlerts}
+        onLoadMore={loadOlderAlerts}
       />
 
       <div>